@@ -0,0 +1,330 @@
+#Incremental statistical aggregation
+# تجمیع افزایشی نتایج در بازه‌های زمانی (مثلاً دقیقه‌ای و ساعتی): کمینه، بیشینه، میانگین و
+# انحراف معیار با روش Welford. صدک‌ها در بازه‌های کوتاه (تا RESERVOIR_MAX_MS) از یک بافر نمونه با
+# اندازه ثابت دقیق محاسبه می‌شوند؛ P² (پنج نشانگر برای هر صدک) فقط برای بازه‌های بلند است، چون با
+# چند ده نمونه یک دقیقه خطای آن برای P95 تا حدود یک سوم دامنه بازه می‌رسد.
+# حافظه مستقل از تعداد نمونه‌هاست؛ بازه بسته‌شده به تابع on_bucket (لاگ یا تله‌متری) داده می‌شود.
+from array import array
+import math
+
+# مقادیری که از هر پنجره تجمیع می‌شوند (صفت‌های PowerResult کانال اول به علاوه rpm)
+METRICS = ('vrms', 'irms', 'p', 'pf', 'freq', 'rpm')
+# با چند کانال: این صفت‌ها برای هر کانال دیگر ('L2.p') و نتایج کل ChannelSet ('total.p')
+CHANNEL_METRICS = ('vrms', 'irms', 'p', 'pf')
+TOTAL_METRICS = ('p', 'q', 's', 'pf')
+PERCENTILES = (0.5, 0.95)
+RESERVOIR_SIZE = 256       # نمونه‌های نگه‌داشته هر مقدار در بازه کوتاه (بیش از آن: زیرنمونه یکنواخت)
+RESERVOIR_MAX_MS = 600000  # بازه‌های تا این طول از بافر نمونه استفاده می‌کنند، بلندترها از P²
+
+
+def metric_names(channels=1):
+    """
+    نام مقادیر تجمیع‌شده برای تعداد کانال داده‌شده؛ شماره هر نام در فریم آمار تله‌متری همان
+    جایگاه آن در این فهرست است.
+
+    Args:
+        channels (int): تعداد کانال‌های ChannelSet.
+
+    Returns:
+        tuple: METRICS، سپس CHANNEL_METRICS کانال‌های دوم به بعد و در پایان TOTAL_METRICS.
+    """
+    if channels < 2:
+        return METRICS
+    names = list(METRICS)
+    for n in range(2, channels + 1):
+        names.extend(f"L{n}.{m}" for m in CHANNEL_METRICS)
+    names.extend(f"total.{m}" for m in TOTAL_METRICS)
+    return tuple(names)
+
+
+class P2Quantile:
+    """تخمین یک صدک با الگوریتم P² (Jain و Chlamtac) بدون نگه داشتن نمونه‌ها."""
+    __slots__ = ('p', 'q', 'n', 'np', 'dn', 'count')
+
+    def __init__(self, p):
+        self.p = p
+        self.q = array('f', [0.0] * 5)   # ارتفاع نشانگرها
+        self.n = array('l', [0] * 5)     # موقعیت واقعی نشانگرها
+        self.np = array('f', [0.0] * 5)  # موقعیت مطلوب
+        self.dn = array('f', [0.0, p / 2, p, (1 + p) / 2, 1.0])
+        self.count = 0
+
+    def reset(self):
+        self.count = 0
+
+    def add(self, x):
+        q = self.q
+        c = self.count
+        self.count = c + 1
+        if c < 5:
+            # پنج نمونه اول مرتب‌شده نگه داشته می‌شوند
+            k = c
+            while k and q[k - 1] > x:
+                q[k] = q[k - 1]
+                k -= 1
+            q[k] = x
+            if c == 4:
+                p = self.p
+                for i in range(5):
+                    self.n[i] = i
+                self.np[0] = 0.0
+                self.np[1] = 2 * p
+                self.np[2] = 4 * p
+                self.np[3] = 2 + 2 * p
+                self.np[4] = 4.0
+            return
+        n = self.n
+        np = self.np
+        dn = self.dn
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            np[i] += dn[i]
+        # جابه‌جایی نشانگرهای میانی به سمت موقعیت مطلوب (سهمی، یا خطی اگر سهمی از ترتیب خارج شود)
+        for i in range(1, 4):
+            d = np[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                s = 1 if d > 0 else -1
+                a = n[i - 1]
+                b = n[i]
+                c = n[i + 1]
+                qp = q[i] + s / (c - a) * ((b - a + s) * (q[i + 1] - q[i]) / (c - b)
+                                           + (c - b - s) * (q[i] - q[i - 1]) / (b - a))
+                if not q[i - 1] < qp < q[i + 1]:
+                    qp = q[i] + s * (q[i + s] - q[i]) / (n[i + s] - b)
+                q[i] = qp
+                n[i] = b + s
+
+    def value(self):
+        c = self.count
+        if not c:
+            return 0.0
+        if c <= 5:
+            # تا پنج نمونه، صدک از نمونه‌های مرتب‌شده (نزدیک‌ترین رتبه)
+            return self.q[min(c - 1, int(self.p * c))]
+        return self.q[2]
+
+
+class Reservoir:
+    """
+    نمونه‌های یک بازه کوتاه در بافر از پیش تخصیص‌یافته؛ صدک‌ها تا capacity نمونه دقیق‌اند و پس از
+    آن از یک زیرنمونه یکنواخت (reservoir sampling) به دست می‌آیند.
+    """
+    __slots__ = ('data', 'count', 'seed', '_sorted')
+
+    def __init__(self, capacity=RESERVOIR_SIZE):
+        self.data = array('f', [0.0] * capacity)
+        self.seed = 1
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self._sorted = None
+
+    def add(self, x):
+        c = self.count
+        self.count = c + 1
+        self._sorted = None
+        data = self.data
+        if c < len(data):
+            data[c] = x
+            return
+        # مولد همنهشتی کوچک (ZX81) تا ضرب از عدد صحیح کوچک MicroPython بیرون نزند
+        self.seed = (self.seed * 75 + 74) % 65537
+        j = self.seed % (c + 1)
+        if j < len(data):
+            data[j] = x
+
+    def quantile(self, p):
+        """صدک p با نزدیک‌ترین رتبه؛ مرتب‌سازی فقط یک بار پس از آخرین add (هنگام بسته شدن بازه)."""
+        n = min(self.count, len(self.data))
+        if not n:
+            return 0.0
+        if self._sorted is None:
+            self._sorted = sorted(self.data[:n])
+        return self._sorted[min(n - 1, int(p * n))]
+
+
+class ReservoirQuantile:
+    """یک صدک از Reservoir مشترک با همان رابط P2Quantile.value()."""
+    __slots__ = ('reservoir', 'p')
+
+    def __init__(self, reservoir, p):
+        self.reservoir = reservoir
+        self.p = p
+
+    def value(self):
+        return self.reservoir.quantile(self.p)
+
+
+class Stat:
+    """آمار یک مقدار در یک بازه: تعداد، کمینه، بیشینه، میانگین، انحراف معیار و صدک‌ها."""
+    __slots__ = ('count', 'min', 'max', 'mean', '_m2', 'quantiles', 'reservoir')
+
+    def __init__(self, percentiles=PERCENTILES, reservoir_size=0):
+        """
+        Args:
+            percentiles (tuple): صدک‌های این مقدار.
+            reservoir_size (int): اندازه بافر نمونه برای صدک‌های دقیق (بازه کوتاه)؛ 0: تخمین P².
+        """
+        if reservoir_size:
+            self.reservoir = Reservoir(reservoir_size)
+            self.quantiles = [ReservoirQuantile(self.reservoir, p) for p in percentiles]
+        else:
+            self.reservoir = None
+            self.quantiles = [P2Quantile(p) for p in percentiles]
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.min = self.max = self.mean = self._m2 = 0.0
+        if self.reservoir:
+            self.reservoir.reset()
+        else:
+            for est in self.quantiles:
+                est.reset()
+
+    def add(self, x):
+        c = self.count + 1
+        self.count = c
+        if c == 1:
+            self.min = self.max = x
+        elif x < self.min:
+            self.min = x
+        elif x > self.max:
+            self.max = x
+        # Welford: میانگین و مجموع مربعات انحراف بدون خطای تفریق اعداد بزرگ
+        d = x - self.mean
+        self.mean += d / c
+        self._m2 += d * (x - self.mean)
+        if self.reservoir:
+            self.reservoir.add(x)
+        else:
+            for est in self.quantiles:
+                est.add(x)
+
+    @property
+    def std(self):
+        return math.sqrt(self._m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def percentile(self, index):
+        return self.quantiles[index].value()
+
+
+class Aggregator:
+    """چند لایه بازه (مثلاً دقیقه و ساعت) که هر کدام برای هر مقدار یک Stat دارند."""
+
+    def __init__(self, ticks_ms, ticks_diff, buckets_ms=(60000, 3600000), metrics=METRICS,
+                 percentiles=PERCENTILES, on_bucket=None, reservoir_max_ms=RESERVOIR_MAX_MS,
+                 reservoir_size=RESERVOIR_SIZE):
+        """
+        Args:
+            ticks_ms (callable): تابع زمان میلی‌ثانیه (time.ticks_ms).
+            ticks_diff (callable): تابع اختلاف زمان (time.ticks_diff).
+            buckets_ms (tuple): طول بازه هر لایه؛ هر لایه مستقیماً از نمونه‌ها تغذیه می‌شود
+                تا صدک‌ها هم برای بازه‌های بلند معتبر باشند.
+            metrics (tuple): نام مقادیر: صفت‌های PowerResult، 'rpm'، 'L<n>.<صفت>' برای کانال n
+                و 'total.<صفت>' برای نتایج کل ChannelSet (metric_names).
+            percentiles (tuple): صدک‌های تخمینی هر مقدار.
+            on_bucket (callable): فراخوانی با (طول بازه، شماره مقدار، نام، Stat، زمان پایان)
+                برای هر مقدار هنگام بسته شدن بازه؛ Stat پس از بازگشت پاک می‌شود.
+            reservoir_max_ms (int): لایه‌های تا این طول صدک را از بافر نمونه حساب می‌کنند.
+            reservoir_size (int): اندازه بافر نمونه هر مقدار در این لایه‌ها.
+        """
+        if not buckets_ms or not metrics:
+            raise ValueError("حداقل یک بازه و یک مقدار لازم است.")
+        self.ticks_ms = ticks_ms
+        self.ticks_diff = ticks_diff
+        self.buckets_ms = tuple(buckets_ms)
+        self.metrics = tuple(metrics)
+        # منبع هر مقدار یک بار تعیین می‌شود: (-2: rpm، -1: کل، k: نتیجه کانال k، None: result)
+        sources = []
+        for name in self.metrics:
+            if name == 'rpm':
+                sources.append((-2, name))
+            elif '.' in name:
+                prefix, attr = name.split('.')
+                sources.append((-1 if prefix == 'total' else int(prefix[1:]) - 1, attr))
+            else:
+                sources.append((None, name))
+        self._sources = tuple(sources)
+        self.on_bucket = on_bucket
+        now = ticks_ms()
+        self.tiers = [[Stat(percentiles, reservoir_size if span <= reservoir_max_ms else 0) for _ in self.metrics]
+                      for span in self.buckets_ms]
+        self.started = [now] * len(self.buckets_ms)
+        self.closed = 0
+
+    def update(self, result, rpm=0, channels=None):
+        """
+        ورود نتیجه یک پنجره و RPM؛ بازه‌های تمام‌شده پیش از افزودن بسته می‌شوند.
+
+        Args:
+            result: PowerResult کانال اول.
+            rpm (int): RPM همان لحظه.
+            channels: ChannelSet برای مقادیر 'L<n>.' و 'total.' (لازم فقط اگر چنین مقداری باشد).
+        """
+        now = self.ticks_ms()
+        for t in range(len(self.buckets_ms)):
+            if self.ticks_diff(now, self.started[t]) >= self.buckets_ms[t]:
+                self.close(t, now)
+        sources = self._sources
+        for m in range(len(sources)):
+            source, name = sources[m]
+            if source is None:
+                value = getattr(result, name)
+            elif source == -2:
+                value = rpm
+            elif source == -1:
+                value = getattr(channels, name)
+            else:
+                value = getattr(channels.results[source], name)
+            for stats in self.tiers:
+                stats[m].add(value)
+
+    def close(self, tier, now=None):
+        """بستن بازه جاری یک لایه، تحویل آمار به on_bucket و شروع بازه بعد."""
+        if now is None:
+            now = self.ticks_ms()
+        span = self.buckets_ms[tier]
+        for m, stat in enumerate(self.tiers[tier]):
+            if stat.count and self.on_bucket:
+                try:
+                    self.on_bucket(span, m, self.metrics[m], stat, now)
+                except Exception as e:
+                    print(f"خطا در ارسال آمار بازه: {e}")
+            stat.reset()
+        # مرز بازه بعد از مرز قبلی حساب می‌شود تا بازه‌ها جابه‌جا نشوند (مگر پس از وقفه طولانی)
+        start = self.started[tier] + span
+        self.started[tier] = start if self.ticks_diff(now, start) < span else now
+        self.closed += 1
+
+
+class CsvLog:
+    """نوشتن بازه‌های بسته‌شده در یک فایل CSV با سقف اندازه (فایل قبلی با پسوند .old نگه داشته می‌شود)."""
+
+    def __init__(self, path='/agg.csv', max_bytes=65536):
+        self.path = path
+        self.max_bytes = max_bytes
+
+    def __call__(self, span_ms, index, name, stat, end_ms):
+        import os
+        try:
+            if os.stat(self.path)[6] >= self.max_bytes:
+                os.rename(self.path, self.path + '.old')
+        except OSError:
+            pass  # فایل هنوز ساخته نشده است
+        line = f"{end_ms},{span_ms // 1000},{name},{stat.count},{stat.min:.4g},{stat.max:.4g}," \
+               f"{stat.mean:.4g},{stat.std:.4g},{','.join(f'{e.value():.4g}' for e in stat.quantiles)}\n"
+        with open(self.path, 'a') as f:
+            f.write(line)
@@ -0,0 +1,148 @@
+#Waveform capture / trigger buffer
+# ضبط شکل موج خام (شمارش ADC) پیش و پس از یک رویداد و ذخیره فشرده در فلش
+# در حالت عادی فقط جای دو بافر عوض می‌شود (O(1))؛ کپی فقط هنگام تریگر انجام می‌شود.
+import struct
+from array import array
+
+MAGIC = b'WCAP'
+VERSION = 2
+# magic، نسخه، کانال، کد رویداد، رزرو، نمونه‌های پیش، نمونه‌های پنجره تریگر، نمونه‌های پس،
+# فاصله واقعی دو نمونه پنجره تریگر (us، ChannelSet.period_us)، ضریب PT، ضریب CT، زمان تریگر (ms)،
+# فاصله شروع بخش پیش و بخش پس از شروع پنجره تریگر (us)
+HEADER = '<4sBBBBHHHfffLll'
+HEADER_SIZE = struct.calcsize(HEADER)
+# نسخه ۱: فاصله اسمی sample_interval_us به صورت عدد صحیح (فقط برای خواندن فایل‌های قدیمی روی میزبان)
+HEADER_V1 = '<4sBBBBHHHHffLll'
+
+# وضعیت‌ها
+ARMED = 0    # آماده، منتظر تریگر
+POST = 1     # پنجره تریگر گرفته شد، منتظر پنجره بعد
+FROZEN = 2   # ضبط کامل؛ تا ذخیره شدن تریگر جدید پذیرفته نمی‌شود
+
+
+def _ticks_diff(a, b):
+    """اختلاف دو زمان ۳۰ بیتی با در نظر گرفتن سرریز (مثل time.ticks_diff)"""
+    return ((a - b + 0x20000000) & 0x3FFFFFFF) - 0x20000000
+
+
+class WaveformCapture:
+    """بافر ضبط پیش/پس از تریگر برای یک کانال از ChannelSet."""
+
+    def __init__(self, channel_set, channel_index=0, pre_samples=500, post_samples=500,
+                 path_prefix='/cap_', max_files=4, ticks_ms=None):
+        """
+        Args:
+            channel_set: شیء ChannelSet که پنجره‌ها را نمونه‌برداری می‌کند.
+            channel_index (int): شماره کانالی که ضبط می‌شود.
+            pre_samples (int): تعداد نمونه‌های انتهای پنجره قبل از تریگر.
+            post_samples (int): تعداد نمونه‌های ابتدای پنجره بعد از تریگر.
+            path_prefix (str): پیشوند نام فایل‌های ضبط روی فلش.
+            max_files (int): حداکثر تعداد فایل؛ قدیمی‌ترین بازنویسی می‌شود.
+            ticks_ms (callable): تابع زمان میلی‌ثانیه برای زمان تریگر.
+        """
+        # بافرها به اندازه ظرفیت بافر کانال تخصیص می‌یابند تا طول پنجره بتواند تغییر کند
+        n = len(channel_set.channels[channel_index].v)
+        if not 0 <= pre_samples <= n or not 0 <= post_samples <= n:
+            raise ValueError("تعداد نمونه‌های پیش/پس از طول پنجره بیشتر است.")
+        self.channel_set = channel_set
+        self.channel_index = channel_index
+        self.channel = channel_set.channels[channel_index]
+        self.pre_samples = pre_samples
+        self.post_samples = post_samples
+        self.path_prefix = path_prefix
+        self.max_files = max_files
+        self.ticks_ms = ticks_ms
+        # بافر پنجره قبل؛ جای آن با بافر کانال عوض می‌شود، کپی نمی‌شود
+        self._prev_v = array('H', [0] * n)
+        self._prev_i = array('H', [0] * n)
+        self._prev_started = 0
+        self._prev_count = 0
+        self._prev_period = 0.0
+        # بافر ضبط: [پیش | پنجره تریگر | پس]
+        total = pre_samples + n + post_samples
+        self.v = array('H', [0] * total)
+        self.i = array('H', [0] * total)
+        self.state = ARMED
+        self.window = 0  # طول پنجره تریگر
+        self.pre_count = 0  # تعداد نمونه‌های پیش و پس واقعاً ضبط‌شده
+        self.post_count = 0
+        self.code = 0
+        self.time_ms = 0
+        self.period_us = 0.0  # فاصله واقعی نمونه‌های پنجره تریگر
+        self.pre_offset_us = 0
+        self.post_offset_us = 0
+        self._pending = False
+        self._trigger_started = 0
+        self.file_index = 0
+        self.saved = 0
+
+    def trigger(self, code=0):
+        """درخواست ضبط؛ در پایان پنجره جاری اعمال می‌شود (ایمن برای فراخوانی از callback)."""
+        if self.state == ARMED and not self._pending:
+            self.code = code
+            self._pending = True
+
+    def after_window(self):
+        """
+        بعد از پردازش هر پنجره فراخوانی شود. در حالت عادی فقط بافر کانال و بافر
+        پنجره قبل جابه‌جا می‌شوند تا پنجره بعدی روی بافر قدیمی نوشته شود.
+        """
+        cs = self.channel_set
+        ch = self.channel
+        n = cs.sample_count
+        # فاصله اندازه‌گیری‌شده (با زمان خواندن ADC)؛ فاصله اسمی sample_interval_us کوتاه‌تر است
+        period = cs.period_us
+        if self.state == ARMED and self._pending:
+            self._pending = False
+            # طول پنجره‌ها ممکن است متفاوت باشد (زمان‌بندی تطبیقی)
+            prev = self._prev_count
+            pre = min(self.pre_samples, prev)
+            mv = memoryview(self.v)
+            mi = memoryview(self.i)
+            mv[0:pre] = memoryview(self._prev_v)[prev - pre:prev]
+            mi[0:pre] = memoryview(self._prev_i)[prev - pre:prev]
+            mv[pre:pre + n] = memoryview(ch.v)[0:n]
+            mi[pre:pre + n] = memoryview(ch.i)[0:n]
+            self.pre_count = pre
+            self.window = n
+            self._trigger_started = cs.started_us
+            self.period_us = period
+            self.pre_offset_us = _ticks_diff(self._prev_started, cs.started_us) + \
+                int((prev - pre) * self._prev_period + 0.5)
+            if self.ticks_ms:
+                self.time_ms = self.ticks_ms()
+            self.post_count = 0
+            self.state = POST if self.post_samples else FROZEN
+        elif self.state == POST:
+            post = min(self.post_samples, n)
+            start = self.pre_count + self.window
+            memoryview(self.v)[start:start + post] = memoryview(ch.v)[0:post]
+            memoryview(self.i)[start:start + post] = memoryview(ch.i)[0:post]
+            self.post_count = post
+            self.post_offset_us = _ticks_diff(cs.started_us, self._trigger_started)
+            self.state = FROZEN
+        # جابه‌جایی O(1) بافرها
+        ch.v, self._prev_v = self._prev_v, ch.v
+        ch.i, self._prev_i = self._prev_i, ch.i
+        self._prev_started = cs.started_us
+        self._prev_count = n
+        self._prev_period = period
+
+    def save(self):
+        """ذخیره ضبط منجمد در فلش و آماده‌سازی دوباره؛ نام فایل ذخیره‌شده را برمی‌گرداند."""
+        if self.state != FROZEN:
+            return None
+        path = f"{self.path_prefix}{self.file_index:03d}.bin"
+        header = struct.pack(HEADER, MAGIC, VERSION, self.channel_index, self.code & 0xFF, 0,
+                             self.pre_count, self.window, self.post_count, self.period_us,
+                             self.channel.pt_scale, self.channel.ct_scale, self.time_ms & 0xFFFFFFFF,
+                             self.pre_offset_us, self.post_offset_us)
+        total = self.pre_count + self.window + self.post_count
+        with open(path, 'wb') as f:
+            f.write(header)
+            f.write(memoryview(self.v)[0:total])
+            f.write(memoryview(self.i)[0:total])
+        self.file_index = (self.file_index + 1) % self.max_files
+        self.saved += 1
+        self.state = ARMED
+        return path
@@ -0,0 +1,90 @@
+#Load signature classifier
+# تشخیص حالت کار (مثلاً دور تند/کند موتور یا خاموش/روشن بودن وسیله) از ویژگی‌های هر پنجره با
+# روش نزدیک‌ترین مرکز روی ویژگی‌های استانداردشده. مدل روی میزبان از داده ثبت‌شده ساخته می‌شود
+# (host/train_classifier.py) و به صورت dict یا فایل JSON بارگذاری می‌شود.
+from array import array
+import json
+
+# ویژگی‌ها صفت‌های PowerResult (مثل irms، p، pf، dpf، crest_i) یا 'rpm' هستند
+MODEL_KEYS = ('features', 'labels', 'center', 'scale', 'centroids')
+
+
+def load_model(path):
+    """خواندن مدل JSON ساخته‌شده با host/train_classifier.py"""
+    with open(path) as f:
+        return json.load(f)
+
+
+class LoadClassifier:
+    """طبقه‌بند نزدیک‌ترین مرکز با پسماند برای جلوگیری از پرش حالت نزدیک مرز."""
+
+    def __init__(self, model, hysteresis=0.1):
+        """
+        Args:
+            model (dict): کلیدهای MODEL_KEYS؛ center و scale برای استانداردسازی هر ویژگی و
+                centroids مرکز هر برچسب در فضای استانداردشده.
+            hysteresis (float): حالت فقط وقتی عوض می‌شود که مربع فاصله تا مرکز جدید حداقل
+                این نسبت از فاصله تا مرکز حالت فعلی کمتر باشد.
+        """
+        for key in MODEL_KEYS:
+            if key not in model:
+                raise ValueError(f"مدل کلید {key} ندارد.")
+        self.features = tuple(model['features'])
+        self.labels = tuple(model['labels'])
+        n = len(self.features)
+        if not n or len(model['center']) != n or len(model['scale']) != n:
+            raise ValueError("تعداد ویژگی‌ها و center/scale مدل یکسان نیست.")
+        if len(model['centroids']) != len(self.labels) or any(len(c) != n for c in model['centroids']):
+            raise ValueError("برای هر برچسب یک مرکز با همه ویژگی‌ها لازم است.")
+        self.hysteresis = hysteresis
+        self._center = array('f', model['center'])
+        # ضرب به جای تقسیم در هر پنجره
+        self._inv_scale = array('f', [1.0 / s if s else 0.0 for s in model['scale']])
+        self._centroids = array('f', [x for c in model['centroids'] for x in c])
+        self._x = array('f', [0.0] * n)
+        self._d = array('f', [0.0] * len(self.labels))
+        self.index = -1  # حالت فعلی (-1: هنوز تشخیص داده نشده)
+        self.changes = 0
+
+    @property
+    def label(self):
+        return self.labels[self.index] if self.index >= 0 else None
+
+    def classify(self, result, rpm=0):
+        """
+        تشخیص حالت پنجره جاری (بدون تخصیص حافظه).
+
+        Args:
+            result: PowerResult خام (پیش از اصلاح تجربی که خودش به این حالت وابسته است).
+            rpm (int): RPM هموارشده.
+
+        Returns:
+            str: برچسب حالت.
+        """
+        x = self._x
+        center = self._center
+        inv = self._inv_scale
+        features = self.features
+        n = len(x)
+        for k in range(n):
+            name = features[k]
+            x[k] = ((rpm if name == 'rpm' else getattr(result, name)) - center[k]) * inv[k]
+        c = self._centroids
+        d = self._d
+        best = 0
+        base = 0
+        for j in range(len(d)):
+            s = 0.0
+            for k in range(n):
+                e = x[k] - c[base + k]
+                s += e * e
+            d[j] = s
+            if s < d[best]:
+                best = j
+            base += n
+        cur = self.index
+        if cur < 0 or (best != cur and d[best] < d[cur] * (1.0 - self.hysteresis)):
+            if cur != best:
+                self.changes += 1
+            self.index = best
+        return self.labels[self.index]
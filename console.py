@@ -0,0 +1,302 @@
+#Serial command console for runtime configuration
+# کنسول فرمان غیرمسدودکننده روی REPL یا UART: خواندن نویسه‌های موجود بین پنجره‌ها با سقف زمانی،
+# ثبت تغییرات به صورت معلق و اعمال همه با هم در مرز پنجره، و ذخیره تنظیمات در فایل json
+#
+# فرمان‌ها (هر خط یک فرمان):
+#   get [name]          مقدار فعلی (و مقدار معلق) پارامترها
+#   set name value      ثبت مقدار جدید؛ در مرز پنجره بعدی اعمال می‌شود
+#   save                ذخیره مقادیر (پس از اعمال تغییرات معلق) در فایل تنظیمات
+#   reset [name]        بازگشت به مقدار پیش‌فرض (برای ماندگاری باید save شود)
+#   help                فهرست پارامترها و بازه مجاز
+# و فرمان‌های فقط‌خواندنی که برنامه با add_command ثبت می‌کند (مثلاً events در monitor.py)
+import json
+
+MAX_LINE = 80          # طولانی‌ترین خط فرمان
+POLL_BUDGET_US = 2000  # سقف زمان خواندن ورودی در هر poll
+_TRUE = ('1', 'on', 'true', 'yes')
+_FALSE = ('0', 'off', 'false', 'no')
+
+
+class Param:
+    """یک پارامتر قابل تنظیم با نوع، بازه مجاز و تابع اعمال."""
+    __slots__ = ('name', 'kind', 'default', 'value', 'lo', 'hi', 'apply')
+
+    def __init__(self, name, default, lo=None, hi=None, apply=None):
+        self.name = name
+        self.kind = type(default)
+        self.default = default
+        self.value = default
+        self.lo = lo
+        self.hi = hi
+        self.apply = apply
+
+    def parse(self, text):
+        """تبدیل و بررسی بازه؛ ValueError برای مقدار نامعتبر"""
+        if self.kind is bool:
+            if isinstance(text, bool):
+                return text
+            t = str(text).lower()
+            if t in _TRUE:
+                return True
+            if t in _FALSE:
+                return False
+            raise ValueError(f"مقدار منطقی نامعتبر: {text}")
+        value = self.kind(text)
+        if (self.lo is not None and value < self.lo) or (self.hi is not None and value > self.hi):
+            raise ValueError(f"{self.name} باید بین {self.lo} و {self.hi} باشد.")
+        return value
+
+    def describe(self):
+        if self.kind is bool:
+            return f"{self.name} (on/off, پیش‌فرض {self.default})"
+        return f"{self.name} [{self.lo}..{self.hi}] (پیش‌فرض {self.default})"
+
+
+class Console:
+    """مفسر فرمان که با poll() بدون انتظار خوانده و با commit() در مرز پنجره اعمال می‌شود."""
+
+    def __init__(self, read, write=print, ticks_us=None, ticks_diff=None, path='/config.json',
+                 budget_us=POLL_BUDGET_US, max_line=MAX_LINE):
+        """
+        Args:
+            read (callable): خواندن یک نویسه بدون انتظار؛ None (یا b'') وقتی ورودی خالی است.
+                برای REPL: select.poll روی sys.stdin و sys.stdin.read(1)؛ برای UART: uart.read(1).
+            write (callable): نوشتن یک خط پاسخ (پیش‌فرض print).
+            ticks_us (callable): تابع زمان میکروثانیه برای سقف زمانی poll (اختیاری).
+            ticks_diff (callable): تابع اختلاف زمان.
+            path (str): فایل تنظیمات (None: بدون ذخیره).
+            budget_us (int): بیشینه زمان یک poll؛ نویسه‌های باقی‌مانده در poll بعد خوانده می‌شوند.
+            max_line (int): طولانی‌ترین خط فرمان؛ خط بلندتر دور ریخته می‌شود.
+        """
+        self.read = read
+        self.write = write
+        self.ticks_us = ticks_us
+        self.ticks_diff = ticks_diff
+        self.path = path
+        self.budget_us = budget_us
+        self.params = {}
+        self.extra = {}  # نام فرمان -> (تابع، راهنما)
+        self._pending = {}  # نام -> مقدار معلق تا commit بعدی
+        self._failed = False  # اعمال دسته معلق فعلی یک بار شکست خورده است (خطا دوباره چاپ نمی‌شود)
+        self._save = False
+        self._line = bytearray(max_line)
+        self._len = 0
+        self._overflow = False
+        self.commands = 0
+        self.errors = 0
+
+    def add(self, name, default, lo=None, hi=None, apply=None):
+        """
+        ثبت یک پارامتر؛ نوع (int، float یا bool) از مقدار پیش‌فرض گرفته می‌شود.
+
+        Args:
+            apply (callable): فراخوانی با مقدار جدید هنگام commit.
+        """
+        self.params[name] = Param(name, default, lo, hi, apply)
+
+    def add_command(self, name, handler, usage=''):
+        """
+        ثبت یک فرمان اضافه که در poll اجرا می‌شود و چیزی را تغییر نمی‌دهد.
+
+        Args:
+            name (str): نام فرمان (با حروف کوچک).
+            handler (callable): فراخوانی با فهرست آرگومان‌ها؛ متن پاسخ بدون 'OK' را برمی‌گرداند
+                و برای آرگومان نامعتبر ValueError می‌دهد.
+            usage (str): راهنمای فرمان برای help.
+        """
+        self.extra[name] = (handler, usage or name)
+
+    def get(self, name):
+        return self.params[name].value
+
+    # ------------------------------------------------------------ ذخیره‌سازی
+    def load(self):
+        """
+        خواندن فایل تنظیمات؛ مقادیر ذخیره‌شده معلق می‌شوند و در اولین commit اعمال می‌شوند.
+
+        Returns:
+            int: تعداد مقادیر خوانده‌شده.
+        """
+        if not self.path:
+            return 0
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return 0  # فایل وجود ندارد یا خراب است: مقادیر پیش‌فرض
+        count = 0
+        for name, value in saved.items():
+            param = self.params.get(name)
+            if param is None:
+                continue  # پارامتر حذف‌شده در نسخه جدید
+            try:
+                self._pending[name] = param.parse(value)
+                self._failed = False
+                count += 1
+            except (ValueError, TypeError) as e:
+                print(f"تنظیم ذخیره‌شده نامعتبر {name}: {e}")
+        return count
+
+    def save(self):
+        if not self.path:
+            return False
+        try:
+            with open(self.path, 'w') as f:
+                json.dump({name: p.value for name, p in self.params.items()}, f)
+            return True
+        except OSError as e:
+            print(f"خطا در ذخیره تنظیمات: {e}")
+            return False
+
+    # ------------------------------------------------------------ ورودی
+    def poll(self):
+        """
+        خواندن نویسه‌های موجود بدون انتظار و اجرای هر خط کامل.
+
+        Returns:
+            int: تعداد فرمان‌های اجراشده.
+        """
+        read = self.read
+        line = self._line
+        ticks_us = self.ticks_us
+        start = ticks_us() if ticks_us else 0
+        done = 0
+        for _ in range(2 * len(line)):
+            c = read()
+            if not c:
+                break
+            c = c[0] if isinstance(c, (bytes, bytearray)) else ord(c)
+            if c == 10 or c == 13:
+                if self._overflow:
+                    self._reply("ERR خط فرمان بیش از حد طولانی است.")
+                    self.errors += 1
+                elif self._len:
+                    try:
+                        text = bytes(line[:self._len]).decode()
+                    except UnicodeError:
+                        text = '?'
+                    self._reply(self.execute(text))
+                    done += 1
+                self._len = 0
+                self._overflow = False
+            elif c == 8 or c == 127:
+                if self._len:
+                    self._len -= 1
+            elif self._len < len(line):
+                line[self._len] = c
+                self._len += 1
+            else:
+                self._overflow = True
+            if ticks_us and self.ticks_diff(ticks_us(), start) >= self.budget_us:
+                break
+        return done
+
+    def _reply(self, text):
+        try:
+            self.write(text)
+        except Exception:
+            pass  # پاسخ از دست رفته نباید حلقه اندازه‌گیری را متوقف کند
+
+    # ------------------------------------------------------------ فرمان‌ها
+    def execute(self, line):
+        """اجرای یک خط فرمان و برگرداندن متن پاسخ ('OK ...' یا 'ERR ...')."""
+        parts = line.split()
+        if not parts:
+            return ''
+        self.commands += 1
+        cmd = parts[0].lower()
+        try:
+            if cmd == 'get':
+                return 'OK ' + ' '.join(self._show(name) for name in (parts[1:] or self.params))
+            if cmd == 'set':
+                if len(parts) != 3:
+                    raise ValueError("استفاده: set name value")
+                param = self._param(parts[1])
+                self._pending[param.name] = param.parse(parts[2])
+                self._failed = False
+                return f"OK {param.name}={self._pending[param.name]} (در پنجره بعد)"
+            if cmd == 'save':
+                self._save = True
+                return "OK ذخیره در پنجره بعد"
+            if cmd == 'reset':
+                for name in (parts[1:] or self.params):
+                    param = self._param(name)
+                    self._pending[param.name] = param.default
+                self._failed = False
+                return "OK مقادیر پیش‌فرض در پنجره بعد"
+            if cmd == 'help':
+                return 'OK ' + '; '.join([p.describe() for p in self.params.values()] +
+                                         [usage for _, usage in self.extra.values()])
+            if cmd in self.extra:
+                return 'OK ' + self.extra[cmd][0](parts[1:])
+            raise ValueError(f"فرمان ناشناخته: {cmd} (get/set/save/reset/help{''.join('/' + n for n in self.extra)})")
+        except ValueError as e:
+            self.errors += 1
+            return f"ERR {e}"
+
+    def _param(self, name):
+        param = self.params.get(name)
+        if param is None:
+            raise ValueError(f"پارامتر ناشناخته: {name}")
+        return param
+
+    def _show(self, name):
+        param = self._param(name)
+        if name in self._pending:
+            return f"{name}={param.value}->{self._pending[name]}"
+        return f"{name}={param.value}"
+
+    # ------------------------------------------------------------ مرز پنجره
+    def commit(self):
+        """
+        اعمال همه تغییرات معلق با هم (بین دو پنجره) و ذخیره در صورت درخواست.
+
+        دسته معلق یکجا اعمال می‌شود: ابتدا همه مقادیر بررسی می‌شوند و با یک مقدار نامعتبر هیچ‌کدام
+        اعمال نمی‌شود و دسته کنار گذاشته می‌شود. اگر اعمال یکی از آنها خطا دهد، پارامترهای
+        اعمال‌شده به مقدار قبلی برمی‌گردند و دسته (و درخواست save) برای commit بعدی معلق می‌ماند.
+
+        Returns:
+            int: تعداد پارامترهای اعمال‌شده.
+        """
+        applied = 0
+        if self._pending:
+            pending = self._pending
+            params = self.params
+            try:
+                for name, value in pending.items():
+                    params[name].parse(value)
+            except (ValueError, TypeError) as e:
+                self.errors += 1
+                self._pending = {}
+                self._save = False
+                self._reply(f"ERR تغییرات معلق اعمال نشد: {e}")
+                return 0
+            done = []
+            for name, value in pending.items():
+                param = params[name]
+                try:
+                    if param.apply:
+                        param.apply(value)
+                    done.append(param)
+                except Exception as e:
+                    # بازگرداندن پارامترهای اعمال‌شده به ترتیب عکس
+                    for old in reversed(done):
+                        try:
+                            if old.apply:
+                                old.apply(old.value)
+                        except Exception as e2:
+                            print(f"خطا در بازگرداندن {old.name}: {e2}")
+                    self.errors += 1
+                    if not self._failed:
+                        self._failed = True
+                        self._reply(f"ERR خطا در اعمال {name}: {e}؛ تغییرات معلق ماندند")
+                    return 0
+            for param in done:
+                param.value = pending[param.name]
+            applied = len(done)
+            self._pending = {}
+            self._failed = False
+        if self._save:
+            self._save = False
+            self._reply("OK ذخیره شد" if self.save() else "ERR ذخیره نشد")
+        return applied
@@ -3,19 +3,131 @@
 //
 // SPDX-License-Identifier: MIT
 // Copyright 2023 Ali Rashidi
+//
+// CT signal source: the load current as the ESP32 ADC sees it after the
+// current transformer, burden resistor and bias network, written to the ADC
+// pin as
+//   bias + gain(t) * amplitude * (sin + h3 * sin(3x) + h5 * sin(5x)) + noise
+// "phase" is the current lag behind the PT chip's voltage (same simulation
+// clock), so the displacement power factor is cos(phase - PT phase).
+//
+// Scenario presets (attribute/control "scenario"; the same timeline is used
+// in pt.chip.c and hall.chip.c, keep them in sync):
+//   0  steady: controls only
+//   1  load steps: light (30%) / heavy (100%) load every 10 s
+//   2  stall: 12 s running, 6 s locked rotor (current x4, lag 70 deg)
+//   3  start-up: 2 s off, inrush (current x6 decaying), speed ramp, 25 s run
+//   4  sag/swell: current follows the voltage (80% / 115% for 2 s every 20 s)
 
 #include "wokwi-api.h"
+#include <math.h>
 #include <stdio.h>
 #include <stdlib.h>
 
+#define TWO_PI 6.283185307f
+#define ADC_VMAX 3.3f
+
 typedef struct {
-  // TODO: Put your chip variables here
+  pin_t adc;
+  uint32_t amplitude;
+  uint32_t bias;
+  uint32_t frequency;
+  uint32_t phase;
+  uint32_t h3;
+  uint32_t h5;
+  uint32_t noise;
+  uint32_t scenario;
 } chip_state_t;
 
+// Approximately gaussian noise with the given RMS (sum of four uniforms)
+static float noise_sample(float rms) {
+  float sum = 0;
+  for (int k = 0; k < 4; k++) {
+    sum += (float)rand() / (float)RAND_MAX - 0.5f;
+  }
+  return sum * rms * 1.732f;
+}
+
+// Current scale of the scenario timeline at time t (seconds); *lag receives
+// the extra phase lag in degrees
+static float scenario_gain(uint32_t scenario, double t, float *lag) {
+  double s;
+  *lag = 0;
+  switch (scenario) {
+    case 1:
+      return fmod(t, 20.0) < 10.0 ? 0.3f : 1.0f;
+    case 2:
+      if (fmod(t, 18.0) < 12.0) {
+        return 1.0f;
+      }
+      *lag = 40.0f;  // a locked rotor is mostly inductive
+      return 4.0f;
+    case 3:
+      s = fmod(t, 30.0);
+      if (s < 2.0) {
+        return 0.0f;
+      }
+      if (s < 5.0) {
+        // inrush: 6x at switch-on, decaying to the running current over the speed ramp
+        *lag = 30.0f * (float)(5.0 - s) / 3.0f;
+        return 1.0f + 5.0f * (float)exp(-(s - 2.0) * 1.5);
+      }
+      return 1.0f;
+    case 4:
+      s = fmod(t, 20.0);
+      if (s < 2.0) {
+        return 0.80f;
+      }
+      if (s >= 10.0 && s < 12.0) {
+        return 1.15f;
+      }
+      return 1.0f;
+    default:
+      return 1.0f;
+  }
+}
+
+static void on_tick(void *user_data) {
+  chip_state_t *chip = (chip_state_t *)user_data;
+  double t = get_sim_nanos() * 1e-9;
+  float lag;
+  float gain = scenario_gain(attr_read(chip->scenario), t, &lag);
+  float x = (float)fmod(t * attr_read_float(chip->frequency), 1.0) * TWO_PI
+            - (attr_read_float(chip->phase) + lag) * (TWO_PI / 360.0f);
+  float wave = sinf(x) + attr_read_float(chip->h3) * sinf(3 * x) + attr_read_float(chip->h5) * sinf(5 * x);
+  float v = attr_read_float(chip->bias) + gain * attr_read_float(chip->amplitude) * wave
+            + noise_sample(attr_read_float(chip->noise));
+  // A large inrush or locked-rotor current clips at the ADC rails, like the real front-end
+  if (v < 0) {
+    v = 0;
+  } else if (v > ADC_VMAX) {
+    v = ADC_VMAX;
+  }
+  pin_dac_write(chip->adc, v);
+}
+
 void chip_init() {
   chip_state_t *chip = malloc(sizeof(chip_state_t));
 
-  // TODO: Initialize the chip, set up IO pins, create timers, etc.
+  chip->adc = pin_init("ADC", ANALOG);
+  chip->amplitude = attr_init_float("amplitude", 0.4);  // V peak at the ADC pin
+  chip->bias = attr_init_float("bias", 1.65);           // V, half the 3.3 V supply
+  chip->frequency = attr_init_float("frequency", 50.0);
+  chip->phase = attr_init_float("phase", 30.0);         // degrees of lag behind the voltage
+  chip->h3 = attr_init_float("h3", 0.05);               // 3rd harmonic, fraction of the fundamental
+  chip->h5 = attr_init_float("h5", 0.02);
+  chip->noise = attr_init_float("noise", 0.004);        // V RMS
+  chip->scenario = attr_init("scenario", 0);
+
+  // Updating faster than the firmware samples (100 us) keeps the ADC
+  // reading a fresh value at every sample
+  const timer_config_t config = {
+    .callback = on_tick,
+    .user_data = chip,
+  };
+  timer_t timer = timer_init(&config);
+  timer_start(timer, attr_read(attr_init("update_us", 50)), true);
 
-  printf("Hello from custom chip!\n");
+  printf("CT source: %.2f V peak on %.2f V bias, lag %.0f deg, scenario %u\n", attr_read_float(chip->amplitude),
+         attr_read_float(chip->bias), attr_read_float(chip->phase), attr_read(chip->scenario));
 }
@@ -0,0 +1,222 @@
+#Event and anomaly detection stage
+# موتور رویداد: بررسی نتایج calculate_power هر کانال و RPM با آستانه، هیسترزیس و دیبانس،
+# روشن نگه داشتن خروجی هشدار تا وقتی رویدادی فعال است و گزارش حلقوی فشرده رویدادها در RAM.
+from array import array
+
+# اندیس مقادیر ورودی
+VRMS = 0
+IRMS = 1
+POWER = 2
+PF = 3
+RPM = 4
+_VALUE_COUNT = 5
+
+# نوع شرط
+ABOVE = 0  # فعال وقتی مقدار از حد بالاتر برود
+BELOW = 1  # فعال وقتی مقدار از حد پایین‌تر برود
+
+# کدهای رویداد
+EV_UNDERVOLTAGE = 1
+EV_OVERVOLTAGE = 2
+EV_OVERCURRENT = 3
+EV_STALL = 4
+EV_LOW_PF = 5
+
+# نام کوتاه رویدادها برای LCD (حداکثر ۵ کاراکتر)
+EVENT_NAMES = {
+    EV_UNDERVOLTAGE: 'SAG',
+    EV_OVERVOLTAGE: 'SWELL',
+    EV_OVERCURRENT: 'OC',
+    EV_STALL: 'STALL',
+    EV_LOW_PF: 'LOWPF',
+}
+
+# آستانه‌های پیش‌فرض؛ هر کدام با پارامتر thresholds در EventEngine قابل تغییر است
+DEFAULT_THRESHOLDS = {
+    'sag_v': 190.0,         # ولتاژ زیر این مقدار: افت ولتاژ
+    'swell_v': 250.0,       # ولتاژ بالای این مقدار: اضافه ولتاژ
+    'v_hysteresis': 5.0,
+    'overcurrent_a': 6.0,
+    'i_hysteresis': 0.3,
+    'stall_rpm': 1,         # RPM زیر این مقدار ...
+    'stall_current_a': 0.5,  # ... در حالی که جریان بیشتر از این است: توقف موتور
+    'low_pf': 0.5,
+    'pf_hysteresis': 0.05,
+    'debounce': 3,          # تعداد ارزیابی‌های متوالی لازم برای فعال/غیرفعال شدن
+}
+
+
+class Rule:
+    """یک شرط آستانه‌ای با هیسترزیس، دیبانس و شرط محافظ اختیاری."""
+    __slots__ = ('code', 'key', 'mode', 'limit', 'hysteresis', 'debounce',
+                 'guard_key', 'guard_min', 'active', 'counter')
+
+    def __init__(self, code, key, mode, limit, hysteresis=0.0, debounce=3, guard_key=-1, guard_min=0.0):
+        """
+        Args:
+            code (int): کد رویداد.
+            key (int): اندیس مقدار بررسی‌شونده (VRMS، IRMS، ...).
+            mode (int): ABOVE یا BELOW.
+            limit (float): حد فعال شدن.
+            hysteresis (float): فاصله حد غیرفعال شدن از حد فعال شدن.
+            debounce (int): تعداد ارزیابی‌های متوالی لازم برای تغییر وضعیت.
+            guard_key (int): اندیس مقداری که باید بالاتر از guard_min باشد تا شرط معتبر باشد (-1: بدون محافظ).
+            guard_min (float): حد شرط محافظ.
+        """
+        self.code = code
+        self.key = key
+        self.mode = mode
+        self.limit = limit
+        self.hysteresis = hysteresis
+        self.debounce = debounce
+        self.guard_key = guard_key
+        self.guard_min = guard_min
+        self.active = False
+        self.counter = 0
+
+    def evaluate(self, values):
+        """بررسی شرط؛ True برمی‌گرداند اگر وضعیت تغییر کرده باشد."""
+        value = values[self.key]
+        if self.active:
+            # برای غیرفعال شدن، مقدار باید به اندازه هیسترزیس از حد عبور کند
+            if self.mode == ABOVE:
+                hit = value > self.limit - self.hysteresis
+            else:
+                hit = value < self.limit + self.hysteresis
+        elif self.mode == ABOVE:
+            hit = value > self.limit
+        else:
+            hit = value < self.limit
+        if hit and self.guard_key >= 0 and values[self.guard_key] <= self.guard_min:
+            hit = False
+        if hit == self.active:
+            self.counter = 0
+            return False
+        self.counter += 1
+        if self.counter < self.debounce:
+            return False
+        self.counter = 0
+        self.active = hit
+        return True
+
+
+class EventLog:
+    """گزارش رویداد فشرده در یک بافر حلقوی از پیش تخصیص‌یافته."""
+
+    def __init__(self, size=64):
+        self.size = size
+        self.times = array('L', [0] * size)
+        # بیت ۷: ۱ = فعال شدن، ۰ = رفع شدن؛ بیت‌های ۴ تا ۶: شماره کانال؛ بیت‌های ۰ تا ۳: کد
+        self.codes = bytearray(size)
+        self.values = array('f', [0.0] * size)
+        self.index = 0
+        self.count = 0
+
+    def append(self, time_ms, code, raised, value, channel=0):
+        i = self.index
+        self.times[i] = time_ms & 0x3FFFFFFF
+        self.codes[i] = code | (channel & 0x07) << 4 | (0x80 if raised else 0)
+        self.values[i] = value
+        self.index = (i + 1) % self.size
+        if self.count < self.size:
+            self.count += 1
+
+    def entries(self):
+        """رویدادها از قدیمی به جدید به صورت (زمان، کد، فعال‌شدن، مقدار، کانال)."""
+        start = (self.index - self.count) % self.size
+        for n in range(self.count):
+            i = (start + n) % self.size
+            c = self.codes[i]
+            yield self.times[i], c & 0x0F, bool(c & 0x80), self.values[i], (c >> 4) & 0x07
+
+
+class EventEngine:
+    """ارزیابی قوانین روی هر نتیجه توان (هر کانال جداگانه) و هر به‌روزرسانی RPM."""
+
+    def __init__(self, ticks_ms, thresholds=None, log_size=64, alarm_pin=None, on_event=None, channels=1):
+        """
+        Args:
+            ticks_ms (callable): تابع زمان میلی‌ثانیه (روی برد time.ticks_ms).
+            thresholds (dict): تغییرات نسبت به DEFAULT_THRESHOLDS.
+            log_size (int): ظرفیت گزارش رویداد.
+            alarm_pin: پین خروجی هشدار؛ تا وقتی رویدادی فعال است ۱ می‌ماند.
+            on_event (callable): فراخوانی با (کد، فعال‌شدن، مقدار، کانال) هنگام تغییر وضعیت.
+            channels (int): تعداد کانال‌های اندازه‌گیری (حداکثر ۸)؛ هر کانال قوانین توان خودش را دارد.
+        """
+        if not 1 <= channels <= 8:
+            raise ValueError("تعداد کانال‌ها باید بین ۱ و ۸ باشد.")
+        t = dict(DEFAULT_THRESHOLDS)
+        if thresholds:
+            t.update(thresholds)
+        self.thresholds = t
+        self.ticks_ms = ticks_ms
+        self.log = EventLog(log_size)
+        self.alarm_pin = alarm_pin
+        self.on_event = on_event
+        # مقادیر و قوانین توان جدا برای هر کانال؛ RPM و قانون توقف فقط روی کانال اول
+        self.channel_values = [[0.0] * _VALUE_COUNT for _ in range(channels)]
+        self.values = self.channel_values[0]
+        d = t['debounce']
+        self.channel_rules = tuple((
+            Rule(EV_UNDERVOLTAGE, VRMS, BELOW, t['sag_v'], t['v_hysteresis'], d),
+            Rule(EV_OVERVOLTAGE, VRMS, ABOVE, t['swell_v'], t['v_hysteresis'], d),
+            Rule(EV_OVERCURRENT, IRMS, ABOVE, t['overcurrent_a'], t['i_hysteresis'], d),
+            # ضریب توان فقط وقتی بار واقعاً جریان می‌کشد معنا دارد
+            Rule(EV_LOW_PF, PF, BELOW, t['low_pf'], t['pf_hysteresis'], d, IRMS, t['stall_current_a']),
+        ) for _ in range(channels))
+        self.power_rules = self.channel_rules[0]
+        self.rpm_rules = (
+            Rule(EV_STALL, RPM, BELOW, t['stall_rpm'], 0, d, IRMS, t['stall_current_a']),
+        )
+        self.channel_masks = [0] * channels  # رویدادهای فعال هر کانال
+        self.active_mask = 0  # اجتماع همه کانال‌ها (برای هشدار و نمایش)
+        if alarm_pin is not None:
+            alarm_pin.value(0)
+
+    def update_power(self, vrms, irms, real_power, power_factor, channel=0):
+        """ورود نتیجه یک پنجره calculate_power برای یک کانال."""
+        v = self.channel_values[channel]
+        v[VRMS] = vrms
+        v[IRMS] = irms
+        v[POWER] = real_power
+        v[PF] = power_factor
+        self._run(self.channel_rules[channel], channel)
+
+    def update_result(self, result, channel=0):
+        """ورود یک PowerResult (power_engine)؛ قانون ضریب توان روی PF واقعی (P/S) است."""
+        self.update_power(result.vrms, result.irms, result.p, result.pf, channel)
+
+    def update_rpm(self, rpm, channel=0):
+        """ورود یک به‌روزرسانی RPM (امضای سازگار با RpmService.listener)."""
+        if channel:
+            return  # قانون توقف فقط روی تاکومتر اول (موتور متناظر با کانال جریان اول) بررسی می‌شود
+        self.values[RPM] = rpm
+        self._run(self.rpm_rules)
+
+    def _run(self, rules, channel=0):
+        values = self.channel_values[channel]
+        for rule in rules:
+            if rule.evaluate(values):
+                self._emit(rule, channel)
+
+    def _emit(self, rule, channel):
+        value = self.channel_values[channel][rule.key]
+        self.log.append(self.ticks_ms(), rule.code, rule.active, value, channel)
+        masks = self.channel_masks
+        bit = 1 << rule.code
+        if rule.active:
+            masks[channel] |= bit
+        else:
+            masks[channel] &= ~bit
+        mask = 0
+        for m in masks:
+            mask |= m
+        self.active_mask = mask
+        if self.alarm_pin is not None:
+            self.alarm_pin.value(1 if mask else 0)
+        if self.on_event:
+            self.on_event(rule.code, rule.active, value, channel)
+
+    def active_names(self):
+        """نام رویدادهای فعال برای نمایش"""
+        return [name for code, name in EVENT_NAMES.items() if self.active_mask & (1 << code)]
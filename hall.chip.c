@@ -0,0 +1,147 @@
+// Wokwi Custom Chip - For docs and examples see:
+// https://docs.wokwi.com/chips-api/getting-started
+//
+// SPDX-License-Identifier: MIT
+// Copyright 2023 Ali Rashidi
+//
+// Hall sensor (44E) pulse-train source: one OUT pulse per magnet pass at the
+// configured speed, with optional period jitter and contact-bounce glitches
+// (extra short pulses after each edge, to exercise the firmware's Hall
+// plausibility checks). The speed follows the same scenario timeline as the
+// PT and CT chips (see pt.chip.c, keep them in sync):
+//   0  steady: controls only
+//   1  load steps: 100% / 96.5% speed every 10 s
+//   2  stall: 12 s running, 6 s stopped
+//   3  start-up: 2 s stopped, 3 s speed ramp, 25 s run
+//   4  sag/swell: speed unchanged
+//
+// The default pulses_per_rev (60 / 56.9) makes the firmware's default
+// RPM_MULTIPLIER (569 per pulse per 100 ms) display the configured rpm.
+
+#include "wokwi-api.h"
+#include <math.h>
+#include <stdio.h>
+#include <stdlib.h>
+
+#define IDLE_CHECK_NS 10000000ULL  // re-check a stopped motor every 10 ms
+#define BOUNCE_NS 20000ULL         // width of one bounce glitch
+
+// Next timer event
+typedef enum {
+  PHASE_LOW,     // start of the next pulse
+  PHASE_HIGH,    // end of the magnet pass
+  PHASE_GAP,     // rising edge of a bounce glitch
+  PHASE_BOUNCE,  // falling edge of a bounce glitch
+} phase_t;
+
+typedef struct {
+  pin_t out;
+  timer_t timer;
+  uint32_t rpm;
+  uint32_t pulses_per_rev;
+  uint32_t duty;
+  uint32_t jitter;
+  uint32_t bounce;
+  uint32_t scenario;
+  phase_t phase;
+  uint32_t bounces_left;
+  uint64_t low_ns;  // rest of the period after the high phase
+} chip_state_t;
+
+// Speed scale of the scenario timeline at time t (seconds)
+static float scenario_gain(uint32_t scenario, double t) {
+  double s;
+  switch (scenario) {
+    case 1:
+      return fmod(t, 20.0) < 10.0 ? 1.0f : 0.965f;
+    case 2:
+      return fmod(t, 18.0) < 12.0 ? 1.0f : 0.0f;
+    case 3:
+      s = fmod(t, 30.0);
+      if (s < 2.0) {
+        return 0.0f;
+      }
+      if (s < 5.0) {
+        return (float)(s - 2.0) / 3.0f;
+      }
+      return 1.0f;
+    default:
+      return 1.0f;
+  }
+}
+
+static void start_pulse(chip_state_t *chip) {
+  double t = get_sim_nanos() * 1e-9;
+  float pulses_per_s = attr_read_float(chip->rpm) * scenario_gain(attr_read(chip->scenario), t)
+                       * attr_read_float(chip->pulses_per_rev) / 60.0f;
+  if (pulses_per_s < 0.1f) {
+    timer_start_ns(chip->timer, IDLE_CHECK_NS, false);  // stopped: output stays low
+    return;
+  }
+  float jitter = attr_read_float(chip->jitter) * ((float)rand() / (float)RAND_MAX - 0.5f) * 2.0f;
+  uint64_t period_ns = (uint64_t)(1e9f / pulses_per_s * (1.0f + jitter));
+  uint64_t high_ns = (uint64_t)(period_ns * attr_read_float(chip->duty));
+  if (high_ns < 1000) {
+    high_ns = 1000;
+  }
+  chip->low_ns = period_ns > high_ns ? period_ns - high_ns : 1000;
+  chip->bounces_left = attr_read(chip->bounce);
+  chip->phase = PHASE_HIGH;
+  pin_write(chip->out, HIGH);
+  timer_start_ns(chip->timer, high_ns, false);
+}
+
+static void on_timer(void *user_data) {
+  chip_state_t *chip = (chip_state_t *)user_data;
+  switch (chip->phase) {
+    case PHASE_HIGH:
+    case PHASE_BOUNCE:
+      pin_write(chip->out, LOW);
+      // a bouncing contact adds short extra pulses after the real one
+      if (chip->bounces_left && chip->low_ns > 2 * BOUNCE_NS) {
+        chip->bounces_left--;
+        chip->low_ns -= 2 * BOUNCE_NS;
+        chip->phase = PHASE_GAP;
+        timer_start_ns(chip->timer, BOUNCE_NS, false);
+      } else {
+        chip->phase = PHASE_LOW;
+        timer_start_ns(chip->timer, chip->low_ns, false);
+      }
+      break;
+    case PHASE_GAP:
+      pin_write(chip->out, HIGH);
+      chip->phase = PHASE_BOUNCE;
+      timer_start_ns(chip->timer, BOUNCE_NS, false);
+      break;
+    default:
+      start_pulse(chip);
+      break;
+  }
+}
+
+void chip_init() {
+  chip_state_t *chip = malloc(sizeof(chip_state_t));
+
+  pin_init("VCC", INPUT);
+  pin_init("GND", INPUT);
+  chip->out = pin_init("OUT", OUTPUT_LOW);
+  chip->rpm = attr_init_float("rpm", 1450.0);
+  chip->pulses_per_rev = attr_init_float("pulses_per_rev", 1.0545);
+  chip->duty = attr_init_float("duty", 0.2);      // fraction of the period the magnet is in front of the sensor
+  chip->jitter = attr_init_float("jitter", 0.0);  // +/- fraction of the period
+  chip->bounce = attr_init("bounce", 0);          // extra glitch pulses per edge
+  chip->scenario = attr_init("scenario", 0);
+  chip->phase = PHASE_LOW;
+  chip->bounces_left = 0;
+  chip->low_ns = 0;
+
+  const timer_config_t config = {
+    .callback = on_timer,
+    .user_data = chip,
+  };
+  chip->timer = timer_init(&config);
+  timer_start_ns(chip->timer, IDLE_CHECK_NS, false);
+
+  printf("Hall source: %.0f rpm, %.3f pulses/rev, scenario %u\n", attr_read_float(chip->rpm),
+         attr_read_float(chip->pulses_per_rev), attr_read(chip->scenario));
+}
@@ -0,0 +1,138 @@
+#ESP32 hardware backend for the monitor core
+# پشتیبان سخت‌افزاری ESP32 برای monitor.Monitor: همه دسترسی‌ها به machine (ADC، I2C و LCD، TM1637،
+# ورودی هال، تایمر، UART، WDT و خواب سبک) فقط در این ماژول است. برای اجرا روی میزبان یا برد دیگر
+# شیئی با همین متدها و صفت‌ها به Monitor داده می‌شود؛ بقیه ماژول‌های هسته به machine وابسته نیستند
+# و زمان، پین‌ها و تابع‌های اینتراپت را تزریق‌شده می‌گیرند تا روی میزبان (CPython) هم اجرا شوند.
+import time
+import machine
+from machine import Pin
+from isr import setup_emergency_buffer
+
+
+class Esp32Hardware:
+    """ساخت وسایل جانبی ESP32 به درخواست Monitor."""
+
+    IRQ_RISING = Pin.IRQ_RISING
+
+    def __init__(self, scl_pin=22, sda_pin=21, i2c_freq=400000, i2c_timeout_us=10000):
+        """
+        Args:
+            scl_pin (int): پایه SCL باس I2C نمایشگر LCD.
+            sda_pin (int): پایه SDA باس I2C.
+            i2c_freq (int): فرکانس I2C.
+            i2c_timeout_us (int): باس I2C گیرکرده به جای قفل کردن حلقه خطای OSError می‌دهد.
+        """
+        self.ticks_ms = time.ticks_ms
+        self.ticks_us = time.ticks_us
+        self.ticks_diff = time.ticks_diff
+        self.sleep_ms = time.sleep_ms
+        self.sleep_us = time.sleep_us
+        self.lightsleep = machine.lightsleep
+        self.disable_irq = machine.disable_irq
+        self.enable_irq = machine.enable_irq
+        setup_emergency_buffer()  # پیش از ثبت هر اینتراپت، تا خطای داخل آن قابل گزارش باشد
+        self.scl_pin = scl_pin
+        self.sda_pin = sda_pin
+        self.i2c_freq = i2c_freq
+        self.i2c_timeout_us = i2c_timeout_us
+        self.i2c = None
+        self.lcd_address = None
+
+    # تنظیمات ADC
+    def adc(self, pin):
+        adc = machine.ADC(Pin(pin))
+        adc.width(machine.ADC.WIDTH_12BIT)
+        adc.atten(machine.ADC.ATTN_11DB)
+        return adc
+
+    # تنظیمات LCD و I2C
+    def lcd(self, rows=4, columns=20, recover=False):
+        """
+        LCD روی اولین دستگاه باس I2C (آدرس قبلی اگر هنوز پاسخ دهد).
+
+        Args:
+            recover (bool): اگر باس پاسخ ندهد ابتدا آزاد و SoftI2C دوباره ساخته می‌شود.
+        """
+        from i2c_lcd import I2cLcd  # کتابخانه برای نمایشگر LCD
+        if self.i2c is None:
+            self.i2c = machine.SoftI2C(scl=Pin(self.scl_pin), sda=Pin(self.sda_pin), freq=self.i2c_freq,
+                                       timeout=self.i2c_timeout_us)
+        devices = self.i2c.scan()
+        if not devices and recover:
+            self.recover_i2c()
+            devices = self.i2c.scan()
+        if not devices:
+            raise OSError("هیچ دستگاهی در باس I2C یافت نشد.")
+        if self.lcd_address not in devices:
+            self.lcd_address = devices[0]
+        return I2cLcd(self.i2c, self.lcd_address, rows, columns)
+
+    def recover_i2c(self):
+        """آزاد کردن باس I2C گیرکرده: ۹ پالس SCL و یک STOP، سپس ساخت دوباره SoftI2C"""
+        scl = Pin(self.scl_pin, Pin.OUT, value=1)
+        sda = Pin(self.sda_pin, Pin.OUT, value=1)
+        for _ in range(9):
+            scl(0)
+            time.sleep_us(5)
+            scl(1)
+            time.sleep_us(5)
+        sda(0)
+        time.sleep_us(5)
+        sda(1)  # STOP: SDA در حالی که SCL بالاست بالا می‌رود
+        self.i2c = machine.SoftI2C(scl=Pin(self.scl_pin), sda=Pin(self.sda_pin), freq=self.i2c_freq,
+                                   timeout=self.i2c_timeout_us)
+
+    def segment_display(self, clk_pin, dio_pin, decimal=True):
+        """نمایشگر TM1637 (با ممیز یا دونقطه‌ای)"""
+        import tm1637
+        return (tm1637.TM1637Decimal if decimal else tm1637.TM1637)(clk=Pin(clk_pin), dio=Pin(dio_pin))
+
+    def hall_input(self, pin):
+        return Pin(pin, Pin.IN, Pin.PULL_DOWN)
+
+    def output(self, pin):
+        return Pin(pin, Pin.OUT)
+
+    def button(self, pin, handler):
+        """دکمه به GND با مقاومت بالاکش داخلی؛ handler با لبه پایین‌رونده فراخوانی می‌شود."""
+        button = Pin(pin, Pin.IN, Pin.PULL_UP)
+        button.irq(trigger=Pin.IRQ_FALLING, handler=handler)
+        return button
+
+    def timer(self):
+        return machine.Timer(-1)
+
+    def uart(self, uart_id, baud, tx_pin, rx_pin, txbuf=1024):
+        return machine.UART(uart_id, baudrate=baud, tx=tx_pin, rx=rx_pin, txbuf=txbuf)
+
+    def watchdog(self, timeout_ms):
+        return machine.WDT(timeout=timeout_ms)
+
+    def wake_on(self, pin):
+        """بیدارباش خواب سبک با سطح بالای pin؛ None بیدارباش را غیرفعال می‌کند."""
+        import esp32
+        esp32.wake_on_ext0(pin=pin, level=esp32.WAKEUP_ANY_HIGH)
+
+    def reset_cause(self):
+        """نام علت آخرین ریست برای شمارنده‌های ناظر"""
+        cause = machine.reset_cause()
+        for name in ('PWRON_RESET', 'HARD_RESET', 'WDT_RESET', 'DEEPSLEEP_RESET', 'SOFT_RESET'):
+            if getattr(machine, name, None) == cause:
+                return name
+        return str(cause)
+
+    def mem_free(self):
+        import gc
+        return gc.mem_free()
+
+    def console_reader(self):
+        """خواندن بدون انتظار یک کاراکتر از REPL (None اگر چیزی نرسیده باشد)"""
+        import sys
+        import select
+        poller = select.poll()
+        poller.register(sys.stdin, select.POLLIN)
+
+        def read():
+            return sys.stdin.read(1) if poller.poll(0) else None
+
+        return read
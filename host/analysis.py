@@ -0,0 +1,236 @@
+"""Offline analysis: replay recorded raw ADC captures through the DSP pipeline.
+
+Inputs are memory-mapped, never read into Python lists:
+  * ``*.bin`` waveform captures written by capture.py (the full trigger window
+    of each file is one analysis window), and
+  * ``*.raw`` bulk recordings: little-endian uint16 ``v0 i0 v1 i1 ...`` pairs,
+    cut into consecutive windows of ``--window`` samples.
+
+The NumPy functions below mirror power_engine.Channel.compute and
+Channel.analyze (every PowerResult field: powers, phase, frequency,
+displacement PF, crest factors and the clip / no-cycle flags) over thousands
+of windows at once. ``check`` runs both implementations on every window and
+fails on any mismatch, so the two stay in sync; ``sweep`` evaluates a
+parameter grid (window length, sample interval via decimation, scale
+factors) in a process pool.
+
+    python host/analysis.py check captures/*.bin recording.raw
+    python host/analysis.py sweep recording.raw --window 2000 \\
+        --sample-count 500,1000,2000 --decimate 1,2,4 --pt 0.218,0.25 --ct 0.051,0.054 --jobs 8
+"""
+import argparse
+import csv
+import itertools
+import os
+import struct
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from capture import HEADER, HEADER_SIZE, HEADER_V1, MAGIC  # noqa: E402
+import power_engine  # noqa: E402
+
+RESULT_FIELDS = ('vrms', 'irms', 'p', 'q', 's', 'pf', 'dpf', 'phase', 'freq', 'crest_v', 'crest_i', 'flags')
+
+
+# --------------------------------------------------------------------------- loading
+
+def load_file(path, window=power_engine.SAMPLE_COUNT):
+    """Return (v, i, interval_us) with v/i as memory-mapped (windows, samples) uint16 views."""
+    if path.endswith('.raw'):
+        pairs = os.path.getsize(path) // 4
+        count = pairs // window
+        data = np.memmap(path, dtype='<u2', mode='r', shape=(count, window, 2))
+        return data[:, :, 0], data[:, :, 1], power_engine.SAMPLE_INTERVAL_US
+    with open(path, 'rb') as f:
+        raw = f.read(HEADER_SIZE)
+    fmt = HEADER_V1 if raw[4:5] == b'\x01' else HEADER
+    size = struct.calcsize(fmt)
+    header = struct.unpack_from(fmt, raw)
+    if header[0] != MAGIC:
+        raise ValueError('%s: not a waveform capture' % path)
+    pre, n, post, interval = header[5:9]
+    total = pre + n + post
+    data = np.memmap(path, dtype='<u2', mode='r', offset=size, shape=(2, total))
+    return data[0:1, pre:pre + n], data[1:2, pre:pre + n], interval
+
+
+def load_windows(paths, window=power_engine.SAMPLE_COUNT):
+    """Stack the windows of several files; files with other window lengths are trimmed."""
+    vs, is_, interval = [], [], None
+    for path in paths:
+        v, i, dt = load_file(path, window)
+        if interval is None:
+            interval = dt
+        elif abs(dt - interval) > 0.01 * interval:
+            # captures store the measured period, which varies a little from board to board
+            raise ValueError('%s: sample interval %.1f us differs from %.1f us' % (path, dt, interval))
+        vs.append(v)
+        is_.append(i)
+    n = min(v.shape[1] for v in vs)
+    if len(vs) == 1:
+        return vs[0][:, :n], is_[0][:, :n], interval
+    return np.concatenate([v[:, :n] for v in vs]), np.concatenate([i[:, :n] for i in is_]), interval
+
+
+# --------------------------------------------------------------------------- vectorised DSP
+
+def rising_crossings(x, level, hysteresis):
+    """Vectorised power_engine.rising_crossings: (first, last, count) per window, -1 if none.
+
+    A sample at or below level - hysteresis arms the detector, the next one at or
+    above level + hysteresis is a crossing; so a crossing is a high sample whose
+    previous non-dead-band sample was low.
+    """
+    lo = (level - hysteresis)[:, None]
+    hi = (level + hysteresis)[:, None]
+    state = np.where(x >= hi, 1, np.where(x <= lo, -1, 0)).astype(np.int8)
+    k = np.arange(x.shape[1])
+    last_set = np.maximum.accumulate(np.where(state != 0, k, -1), axis=1)
+    prev = np.take_along_axis(state, np.maximum(last_set, 0), axis=1)
+    prev = np.where(last_set >= 0, prev, 0)
+    hits = np.zeros(x.shape, dtype=bool)
+    hits[:, 1:] = (state[:, 1:] == 1) & (prev[:, :-1] == -1)
+    n = hits.sum(axis=1)
+    first = np.where(n > 0, hits.argmax(axis=1), -1)
+    last = np.where(n > 0, x.shape[1] - 1 - hits[:, ::-1].argmax(axis=1), -1)
+    return first, last, n
+
+
+def calculate_power(v, i, pt_scale, ct_scale, sample_interval_us=power_engine.SAMPLE_INTERVAL_US):
+    """Vectorised power_engine.Channel.compute + Channel.analyze, one row per window."""
+    count = v.shape[1]
+    a = v.astype(np.int64)
+    b = i.astype(np.int64)
+    sa = a.sum(axis=1)
+    sb = b.sum(axis=1)
+    nn = count * count
+    # per-window mean removed with exact integer sums, as in compute()
+    mean_v = sa / count
+    mean_i = sb / count
+    ac_v = np.sqrt((count * (a * a).sum(axis=1) - sa * sa) / nn)
+    ac_i = np.sqrt((count * (b * b).sum(axis=1) - sb * sb) / nn)
+    vrms = ac_v * pt_scale
+    irms = ac_i * ct_scale
+    p = (count * (a * b).sum(axis=1) - sa * sb) / nn * pt_scale * ct_scale
+    s = vrms * irms
+    q = np.sqrt(np.maximum(s * s - p * p, 0.0))
+    pf = np.divide(p, s, out=np.zeros_like(p), where=s != 0)
+
+    v_lo, v_hi = a.min(axis=1), a.max(axis=1)
+    i_lo, i_hi = b.min(axis=1), b.max(axis=1)
+    flags = (np.where((v_lo == 0) | (v_hi >= power_engine.ADC_MAX), power_engine.FLAG_CLIP_V, 0)
+             | np.where((i_lo == 0) | (i_hi >= power_engine.ADC_MAX), power_engine.FLAG_CLIP_I, 0))
+    crest_v = np.divide(np.maximum(v_hi - mean_v, mean_v - v_lo), ac_v, out=np.zeros_like(ac_v), where=ac_v != 0)
+    crest_i = np.divide(np.maximum(i_hi - mean_i, mean_i - i_lo), ac_i, out=np.zeros_like(ac_i), where=ac_i != 0)
+
+    cv, cv_last, nv = rising_crossings(a, mean_v, (v_hi - v_lo) / 16 + 1)
+    ci, _, ni = rising_crossings(b, mean_i, (i_hi - i_lo) / 16 + 1)
+    cycled = nv >= 2
+    flags |= np.where(cycled, 0, power_engine.FLAG_NO_CYCLE)
+    cycle = np.where(cycled, (cv_last - cv) / np.maximum(nv - 1, 1), 1.0)
+    freq = np.where(cycled, 1000000 / (cycle * sample_interval_us), 0.0)
+    d = np.mod(ci - cv, cycle)  # same sign convention as Python's % on floats
+    d = np.where(d > cycle / 2, d - cycle, d)
+    locked = cycled & (ni > 0)
+    phase = np.where(locked, d / cycle * 360, 0.0)
+    dpf = np.where(locked, np.cos(np.radians(phase)), 0.0)
+    return dict(vrms=vrms, irms=irms, p=p, q=q, s=s, pf=pf, dpf=dpf, phase=phase, freq=freq,
+                crest_v=crest_v, crest_i=crest_i, flags=flags.astype(np.float64))
+
+
+# --------------------------------------------------------------------------- cross-check
+
+def firmware_reference(v, i, pt_scale, ct_scale, sample_interval_us):
+    """Run the firmware's pure-Python compute() and analyze() on each window."""
+    count = v.shape[1]
+    ch = power_engine.Channel(None, None, pt_scale, ct_scale, count)
+    out = {key: np.empty(v.shape[0]) for key in RESULT_FIELDS}
+    for w in range(v.shape[0]):
+        ch.v = array('H', v[w].tolist())
+        ch.i = array('H', i[w].tolist())
+        ch.compute(count)
+        r = ch.analyze(count, sample_interval_us)
+        for key in RESULT_FIELDS:
+            out[key][w] = getattr(r, key)
+    return out
+
+
+def check(paths, window, pt_scale, ct_scale, rtol=1e-9):
+    v, i, interval = load_windows(paths, window)
+    fast = calculate_power(v, i, pt_scale, ct_scale, interval)
+    ref = firmware_reference(v, i, pt_scale, ct_scale, interval)
+    worst = 0
+    for key in RESULT_FIELDS:
+        if not np.allclose(fast[key], ref[key], rtol=rtol, atol=1e-9):
+            bad = np.flatnonzero(~np.isclose(fast[key], ref[key], rtol=rtol, atol=1e-9))
+            print('MISMATCH %s in %d windows, first window %d: numpy=%r firmware=%r'
+                  % (key, bad.size, bad[0], fast[key][bad[0]], ref[key][bad[0]]))
+            worst = 1
+    print('%d windows x %d samples checked: %s' % (v.shape[0], v.shape[1], 'FAIL' if worst else 'OK'))
+    return worst
+
+
+# --------------------------------------------------------------------------- parameter sweep
+
+def _evaluate(job):
+    paths, window, count, decimate, pt_scale, ct_scale = job
+    v, i, interval = load_windows(paths, window)
+    v = v[:, ::decimate][:, :count]
+    i = i[:, ::decimate][:, :count]
+    r = calculate_power(v, i, pt_scale, ct_scale, interval * decimate)
+    row = dict(sample_count=v.shape[1], sample_interval_us=interval * decimate, pt_scale=pt_scale,
+               ct_scale=ct_scale, windows=v.shape[0])
+    for key in RESULT_FIELDS:
+        row[key + '_mean'] = float(r[key].mean())
+        row[key + '_std'] = float(r[key].std())
+    return row
+
+
+def sweep(paths, window, counts, decimations, pts, cts, jobs, out):
+    grid = [(paths, window, c, d, pt, ct) for c, d, pt, ct in itertools.product(counts, decimations, pts, cts)]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        rows = list(pool.map(_evaluate, grid))
+    writer = csv.DictWriter(out, list(rows[0]))
+    writer.writeheader()
+    writer.writerows(rows)
+    return rows
+
+
+def _floats(text):
+    return [float(x) for x in text.split(',')]
+
+
+def _ints(text):
+    return [int(x) for x in text.split(',')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    for name in ('check', 'sweep'):
+        p = sub.add_parser(name)
+        p.add_argument('paths', nargs='+')
+        p.add_argument('--window', type=int, default=power_engine.SAMPLE_COUNT, help='window length for .raw files')
+    p = sub.choices['check']
+    p.add_argument('--pt', type=float, default=0.25)
+    p.add_argument('--ct', type=float, default=0.054)
+    p = sub.choices['sweep']
+    p.add_argument('--sample-count', type=_ints, default=[power_engine.SAMPLE_COUNT])
+    p.add_argument('--decimate', type=_ints, default=[1], help='keep every k-th sample (interval x k)')
+    p.add_argument('--pt', type=_floats, default=[0.25])
+    p.add_argument('--ct', type=_floats, default=[0.054])
+    p.add_argument('--jobs', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    if args.cmd == 'check':
+        sys.exit(check(args.paths, args.window, args.pt, args.ct))
+    sweep(args.paths, args.window, args.sample_count, args.decimate, args.pt, args.ct, args.jobs, sys.stdout)
+
+
+if __name__ == '__main__':
+    main()
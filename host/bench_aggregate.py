@@ -0,0 +1,137 @@
+"""Accuracy, cost and storage footprint of the incremental aggregation tier.
+
+Feeds a synthetic day of measurement windows (slow load drift, load steps,
+noise and occasional inrush spikes) through aggregate.Aggregator with a
+simulated clock, and compares each closed bucket against exact statistics of
+the same samples. Reports the worst percentile error per bucket length, the
+per-update cost on this host, and telemetry/flash bytes per day against
+streaming every window. Closed buckets also go through
+Telemetry.send_aggregate and FrameDecoder to check the frame round trip.
+
+Buckets up to --reservoir-max-ms take percentiles from a fixed-size sample
+buffer, longer ones from P-square; --reservoir-max-ms 0 uses P-square for
+every tier, for comparison.
+
+    python host/bench_aggregate.py [--hours 24] [--window-ms 1000] [--reservoir-max-ms 600000]
+"""
+import argparse
+import math
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from aggregate import METRICS, PERCENTILES, RESERVOIR_MAX_MS, Aggregator  # noqa: E402
+from power_engine import PowerResult  # noqa: E402
+from telemetry import AGGREGATE_SIZE, CRC_SIZE, HEADER_SIZE, MEASUREMENT_SIZE, Telemetry  # noqa: E402
+from telemetry_receiver import FrameDecoder  # noqa: E402
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0
+
+    def ticks_ms(self):
+        return self.now
+
+    @staticmethod
+    def ticks_diff(a, b):
+        return a - b
+
+
+class Buffer:
+    def __init__(self):
+        self.data = bytearray()
+
+    def write(self, data):
+        self.data += data
+
+
+def exact_percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+def window(rng, t_s):
+    """One synthetic calibrated window at time t_s (seconds)."""
+    r = PowerResult()
+    load = 0.6 + 0.3 * math.sin(t_s / 3600 * math.pi) + (0.4 if (t_s // 600) % 3 == 0 else 0)
+    if rng.random() < 0.002:
+        load *= 5  # inrush
+    r.vrms = 220 + rng.gauss(0, 1.5)
+    r.irms = max(0.0, load * 2 + rng.gauss(0, 0.05))
+    r.pf = min(1.0, max(0.0, 0.85 + rng.gauss(0, 0.01)))
+    r.p = r.vrms * r.irms * r.pf
+    r.freq = 50 + rng.gauss(0, 0.02)
+    return r, 1450 * (1 - 0.03 * load) + rng.gauss(0, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--hours', type=float, default=24)
+    parser.add_argument('--window-ms', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--reservoir-max-ms', type=int, default=RESERVOIR_MAX_MS)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    clock = Clock()
+    out = Buffer()
+    telemetry = Telemetry(out, clock.ticks_ms, clock.ticks_diff)
+    raw = {}  # (span, metric) -> exact samples of the open bucket
+    worst = {}  # (span, percentile) -> worst error relative to the bucket's range
+    buckets = {}
+
+    def on_bucket(span_ms, index, name, stat, end_ms):
+        values = raw.pop((span_ms, name))
+        assert stat.count == len(values)
+        assert abs(stat.mean - statistics.fmean(values)) <= 1e-6 * max(1.0, abs(stat.mean))
+        assert stat.min == min(values) and stat.max == max(values)
+        if len(values) > 1:
+            assert abs(stat.std - statistics.stdev(values)) <= 1e-3 * max(1.0, stat.std)
+        spread = (max(values) - min(values)) or 1.0
+        for k, p in enumerate(PERCENTILES):
+            err = abs(stat.percentile(k) - exact_percentile(values, p)) / spread
+            worst[span_ms, p] = max(worst.get((span_ms, p), 0.0), err)
+        if not index:
+            buckets[span_ms] = buckets.get(span_ms, 0) + 1
+        telemetry.send_aggregate(span_ms, index, name, stat, end_ms)
+
+    agg = Aggregator(clock.ticks_ms, clock.ticks_diff, on_bucket=on_bucket, reservoir_max_ms=args.reservoir_max_ms)
+    windows = int(args.hours * 3600000 / args.window_ms)
+    cost = 0.0
+    for n in range(windows):
+        clock.now = n * args.window_ms
+        r, rpm = window(rng, clock.now / 1000)
+        t0 = time.perf_counter()
+        agg.update(r, rpm)
+        cost += time.perf_counter() - t0
+        for span in agg.buckets_ms:
+            for name in METRICS:
+                raw.setdefault((span, name), []).append(rpm if name == 'rpm' else getattr(r, name))
+
+    decoder = FrameDecoder()
+    rows = decoder.feed(bytes(out.data))
+    assert len(rows) == sum(buckets.values()) * len(METRICS) and not decoder.crc_errors
+    assert {row['metric'] for row in rows} == set(METRICS)
+
+    print(f"{windows} windows, buckets closed: "
+          + ", ".join(f"{span // 1000}s x{count}" for span, count in sorted(buckets.items())))
+    for (span, p), err in sorted(worst.items()):
+        method = 'buffer' if span <= args.reservoir_max_ms else 'P-square'
+        print(f"  P{p * 100:.0f} over {span // 1000}s buckets ({method}): worst error {err * 100:.2f}% of bucket range")
+    print(f"update cost: {cost / windows * 1e6:.1f} us per window on this host")
+    day = 86400000
+    frame = HEADER_SIZE + CRC_SIZE
+    stream = day // args.window_ms * (frame + MEASUREMENT_SIZE)
+    rollup = sum(day // span * len(METRICS) * (frame + AGGREGATE_SIZE) for span in agg.buckets_ms)
+    print(f"per day: every window {stream / 1024:.0f} KiB, rollups {rollup / 1024:.1f} KiB "
+          f"({rollup / stream * 100:.1f}%)")
+
+
+if __name__ == '__main__':
+    main()
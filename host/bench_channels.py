@@ -0,0 +1,139 @@
+"""Host benchmark for the multi-channel measurement engine (power_engine.py).
+
+Runs ChannelSet acquisition + computation against synthetic ADCs on CPython and
+reports per-window cost and throughput for 1, 3 and 6 channels. Absolute
+numbers are host numbers; what matters is that cost per window grows linearly
+with the channel count.
+
+Before timing, the results are checked against sines riding on the 2048-count
+mid-rail bias of the PT/CT front end, whose Vrms, Irms, P, Q and PF are known
+in closed form (resistive, 30 deg lagging, purely reactive, and a balanced
+three-phase set). The script exits non-zero if any value is off by more than
+CHECK_TOLERANCE of the apparent power.
+
+    python host/bench_channels.py [--windows 20] [--samples 2000]
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from power_engine import Channel, ChannelSet  # noqa: E402
+
+
+class SineAdc:
+    """Fake 12-bit ADC returning a biased 50 Hz sine sampled every 100 us."""
+
+    def __init__(self, amplitude=1500, bias=2048, phase_deg=0.0, interval_us=100, freq=50.0):
+        period = int(round(1e6 / freq / interval_us))
+        shift = math.radians(phase_deg)
+        self.table = [int(bias + amplitude * math.sin(2 * math.pi * k / period - shift)) for k in range(period)]
+        self.k = 0
+
+    def read(self):
+        k = self.k
+        self.k = k + 1 if k + 1 < len(self.table) else 0
+        return self.table[k]
+
+
+CHECK_TOLERANCE = 0.01
+CHECK_PT = 0.25
+CHECK_CT = 0.054
+
+
+def expected(v_amp, i_amp, lag_deg):
+    """Vrms, Irms, P, Q, S and PF of the AC part of two sines."""
+    vrms = v_amp / math.sqrt(2) * CHECK_PT
+    irms = i_amp / math.sqrt(2) * CHECK_CT
+    s = vrms * irms
+    lag = math.radians(lag_deg)
+    return vrms, irms, s * math.cos(lag), abs(s * math.sin(lag)), s, math.cos(lag)
+
+
+def check(samples):
+    """Compare compute() on biased sines with the closed-form values; returns True if all match."""
+    ok = True
+    print('%-12s %9s %9s %11s %11s %7s' % ('load', 'Vrms', 'Irms', 'P', 'Q', 'PF'))
+    for name, lag in (('resistive', 0.0), ('lag 30 deg', 30.0), ('reactive', 90.0)):
+        ch = Channel(SineAdc(1200), SineAdc(600, phase_deg=lag), CHECK_PT, CHECK_CT, samples)
+        ChannelSet([ch], samples).measure()
+        want = expected(1200, 600, lag)
+        got = (ch.vrms, ch.irms, ch.p, ch.q, ch.s, ch.pf)
+        # V/I relative to themselves, powers relative to S, PF absolute
+        good = (abs(got[0] - want[0]) <= CHECK_TOLERANCE * want[0]
+                and abs(got[1] - want[1]) <= CHECK_TOLERANCE * want[1]
+                and all(abs(got[k] - want[k]) <= CHECK_TOLERANCE * want[4] for k in (2, 3, 4))
+                and abs(got[5] - want[5]) <= CHECK_TOLERANCE)
+        ok &= good
+        print('%-12s %9.2f %9.2f %11.1f %11.1f %7.3f  %s (want %.2f V, %.2f A, P %.1f, Q %.1f, PF %.3f)' % (
+            name, got[0], got[1], got[2], got[3], got[5], 'OK' if good else 'FAIL',
+            want[0], want[1], want[2], want[3], want[5]))
+    # balanced three-phase, every phase lagging 30 deg: totals are three times one phase
+    cs = build(3, samples)
+    cs.measure()
+    one = expected(1500, 1000, 30.0)
+    good = (abs(cs.p - 3 * one[2]) <= CHECK_TOLERANCE * 3 * one[4]
+            and abs(cs.q - 3 * one[3]) <= CHECK_TOLERANCE * 3 * one[4]
+            and abs(cs.pf - one[5]) <= CHECK_TOLERANCE)
+    ok &= good
+    print('%-12s %9s %9s %11.1f %11.1f %7.3f  %s (want P %.1f, Q %.1f, PF %.3f)' % (
+        '3-phase', '', '', cs.p, cs.q, cs.pf, 'OK' if good else 'FAIL', 3 * one[2], 3 * one[3], one[5]))
+    return ok
+
+
+def build(n_channels, samples):
+    chans = []
+    for n in range(n_channels):
+        shift = 120.0 * (n % 3)  # three-phase spacing
+        chans.append(Channel(SineAdc(phase_deg=shift), SineAdc(1000, phase_deg=shift + 30), CHECK_PT, CHECK_CT, samples,
+                             'L%d' % (n + 1)))
+    return ChannelSet(chans, samples)
+
+
+def bench(n_channels, samples, windows):
+    cs = build(n_channels, samples)
+    cs.measure()  # warm-up
+    t0 = time.perf_counter()
+    for _ in range(windows):
+        cs.acquire()
+    t1 = time.perf_counter()
+    for _ in range(windows):
+        cs.compute()
+    t2 = time.perf_counter()
+    acq = (t1 - t0) / windows
+    comp = (t2 - t1) / windows
+    return acq, comp, cs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--windows', type=int, default=20)
+    parser.add_argument('--samples', type=int, default=2000)
+    args = parser.parse_args()
+
+    if not check(args.samples):
+        sys.exit(1)
+    print()
+    print('%-9s %12s %12s %12s %14s %10s' % ('channels', 'acquire ms', 'compute ms', 'window ms', 'pairs/s', 'ms/chan'))
+    for n in (1, 3, 6):
+        acq, comp, cs = bench(n, args.samples, args.windows)
+        total = acq + comp
+        per_chan = total / n
+        print('%-9d %12.3f %12.3f %12.3f %14.0f %10.3f' % (
+            n, acq * 1e3, comp * 1e3, total * 1e3, n * args.samples / total, per_chan * 1e3))
+    print('total P=%.1f W  Q=%.1f var  S=%.1f VA  PF=%.3f (6 ch)' % (cs.p, cs.q, cs.s, cs.pf))
+    t0 = time.perf_counter()
+    for _ in range(args.windows):
+        results = cs.analyze()
+    t1 = time.perf_counter()
+    r = results[0]
+    print('analyze %.3f ms/chan: %s %.2f Hz  phase=%.1f deg  PF=%.3f  DPF=%.3f  crest V/I=%.2f/%.2f  flags=%s' % (
+        (t1 - t0) / args.windows / len(results) * 1e3, r.name, r.freq, r.phase, r.pf, r.dpf, r.crest_v, r.crest_i,
+        r.flag_names()))
+
+
+if __name__ == '__main__':
+    main()
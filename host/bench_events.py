@@ -0,0 +1,52 @@
+"""Host benchmark for the event engine (events.py).
+
+Feeds a scripted sequence of windows (normal, sag, overcurrent, stall, low PF)
+through EventEngine and reports the per-window evaluation cost and the events
+that were logged.
+
+    python host/bench_events.py [--windows 20000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from events import EventEngine, EVENT_NAMES  # noqa: E402
+
+# (vrms, irms, power, pf, rpm) per scripted phase
+SCRIPT = (
+    ('normal', (225.0, 3.0, 600.0, 0.9, 1400)),
+    ('sag', (180.0, 3.0, 500.0, 0.9, 1400)),
+    ('normal', (225.0, 3.0, 600.0, 0.9, 1400)),
+    ('overcurrent', (225.0, 7.5, 1500.0, 0.9, 1300)),
+    ('stall', (225.0, 5.0, 900.0, 0.8, 0)),
+    ('low pf', (225.0, 3.0, 200.0, 0.3, 1400)),
+    ('normal', (225.0, 3.0, 600.0, 0.9, 1400)),
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--windows', type=int, default=20000)
+    args = parser.parse_args()
+
+    now = [0]
+    engine = EventEngine(lambda: now[0])
+    per_phase = max(1, args.windows // len(SCRIPT))
+    t0 = time.perf_counter()
+    for _, (v, i, p, pf, rpm) in SCRIPT:
+        for _ in range(per_phase):
+            now[0] += 500
+            engine.update_power(v, i, p, pf)
+            engine.update_rpm(rpm)
+    elapsed = time.perf_counter() - t0
+    windows = per_phase * len(SCRIPT)
+    print('%d windows, %.2f us per window (power + rpm update)' % (windows, elapsed / windows * 1e6))
+    for t, code, raised, value, _ in engine.log.entries():
+        print('%8d ms  %-6s %-7s %.2f' % (t, EVENT_NAMES[code], 'raised' if raised else 'cleared', value))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""Host benchmark of LCD rendering cost over a fake I2C bus.
+
+FakeLcd is an LcdApi whose HAL issues exactly the PCF8574 byte writes of
+i2c_lcd.I2cLcd (four single-byte writeto() calls per command or data byte, a
+5 ms wait after clear/home) into a FakeI2C that only counts them. Compared:
+
+  * legacy:  lcd.clear() + putstr() of the old 4-line f-string every window
+  * switch:  LcdUi full redraw of each page (page change / after re-init)
+  * update:  LcdUi dirty update with realistic window-to-window jitter
+  * steady:  LcdUi update when nothing on the page changed
+
+Bus time assumes --us-per-write per one-byte transaction (~50 us at 400 kHz;
+SoftI2C on the ESP32 is slower) plus the controller waits.
+
+    python host/bench_lcd.py [--windows 500] [--us-per-write 60]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from lcd_api import LcdApi  # noqa: E402
+from lcd_ui import DEFAULT_PAGES, DEFAULT_SCALES, LcdUi  # noqa: E402
+from power_engine import PowerResult  # noqa: E402
+
+
+class FakeI2C:
+    def __init__(self):
+        self.writes = 0
+        self.wait_us = 0
+
+    def writeto(self, addr, buf):
+        self.writes += 1
+
+
+class FakeLcd(LcdApi):
+    """LcdApi with the I2cLcd transaction pattern on a counting bus."""
+
+    def __init__(self, i2c, lines=4, columns=20):
+        self.i2c = i2c
+        LcdApi.__init__(self, lines, columns)
+
+    def _byte(self):
+        for _ in range(4):  # high nibble with/without E, low nibble with/without E
+            self.i2c.writeto(0x27, b'\x00')
+
+    def hal_write_command(self, cmd):
+        self._byte()
+        if cmd <= 3:
+            self.i2c.wait_us += 5000
+
+    def hal_write_data(self, data):
+        self._byte()
+
+    def hal_sleep_us(self, usecs):
+        self.i2c.wait_us += usecs
+
+
+def make_results(windows, seed=1):
+    rng = random.Random(seed)
+    out = []
+    for n in range(windows):
+        r = PowerResult('L1')
+        r.vrms = 228 + rng.gauss(0, 0.6)
+        r.irms = 3.2 + rng.gauss(0, 0.03) + (1.5 if 200 <= n < 300 else 0)
+        r.p = r.vrms * r.irms * 0.86
+        r.s = r.vrms * r.irms
+        r.derive()
+        r.phase = 30 + rng.gauss(0, 0.8)
+        r.dpf = 0.866
+        r.freq = 50 + rng.gauss(0, 0.01)
+        r.crest_v = 1.41 + rng.gauss(0, 0.005)
+        r.crest_i = 1.6 + rng.gauss(0, 0.01)
+        r.samples = 2000
+        out.append(r)
+    return out
+
+
+def extra_for(n, rng):
+    return {'rpm': 1450 + int(rng.gauss(0, 8)), 'energy_kwh': n * 0.0002, 'alarm': '', 'quality': 'OK',
+            'boots': 3, 'errors': 0, 'mem': 81200 - (n % 7) * 16, 'acq_ms': 290 + int(rng.gauss(0, 2)), 'diag': 'OK'}
+
+
+def measure(fn, i2c, count):
+    w0, t0 = i2c.writes, i2c.wait_us
+    c0 = time.perf_counter()
+    fn()
+    cpu = time.perf_counter() - c0
+    return (i2c.writes - w0) / count, (i2c.wait_us - t0) / count, cpu / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--windows', type=int, default=500)
+    parser.add_argument('--us-per-write', type=float, default=60.0)
+    args = parser.parse_args()
+
+    results = make_results(args.windows)
+    rng = random.Random(2)
+    extras = [extra_for(n, rng) for n in range(args.windows)]
+    i2c = FakeI2C()
+    lcd = FakeLcd(i2c)
+
+    def bus_ms(writes, wait_us):
+        return (writes * args.us_per_write + wait_us) / 1000
+
+    def legacy():
+        for r in results:
+            lcd.clear()
+            lcd.putstr(f"Vrms: {r.vrms:.2f}V\nIrms: {r.irms:.2f}A\nP: {r.p:.0f}W | S: {r.s:.0f}\nPF: {r.pf:.2f} ")
+
+    rows = [('legacy f-string', 'all') + measure(legacy, i2c, args.windows)]
+    ui = LcdUi(DEFAULT_PAGES, 20, DEFAULT_SCALES)
+    before = i2c.writes
+    ui.attach(lcd)
+    glyph_writes = i2c.writes - before
+    for index, page in enumerate(ui.pages):
+        ui.page = index
+
+        def switch():
+            for n in range(args.windows):
+                ui.next_page(0)  # force a full redraw of the same page
+                ui.render(results[n], extras[n])
+
+        def update():
+            for n in range(args.windows):
+                ui.render(results[n], extras[n])
+
+        def steady():
+            for _ in range(args.windows):
+                ui.render(results[-1], extras[-1])
+
+        rows.append(('switch', page.name) + measure(switch, i2c, args.windows))
+        rows.append(('update', page.name) + measure(update, i2c, args.windows))
+        rows.append(('steady', page.name) + measure(steady, i2c, args.windows))
+
+    print('%-16s %-8s %12s %10s %12s %12s' % ('mode', 'page', 'i2c writes', 'wait ms', 'bus ms', 'host cpu us'))
+    for mode, name, writes, wait, cpu in rows:
+        print('%-16s %-8s %12.1f %10.2f %12.2f %12.1f' % (mode, name, writes, wait / 1000, bus_ms(writes, wait),
+                                                        cpu * 1e6))
+    print('custom glyph upload on attach: %d writes (%.1f ms)' % (glyph_writes, glyph_writes * args.us_per_write / 1000))
+
+
+if __name__ == '__main__':
+    main()
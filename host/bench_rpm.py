@@ -0,0 +1,61 @@
+"""Host benchmark for the shared RPM service (rpm_service.py).
+
+Simulates Hall pulses on 1..16 tachometer channels by calling the registered
+IRQ handlers directly, then times one processing tick. Shows how the per-tick
+cost grows with the number of channels and with the pulse rate.
+
+    python host/bench_rpm.py [--ticks 200] [--pulses 20]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from rpm_service import RpmService  # noqa: E402
+
+
+class FakeClock:
+    """Deterministic microsecond clock standing in for time.ticks_us."""
+
+    def __init__(self):
+        self.now = 0
+
+    def ticks_us(self):
+        return self.now
+
+
+def bench(n_channels, pulses_per_tick, ticks):
+    clock = FakeClock()
+    svc = RpmService(clock.ticks_us, interval_ms=100, queue_size=1024)
+    for _ in range(n_channels):
+        svc.register(rpm_multiplier=569, moving_average_window=25)
+    step = 100000 // max(1, pulses_per_tick * n_channels)
+    spent = 0.0
+    for _ in range(ticks):
+        # one tick worth of interleaved pulses from every channel
+        for _ in range(pulses_per_tick):
+            for handler in svc.handlers:
+                clock.now += step
+                handler(None)
+        t0 = time.perf_counter()
+        svc.process()
+        spent += time.perf_counter() - t0
+    return spent / ticks, svc
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ticks', type=int, default=200)
+    parser.add_argument('--pulses', type=int, default=20, help='pulses per channel per tick')
+    args = parser.parse_args()
+
+    print('%-9s %14s %14s %10s %8s' % ('channels', 'us/tick', 'us/channel', 'rpm[0]', 'dropped'))
+    for n in (1, 2, 4, 8, 16):
+        per_tick, svc = bench(n, args.pulses, args.ticks)
+        print('%-9d %14.1f %14.2f %10d %8d' % (n, per_tick * 1e6, per_tick * 1e6 / n, svc.rpm[0], svc.dropped))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Telemetry throughput test over a pseudo-terminal pair.
+
+The firmware-side Telemetry class writes frames into the master end of a pty
+while a reader thread decodes the slave end with FrameDecoder. Reports frames
+per second, bytes per frame and any CRC errors / resyncs. A few corrupted
+bytes are injected to exercise resynchronisation.
+
+    python host/bench_telemetry.py [--frames 20000]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+import tty
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from power_engine import PowerResult  # noqa: E402
+from telemetry import CRC_SIZE, HEADER_SIZE, MEASUREMENT_SIZE, Telemetry  # noqa: E402
+from telemetry_receiver import FrameDecoder  # noqa: E402
+
+
+class FdStream:
+    """Minimal stream with write() over a file descriptor, like machine.UART."""
+
+    def __init__(self, fd):
+        self.fd = fd
+
+    def write(self, data):
+        view = memoryview(data)
+        while view:
+            n = os.write(self.fd, view)
+            view = view[n:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames', type=int, default=20000)
+    args = parser.parse_args()
+
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    tty.setraw(master)
+    decoder = FrameDecoder()
+    done = threading.Event()
+
+    def reader():
+        while not done.is_set() or decoder.frames < args.frames:
+            try:
+                data = os.read(slave, 65536)
+            except OSError:
+                break
+            decoder.feed(data)
+            if decoder.frames >= args.frames:
+                break
+
+    thread = threading.Thread(target=reader, daemon=True)
+    thread.start()
+    stream = FdStream(master)
+    tx = Telemetry(stream, lambda: int(time.monotonic() * 1000), lambda a, b: a - b, period_ms=0)
+    r = PowerResult('L1')
+    r.vrms, r.irms, r.p, r.s, r.phase, r.freq, r.crest_v, r.crest_i = 230.0, 3.2, 650.0, 736.0, 12.5, 50.0, 1.41, 1.6
+    r.derive()
+    r.dpf = 0.976
+    t0 = time.perf_counter()
+    for n in range(args.frames):
+        tx.send(r, n * 0.01, 1450, 200000, 12000, 800)
+        if n % 5000 == 2500:
+            stream.write(b'\xA5\x5A\x01\x40garbage')  # corrupted frame
+    done.set()
+    thread.join(timeout=10)
+    elapsed = time.perf_counter() - t0
+    frame_bytes = HEADER_SIZE + MEASUREMENT_SIZE + CRC_SIZE
+    print('sent=%d decoded=%d crc_errors=%d resyncs=%d' % (tx.sent, decoder.frames, decoder.crc_errors, decoder.resyncs))
+    print('%d bytes/frame, %.0f frames/s, %.2f MB/s, %.1f us/frame send+decode' % (
+        frame_bytes, decoder.frames / elapsed, decoder.frames * frame_bytes / elapsed / 1e6, elapsed / args.frames * 1e6))
+    print('at 115200 baud the link carries %.0f frames/s' % (115200 / 10 / frame_bytes))
+    os.close(master)
+    os.close(slave)
+
+
+if __name__ == '__main__':
+    main()
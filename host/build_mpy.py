@@ -0,0 +1,149 @@
+"""Precompile the firmware modules to .mpy and optionally deploy/measure them.
+
+    python host/build_mpy.py                       # build/mpy/*.mpy + main.py stub
+    python host/build_mpy.py --entry main.py       # another firmware profile
+    python host/build_mpy.py --deploy /dev/ttyUSB0 # copy to the board with mpremote
+    python host/build_mpy.py --deploy /dev/ttyUSB0 --measure [--source]
+    python host/build_mpy.py --deploy /dev/ttyUSB0 --compare  # .py then .mpy, one table
+
+Compiled modules skip the on-device lexer/parser/compiler at every boot and
+drop comments and docstrings (the build prints source vs .mpy size per
+module). That should shorten boot and leave less heap fragmentation from the
+compiler, but the gain has not been measured on a board yet; --compare
+gives the numbers. The entry profile itself is compiled too and a
+two-line main.py stub imports it and calls main(). The profiles are thin
+configs over monitor.py, so --entry main.py is simply copied as the boot file.
+
+--measure hard-resets the board after deploying and reads the boot metrics
+the firmware prints ("... ms پس از بوت ..." after start() and after the first
+reading). Run it once with --source (plain .py files) and once without to get
+before/after numbers, or use --compare, which builds, deploys and measures
+both in turn and prints them side by side. Needs mpy-cross (pip install
+mpy-cross), mpremote and pyserial.
+"""
+import argparse
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+BUILD = os.path.join(ROOT, 'build', 'mpy')
+
+# firmware modules imported by the entry profiles
+FIRMWARE_MODULES = (
+    'lcd_api', 'i2c_lcd', 'tm1637', 'hardware', 'monitor',
+    'power_engine', 'rpm_service', 'events', 'capture', 'telemetry', 'scheduler',
+    'supervisor', 'powersave', 'lcd_ui', 'tm_presenter', 'console', 'selftest', 'aggregate', 'classifier', 'isr',
+)
+
+STUB = 'import {name}\n{name}.main()\n'
+METRIC = re.compile(r'(\d+) ms .*?(\d+)')
+
+
+def build(entry, march=None, source=False):
+    shutil.rmtree(BUILD, ignore_errors=True)
+    os.makedirs(BUILD)
+    entry_name = os.path.splitext(os.path.basename(entry))[0]
+    rows = []
+    # main.py is what the board boots, so it cannot also be the stub's target
+    stub = entry_name != 'main'
+    for name in FIRMWARE_MODULES + (entry_name,):
+        src = os.path.join(ROOT, name + '.py')
+        if source or not stub and name == entry_name:
+            shutil.copy(src, os.path.join(BUILD, name + '.py'))
+            out = os.path.join(BUILD, name + '.py')
+        else:
+            out = os.path.join(BUILD, name + '.mpy')
+            cmd = ['mpy-cross', '-o', out] + (['-march=' + march] if march else []) + [src]
+            subprocess.run(cmd, check=True)
+        rows.append((name, os.path.getsize(src), os.path.getsize(out)))
+    if stub:
+        with open(os.path.join(BUILD, 'main.py'), 'w') as f:
+            f.write(STUB.format(name=entry_name))
+    return rows
+
+
+def deploy(port):
+    base = ['mpremote', 'connect', port]
+    files = sorted(os.listdir(BUILD))
+    # remove stale copies of the other format so the board cannot import the wrong one
+    stale = [os.path.splitext(f)[0] + ('.py' if f.endswith('.mpy') else '.mpy') for f in files if f != 'main.py']
+    subprocess.run(base + ['exec', 'import os\nfor f in %r:\n try: os.remove(f)\n except OSError: pass' % stale], check=True)
+    for name in files:
+        subprocess.run(base + ['fs', 'cp', os.path.join(BUILD, name), ':' + name], check=True)
+
+
+def measure(port, baud=115200, timeout=60):
+    import serial
+    subprocess.run(['mpremote', 'connect', port, 'reset'], check=True)
+    found = []
+    with serial.Serial(port, baud, timeout=1) as ser:
+        end = time.time() + timeout
+        while time.time() < end and len(found) < 2:
+            line = ser.readline().decode('utf-8', 'replace').strip()
+            if 'پس از بوت' in line:
+                m = METRIC.search(line)
+                found.append((int(m.group(1)), int(m.group(2))))
+                print(line)
+    return found
+
+
+def boot_metrics(port):
+    """Reset and return (start() ms, first reading ms, free heap B) or None."""
+    found = measure(port)
+    if len(found) != 2:
+        print('boot metrics not seen on the serial console', file=sys.stderr)
+        return None
+    return found[0][0], found[1][0], found[1][1]
+
+
+def compare(entry, march, port):
+    """Deploy and measure the plain sources, then the compiled modules."""
+    results = []
+    for label, source in (('.py', True), ('.mpy', False)):
+        build(entry, march, source)
+        deploy(port)
+        metrics = boot_metrics(port)
+        if metrics is None:
+            return False
+        results.append((label,) + metrics)
+    print('%-6s %12s %18s %14s' % ('build', 'start() ms', 'first reading ms', 'free heap B'))
+    for row in results:
+        print('%-6s %12d %18d %14d' % row)
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entry', default='main_bugFix.py', help='firmware profile to boot')
+    parser.add_argument('--march', help='e.g. xtensawin for ESP32 native code (bytecode is portable)')
+    parser.add_argument('--source', action='store_true', help='deploy plain .py files instead (baseline)')
+    parser.add_argument('--deploy', metavar='PORT')
+    parser.add_argument('--measure', action='store_true')
+    parser.add_argument('--compare', action='store_true', help='measure .py and .mpy builds in turn (needs --deploy)')
+    args = parser.parse_args()
+
+    if args.compare:
+        if not args.deploy:
+            parser.error('--compare needs --deploy PORT')
+        sys.exit(0 if compare(args.entry, args.march, args.deploy) else 1)
+
+    rows = build(args.entry, args.march, args.source)
+    print('%-14s %10s %10s' % ('module', 'source B', 'built B'))
+    for name, src, out in rows:
+        print('%-14s %10d %10d' % (name, src, out))
+    print('%-14s %10d %10d' % ('total', sum(r[1] for r in rows), sum(r[2] for r in rows)))
+    if args.deploy:
+        deploy(args.deploy)
+        if args.measure:
+            metrics = boot_metrics(args.deploy)
+            if metrics is None:
+                sys.exit(1)
+            print('start() done %d ms, first reading %d ms after boot, free heap %d B' % metrics)
+
+
+if __name__ == '__main__':
+    main()
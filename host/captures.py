@@ -0,0 +1,164 @@
+"""Pull and decode waveform captures written by capture.py on the device.
+
+    python host/captures.py pull --port /dev/ttyUSB0 --dest captures/
+    python host/captures.py show captures/cap_000.bin
+    python host/captures.py csv captures/cap_000.bin > cap_000.csv
+    python host/captures.py check
+
+`pull` uses mpremote to copy every /cap_*.bin file from the board. The capture
+layout is [pre | trigger window | post]; segments are not contiguous in time,
+their start offsets relative to the trigger window are stored in the header,
+and so is the measured sample period (version 2; version 1 files stored the
+nominal sample_interval_us and are still read). `check` round-trips a capture
+taken on a simulated clock whose ADC reads make the real period longer than
+the nominal one, and exits non-zero if any decoded sample time is off by
+more than half a period.
+"""
+import argparse
+import math
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+from array import array
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from capture import HEADER, HEADER_V1, MAGIC, WaveformCapture  # noqa: E402
+from power_engine import Channel, ChannelSet  # noqa: E402
+
+FIELDS = ('magic', 'version', 'channel', 'code', 'reserved', 'pre', 'window', 'post',
+          'interval_us', 'pt_scale', 'ct_scale', 'time_ms', 'pre_offset_us', 'post_offset_us')
+
+
+def read_capture(path):
+    """Return (header dict, voltage counts, current counts) for one capture file."""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    fmt = HEADER_V1 if raw[4:5] == b'\x01' else HEADER
+    size = struct.calcsize(fmt)
+    header = dict(zip(FIELDS, struct.unpack_from(fmt, raw)))
+    if header['magic'] != MAGIC:
+        raise ValueError('%s: not a waveform capture' % path)
+    total = header['pre'] + header['window'] + header['post']
+    v = array('H')
+    i = array('H')
+    v.frombytes(raw[size:size + 2 * total])
+    i.frombytes(raw[size + 2 * total:size + 4 * total])
+    if sys.byteorder != 'little':
+        v.byteswap()
+        i.byteswap()
+    return header, v, i
+
+
+def sample_times_us(header):
+    """Time of every sample relative to the start of the trigger window."""
+    dt = header['interval_us']
+    times = [header['pre_offset_us'] + k * dt for k in range(header['pre'])]
+    times += [k * dt for k in range(header['window'])]
+    times += [header['post_offset_us'] + k * dt for k in range(header['post'])]
+    return times
+
+
+class _Clock:
+    """Microsecond clock advanced by the sampling delay and by every ADC read."""
+
+    def __init__(self, read_us):
+        self.now = 0
+        self.read_us = read_us
+
+    def ticks_us(self):
+        return self.now
+
+    def sleep_us(self, us):
+        self.now += us
+
+
+class _Adc:
+    """50 Hz sine on the clock; remembers when each sample was taken."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.times = []
+
+    def read(self):
+        t = self.clock.now
+        self.times.append(t)
+        self.clock.now += self.clock.read_us
+        return int(2048 + 1000 * math.sin(2 * math.pi * 50 * t * 1e-6))
+
+
+def check(interval_us=100, read_us=30, window=1000, pre=300, post=300):
+    """Capture on a clock whose real period differs from the nominal one and compare sample times."""
+    clock = _Clock(read_us)
+    adc = _Adc(clock)
+    current = _Adc(clock)  # its reads take time too, but only the voltage read times are kept
+    channels = ChannelSet([Channel(adc, current, 1.0, 1.0, window)], window, interval_us,
+                          clock.sleep_us, clock.ticks_us)
+    with tempfile.TemporaryDirectory() as tmp:
+        cap = WaveformCapture(channels, 0, pre, post, os.path.join(tmp, 'cap_'))
+        starts = []
+        for n in range(4):
+            starts.append(len(adc.times))
+            channels.acquire()
+            if n == 1:
+                cap.trigger(1)
+            cap.after_window()
+            clock.now += 5000  # pause between windows
+        header, v, _ = read_capture(cap.save())
+    t0 = adc.times[starts[1]]
+    truth = adc.times[starts[1] - pre:starts[1] + window] + adc.times[starts[2]:starts[2] + post]
+    truth = [t - t0 for t in truth]
+    decoded = sample_times_us(header)
+    worst = max(abs(a - b) for a, b in zip(decoded, truth))
+    period = channels.period_us
+    ok = len(decoded) == len(truth) and worst <= period / 2
+    print('nominal %d us, measured %.1f us, header %.1f us; worst sample time error %.1f us  %s'
+          % (interval_us, period, header['interval_us'], worst, 'OK' if ok else 'FAIL'))
+    return ok
+
+
+def pull(port, dest):
+    os.makedirs(dest, exist_ok=True)
+    base = ['mpremote'] + (['connect', port] if port else [])
+    listing = subprocess.run(base + ['fs', 'ls', ':'], check=True, capture_output=True, text=True).stdout
+    names = [line.split()[-1] for line in listing.splitlines()
+             if line.strip().endswith('.bin') and line.split()[-1].startswith('cap_')]
+    for name in names:
+        subprocess.run(base + ['fs', 'cp', ':' + name, os.path.join(dest, name)], check=True)
+        print(os.path.join(dest, name))
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    p = sub.add_parser('pull')
+    p.add_argument('--port')
+    p.add_argument('--dest', default='captures')
+    for name in ('show', 'csv'):
+        p = sub.add_parser(name)
+        p.add_argument('path')
+    sub.add_parser('check')
+    args = parser.parse_args()
+
+    if args.cmd == 'pull':
+        pull(args.port, args.dest)
+        return
+    if args.cmd == 'check':
+        sys.exit(0 if check() else 1)
+    header, v, i = read_capture(args.path)
+    if args.cmd == 'show':
+        for key in FIELDS[1:]:
+            print('%-15s %s' % (key, header[key]))
+        print('%-15s %d..%d' % ('v counts', min(v), max(v)))
+        print('%-15s %d..%d' % ('i counts', min(i), max(i)))
+        return
+    print('t_us,v_count,i_count,v,i')
+    for t, a, b in zip(sample_times_us(header), v, i):
+        print('%.0f,%d,%d,%.3f,%.4f' % (t, a, b, a * header['pt_scale'], b * header['ct_scale']))
+
+
+if __name__ == '__main__':
+    main()
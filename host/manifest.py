@@ -0,0 +1,13 @@
+# Freeze the firmware modules into a custom MicroPython image, so they run
+# from flash and use no heap for bytecode:
+#   cd micropython/ports/esp32
+#   make BOARD=ESP32_GENERIC FROZEN_MANIFEST=/path/to/this/repo/host/manifest.py
+# Keep the module list in sync with FIRMWARE_MODULES in build_mpy.py.
+include("$(PORT_DIR)/boards/manifest.py")
+
+for name in (
+    "lcd_api", "i2c_lcd", "tm1637", "hardware", "monitor",
+    "power_engine", "rpm_service", "events", "capture", "telemetry", "scheduler",
+    "supervisor", "powersave", "lcd_ui", "tm_presenter", "console", "selftest", "aggregate", "classifier", "isr",
+):
+    module(name + ".py", base_path="..")
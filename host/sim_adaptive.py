@@ -0,0 +1,194 @@
+"""Host simulation of the adaptive scheduler (scheduler.py).
+
+Replays a synthetic load profile (steady running with Irms and RPM steps)
+through a timing model of the firmware loop and compares schedules by
+latency-to-detect versus CPU use. The current is not fed to the scheduler
+directly: a 12-bit ADC on a simulated clock reads a biased 50 Hz sine whose
+RMS follows the profile, power_engine.ChannelSet acquires and computes each
+window, and the scheduler sees the channel's AC Irms, as in monitor.py. A
+step in the middle of a window is therefore only partly visible in it. The
+model treats acquisition (the sleep_us loop busy-waits), computation and the
+LCD refresh as busy time, and the pause between windows as idle time.
+
+Adaptive schedules idle longer than the fixed one once the load is steady.
+With early wake, AdaptiveScheduler.wait checks the RPM every 100 ms of the
+pause and takes a two-cycle current probe (ChannelSet.probe_current, busy
+time) every 500 ms, ending the pause as soon as either one steps.
+
+    python host/sim_adaptive.py [--minutes 30] [--seed 1]
+"""
+import argparse
+import math
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from power_engine import ADC_MAX, Channel, ChannelSet  # noqa: E402
+from scheduler import AdaptiveScheduler  # noqa: E402
+
+# ESP32 timing model (us), from the firmware loop structure
+SAMPLE_INTERVAL_US = 100
+READ_US = 45          # two ADC reads + loop overhead per sample pair
+COMPUTE_US = 18       # per sample in Channel.compute
+OUTPUT_US = 35000     # LCD clear + 4 lines over I2C, telemetry
+
+PT_SCALE = 0.25
+CT_SCALE = 0.054
+VRMS = 230.0
+LAG_DEG = 30
+
+STATES = ((3.0, 1400), (4.6, 1700), (4.8, 0), (0.0, 0))  # slow, fast, stall, off
+
+
+def profile(minutes, seed):
+    """List of (start_us, irms, rpm) segments: steady periods with a step between each."""
+    rnd = random.Random(seed)
+    t = 0
+    end = minutes * 60 * 1000000
+    segments = []
+    state = STATES[0]
+    while t < end:
+        segments.append((t,) + state)
+        t += rnd.randint(20, 120) * 1000000
+        state = rnd.choice([s for s in STATES if s != state])
+    return segments, end
+
+
+def value_at(segments, t):
+    lo, hi = 0, len(segments) - 1
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if segments[mid][0] <= t:
+            lo = mid
+        else:
+            hi = mid - 1
+    return segments[lo][1], segments[lo][2]
+
+
+class Load:
+    """Simulated clock and the profile value at the current time (time only moves forward)."""
+
+    def __init__(self, segments):
+        self.segments = segments
+        self.now = 0
+        self.index = 0
+
+    def sleep_us(self, us):
+        self.now += us
+
+    def ticks_us(self):
+        return self.now
+
+    def value(self):
+        segments = self.segments
+        while self.index + 1 < len(segments) and segments[self.index + 1][0] <= self.now:
+            self.index += 1
+        return segments[self.index][1], segments[self.index][2]
+
+
+class SimAdc:
+    """12-bit ADC: 2048 bias + 50 Hz sine of the given RMS (physical units / scale) + noise."""
+
+    def __init__(self, load, scale, lag_deg, rnd, rms=None):
+        self.load = load
+        self.gain = math.sqrt(2) / scale
+        self.shift = math.radians(lag_deg)
+        self.rnd = rnd
+        self.rms = rms  # None: follow the profile current
+
+    def read(self):
+        load = self.load
+        load.now += READ_US // 2  # each of the two reads takes half of the per-pair time
+        rms = self.rms if self.rms is not None else load.value()[0]
+        x = 2048 + rms * self.gain * math.sin(2 * math.pi * 50e-6 * load.now - self.shift)
+        return min(ADC_MAX, max(0, int(x + self.rnd.gauss(0, 3))))
+
+
+class Rpm:
+    """RpmService.rpm stand-in: rpm[0] is the profile speed at the current time with 1 % noise."""
+
+    def __init__(self, load, rnd):
+        self.load = load
+        self.rnd = rnd
+
+    def __getitem__(self, index):
+        return int(self.load.value()[1] * (1 + self.rnd.gauss(0, 0.01)))
+
+
+def run(sched, segments, end, rnd, wake=True):
+    load = Load(segments)
+    channel = Channel(SimAdc(load, PT_SCALE, 0, rnd, VRMS), SimAdc(load, CT_SCALE, LAG_DEG, rnd),
+                      PT_SCALE, CT_SCALE, sched.max_samples)
+    channels = ChannelSet([channel], sched.max_samples, SAMPLE_INTERVAL_US, load.sleep_us, load.ticks_us)
+    probe_us = [0]
+
+    def probe():
+        # the probe busy-waits like a window; its time counts as CPU
+        t = load.now
+        irms = channels.probe_current(2, channel.result.freq)
+        n = (load.now - t) // (SAMPLE_INTERVAL_US + READ_US // 2)
+        load.now += n * COMPUTE_US // 2  # one input instead of two
+        probe_us[0] += load.now - t
+        return irms
+
+    def sleep_ms(ms):
+        load.now += ms * 1000
+
+    rpm_now = Rpm(load, rnd)
+    busy = 0
+    windows = 0
+    latencies = []
+    steps = [s[0] for s in segments[1:]]
+    next_step = 0
+    while load.now < end:
+        n = sched.sample_count
+        channels.set_sample_count(n)
+        start = load.now
+        channels.acquire()
+        # RPM comes from its own service; the window sees the speed at its midpoint
+        _, rpm = value_at(segments, (start + load.now) // 2)
+        rpm = int(rpm * (1 + rnd.gauss(0, 0.01)))
+        channels.compute()
+        channels.analyze()
+        load.now += n * COMPUTE_US + OUTPUT_US
+        busy += load.now - start
+        windows += 1
+        if sched.update(channel.irms, rpm):
+            while next_step < len(steps) and steps[next_step] <= load.now:
+                latencies.append(load.now - steps[next_step])
+                next_step += 1
+        if wake:
+            sched.wait(sleep_ms, rpm_now, probe)
+        else:
+            sleep_ms(sched.pause_ms)
+    busy += probe_us[0]
+    missed = sum(1 for s in steps[next_step:] if s < end)
+    return busy / load.now, latencies, missed, windows / (load.now / 60e6)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--minutes', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    segments, end = profile(args.minutes, args.seed)
+    schedules = (
+        ('fixed 2000 / 500 ms', AdaptiveScheduler(2000, 2000, 500, 500), False),
+        ('adaptive 500-2000 / 50-2000 ms', AdaptiveScheduler(500, 2000, 50, 2000), True),
+        ('  same, no early wake', AdaptiveScheduler(500, 2000, 50, 2000), False),
+        ('adaptive 500-2000 / 50-4000 ms', AdaptiveScheduler(500, 2000, 50, 4000), True),
+    )
+    print('%d steps over %d minutes' % (len(segments) - 1, args.minutes))
+    print('%-33s %8s %12s %12s %8s %9s' % ('schedule', 'cpu %', 'mean lat ms', 'max lat ms', 'missed', 'upd/min'))
+    for name, sched, wake in schedules:
+        cpu, lat, missed, rate = run(sched, segments, end, random.Random(args.seed), wake)
+        mean = sum(lat) / len(lat) / 1000 if lat else float('nan')
+        worst = max(lat) / 1000 if lat else float('nan')
+        print('%-33s %8.1f %12.0f %12.0f %8d %9.0f' % (name, cpu * 100, mean, worst, missed, rate))
+
+
+if __name__ == '__main__':
+    main()
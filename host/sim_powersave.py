@@ -0,0 +1,120 @@
+"""Host simulation of the low-power duty-cycled mode (powersave.py) on a fake clock.
+
+A pump is scripted to start and stop at random times. Each cycle the device
+measures one window (--burst-ms awake), arms the Hall wake when the pump was
+stopped, and light-sleeps until the next period. The Hall sensor ends the sleep
+early when the pump starts. Printed per period: measured duty cycle, average
+current, battery life and the worst delay between a pump start and the first
+window that sees it, with and without the Hall wake.
+
+    python host/sim_powersave.py [--periods 2000,10000,60000] [--burst-ms 450] [--hours 24]
+"""
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from powersave import ACTIVE_MA, LIGHTSLEEP_MA, DutyCycler  # noqa: E402
+
+
+class FakeBoard:
+    """Fake clock, light sleep and Hall wake source driven by a pump on/off schedule."""
+
+    def __init__(self, schedule):
+        self.now = 0
+        self.schedule = schedule  # sorted (start_ms, stop_ms) running intervals
+        self.wake_armed = False
+
+    def ticks_ms(self):
+        return self.now
+
+    @staticmethod
+    def ticks_diff(a, b):
+        return a - b
+
+    def running(self, t=None):
+        t = self.now if t is None else t
+        for start, stop in self.schedule:
+            if start <= t < stop:
+                return True
+            if start > t:
+                break
+        return False
+
+    def next_start(self, t):
+        for start, _ in self.schedule:
+            if start > t:
+                return start
+        return None
+
+    def lightsleep(self, ms):
+        end = self.now + ms
+        if self.wake_armed:
+            start = self.next_start(self.now)
+            if start is not None and start < end:
+                end = start + 1  # first Hall edge shortly after the pump starts
+        self.now = end
+
+
+def make_schedule(hours, runs_per_day, run_minutes, seed):
+    rng = random.Random(seed)
+    total = int(hours * 3600000)
+    runs = max(1, int(runs_per_day * hours / 24))
+    starts = sorted(rng.randrange(0, total) for _ in range(runs))
+    schedule = []
+    for s in starts:
+        if schedule and s < schedule[-1][1]:
+            continue
+        schedule.append((s, s + int(rng.uniform(0.5, 1.5) * run_minutes * 60000)))
+    return schedule, total
+
+
+def simulate(period_ms, burst_ms, schedule, total_ms, hall_wake):
+    board = FakeBoard(schedule)
+    dc = DutyCycler(board.lightsleep, board.ticks_ms, board.ticks_diff, period_ms, max_sleep_ms=4000)
+    dc.enable()
+    seen = set()
+    worst = 0
+    while board.now < total_ms:
+        board.now += burst_ms  # one measurement window
+        running = board.running()
+        for start, stop in schedule:
+            if running and start <= board.now < stop and start not in seen:
+                seen.add(start)
+                worst = max(worst, board.now - start)
+        board.wake_armed = hall_wake and not running
+        dc.sleep()
+    return dc, worst
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--periods', default='2000,10000,60000', help='comma separated measurement periods (ms)')
+    parser.add_argument('--burst-ms', type=int, default=450, help='awake time per window (acquire + output)')
+    parser.add_argument('--hours', type=float, default=24)
+    parser.add_argument('--runs-per-day', type=float, default=12)
+    parser.add_argument('--run-minutes', type=float, default=20)
+    parser.add_argument('--battery-mah', type=float, default=3000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    schedule, total = make_schedule(args.hours, args.runs_per_day, args.run_minutes, args.seed)
+    print('%d pump runs in %.0f h, burst %d ms, active %.1f mA, light sleep %.1f mA' % (
+        len(schedule), args.hours, args.burst_ms, ACTIVE_MA, LIGHTSLEEP_MA))
+    print('%-10s %-9s %9s %9s %10s %10s %8s %14s' % ('period', 'hall', 'expected', 'duty', 'avg mA', 'battery',
+                                                   'wakes', 'worst detect'))
+    print('%-10s %-9s %9s %9s %10.1f %9.1fd %8s %14s' % ('continuous', '-', '100.0%', '100.0%', ACTIVE_MA,
+                                                       args.battery_mah / ACTIVE_MA / 24, '-', '%d ms' % args.burst_ms))
+    for period in [int(p) for p in args.periods.split(',')]:
+        for hall_wake in (False, True):
+            dc, worst = simulate(period, args.burst_ms, schedule, total, hall_wake)
+            ma = dc.average_ma()
+            print('%-10s %-9s %8.1f%% %8.1f%% %10.2f %9.1fd %8d %14s' % (
+                '%d ms' % period, 'wake' if hall_wake else 'off', dc.expected_duty(args.burst_ms) * 100,
+                dc.duty * 100, ma, args.battery_mah / ma / 24, dc.wakes, '%d ms' % worst))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,388 @@
+"""Run every firmware profile on a simulated board through the shared monitor core.
+
+Each profile's CONFIG (main.py, main_bugFix.py, main_comment.py) is handed to
+monitor.Monitor together with SimBoard, a host backend with the same methods
+as hardware.Esp32Hardware: a simulated microsecond clock advanced by the
+sampling delays and pauses, PT/CT ADCs on that clock, a Hall input pulsing
+at the target speed, the periodic RPM timer, counting LCD/TM1637 and a
+telemetry sink. Prints per profile the last calibrated window, the displayed
+RPM, device traffic and host time per window; the same loop, DSP and RPM code
+runs for all of them, so a change to the hot path is measured once.
+
+The ADC amplitudes are derived from physical targets (--vrms, --irms) and
+each profile's own pt/ct scale. Every profile's calibrated V, I and P must
+read the simulated load within 2 %, and it is checked for events: the
+nominal run and an idle motor (mains present, no current, no pulses)
+must raise none, and a short voltage swell must raise SWELL, clear it,
+turn the alarm output off again and be listed by the console `events`
+command where the profile has a console. A last case runs the full profile
+(main_bugFix.py) with two channel pairs carrying different currents: both
+channels and the ChannelSet totals (P, Q, S, PF) must read the load, the
+decoded telemetry must carry the second channel and the totals, the
+aggregator must collect both, and an overcurrent on the second channel
+alone must be raised and cleared as that channel's event. The script exits
+non-zero otherwise.
+
+    python host/sim_profiles.py [--windows 40] [--rpm 1450] [--vrms 230] [--irms 3]
+"""
+import argparse
+import importlib
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_lcd import FakeI2C, FakeLcd  # noqa: E402
+from events import EVENT_NAMES  # noqa: E402
+from monitor import DEFAULT_CONFIG, Monitor  # noqa: E402
+from power_engine import ADC_MAX  # noqa: E402
+from telemetry_receiver import FrameDecoder  # noqa: E402
+
+PROFILES = ('main_bugFix', 'main', 'main_comment')
+# board files, flash logs and the REPL are not touched on the host
+HOST_CONFIG = {'supervisor_state': None, 'aggregate_log': None, 'waveform_capture': False, 'config_path': None}
+LAG_DEG = 30  # current lags voltage (inductive motor load)
+SWELL_VRMS = 270  # above events.DEFAULT_THRESHOLDS['swell_v']
+READING_TOLERANCE = 0.02  # calibrated V, I and P of the nominal run, relative to the simulated load
+SECOND_PAIR = (34, 39)  # extra (voltage, current) ADC pins of the two-channel case
+OVERCURRENT_IRMS = 7.0  # above events.DEFAULT_THRESHOLDS['overcurrent_a']
+
+
+def amplitude(rms, scale):
+    """ADC counts of the sine peak that the firmware reads back as `rms` with this scale."""
+    return rms * math.sqrt(2) / scale
+
+
+class SimAdc:
+    """12-bit ADC reading bias + sine at the board clock; the amplitude is board.amplitudes[key]."""
+
+    def __init__(self, board, key, phase_deg, seed):
+        self.board = board
+        self.key = key
+        self.shift = math.radians(phase_deg)
+        self.rng = random.Random(seed)
+
+    def read(self):
+        x = 2048 + self.board.amplitudes[self.key] * math.sin(2 * math.pi * 50 * self.board.now * 1e-6 - self.shift)
+        return min(ADC_MAX, max(0, int(x + self.rng.gauss(0, 3))))
+
+
+class SimPin:
+    def __init__(self):
+        self.handler = None
+        self.level = 0
+
+    def irq(self, trigger=None, handler=None):
+        self.handler = handler
+
+    def value(self, v=None):
+        if v is not None:
+            self.level = v
+        return self.level
+
+
+class SimTimer:
+    PERIODIC = 1
+
+    def __init__(self, board):
+        self.board = board
+
+    def init(self, period, mode, callback):
+        self.board.timers.append([self.board.now + period * 1000, period * 1000, callback, self])
+
+    def deinit(self):
+        self.board.timers = [t for t in self.board.timers if t[3] is not self]
+
+
+class SimSegments:
+    def __init__(self):
+        self.clk = self.dio = None
+        self.writes = 0
+        self._brightness = 7
+
+    def write(self, frame):
+        self.writes += 1
+
+    def brightness(self, value=None):
+        if value is None:
+            return self._brightness
+        self._brightness = value
+
+
+class Sink:
+    def __init__(self):
+        self.bytes = 0
+        self.data = bytearray()
+
+    def write(self, data):
+        self.bytes += len(data)
+        self.data += data
+
+
+class Watchdog:
+    def feed(self):
+        pass
+
+
+class SimBoard:
+    """Host backend for monitor.Monitor (same interface as hardware.Esp32Hardware)."""
+
+    IRQ_RISING = 1
+
+    def __init__(self, pulse_period_us, v_amplitude, i_amplitude, lag_deg=LAG_DEG):
+        """pulse_period_us None: the Hall input stays quiet (motor stopped); amplitudes in ADC counts."""
+        self.now = 0
+        self.timers = []
+        self.hall = []
+        self.outputs = []
+        self.pulse_period_us = pulse_period_us or 0
+        self.next_pulse = pulse_period_us or float('inf')
+        self.amplitudes = {'v': v_amplitude, 'i': i_amplitude, 'lag': lag_deg}
+        self.adcs = 0
+        self.i2c = FakeI2C()
+        self.segments = []
+        self.uart_sink = Sink()
+        self.lightsleep = self.sleep_ms
+
+    # simulated clock: pulses and timer callbacks fire in time order while it advances
+    def advance(self, us):
+        end = self.now + us
+        while True:
+            tick = min(self.timers, key=lambda t: t[0]) if self.timers else None
+            t_next = min(self.next_pulse, tick[0] if tick else end + 1)
+            if t_next > end:
+                break
+            self.now = t_next
+            if tick and tick[0] == t_next:
+                tick[0] += tick[1]
+                tick[2](tick[3])
+            else:
+                self.next_pulse += self.pulse_period_us
+                for pin in self.hall:
+                    if pin.handler:
+                        pin.handler(pin)
+        self.now = end
+
+    def ticks_us(self):
+        return self.now
+
+    def ticks_ms(self):
+        return self.now // 1000
+
+    @staticmethod
+    def ticks_diff(a, b):
+        return a - b
+
+    # interrupts are delivered synchronously by advance(), nothing can preempt a swap
+    def disable_irq(self):
+        return 0
+
+    def enable_irq(self, state):
+        pass
+
+    def sleep_us(self, us):
+        self.advance(us)
+
+    def sleep_ms(self, ms):
+        self.advance(ms * 1000)
+
+    def adc(self, pin):
+        # channel pins come in (voltage, current) pairs; pair n > 0 reads 'v<n+1>'/'i<n+1>' if set
+        pair, current = divmod(self.adcs, 2)
+        self.adcs += 1
+        a = self.amplitudes
+        key = 'i' if current else 'v'
+        if pair and key + str(pair + 1) in a:
+            key += str(pair + 1)
+        return SimAdc(self, key, a['lag'] if current else 0, self.adcs)
+
+    def lcd(self, rows=4, columns=20, recover=False):
+        return FakeLcd(self.i2c, rows, columns)
+
+    def segment_display(self, clk_pin, dio_pin, decimal=True):
+        display = SimSegments()
+        self.segments.append(display)
+        return display
+
+    def hall_input(self, pin):
+        pin = SimPin()
+        self.hall.append(pin)
+        return pin
+
+    def output(self, pin):
+        pin = SimPin()
+        self.outputs.append(pin)
+        return pin
+
+    def button(self, pin, handler):
+        return SimPin()
+
+    def timer(self):
+        return SimTimer(self)
+
+    def uart(self, uart_id, baud, tx_pin, rx_pin, txbuf=1024):
+        return self.uart_sink
+
+    def watchdog(self, timeout_ms):
+        return Watchdog()
+
+    def wake_on(self, pin):
+        pass
+
+    def reset_cause(self):
+        return 'PWRON_RESET'
+
+    def mem_free(self):
+        return 0
+
+    def console_reader(self):
+        return lambda: None
+
+
+def setup(profile, rpm, vrms, irms, extra=None, irms2=None):
+    """irms2: current of the second channel pair (if config 'channel_pins' has one)."""
+    config = dict(importlib.import_module(profile).CONFIG)
+    config.update(HOST_CONFIG)
+    config.update(extra or {})
+    multiplier = config.get('rpm_multiplier', 569)
+    pt = config.get('pt_scale', DEFAULT_CONFIG['pt_scale'])
+    ct = config.get('ct_scale', DEFAULT_CONFIG['ct_scale'])
+    # the firmware counts pulses per 100 ms period and multiplies by rpm_multiplier
+    board = SimBoard(100000 * multiplier // rpm if rpm else None, amplitude(vrms, pt), amplitude(irms, ct))
+    if irms2 is not None:
+        board.amplitudes['i2'] = amplitude(irms2, ct)
+    monitor = Monitor(board, config)
+    monitor.start()
+    return board, monitor
+
+
+def run(profile, windows, rpm, vrms, irms):
+    board, monitor = setup(profile, rpm, vrms, irms)
+    t0 = time.perf_counter()
+    monitor.run(windows)
+    host_ms = (time.perf_counter() - t0) * 1000 / windows
+    r = monitor.channels.results[0]
+    print(f"{profile:13s} V {r.vrms:6.1f}  I {r.irms:5.2f}  P {r.p:7.1f}  PF {r.pf:4.2f}  "
+          f"rpm {monitor.rpm_service.rpm[0]:5d}  lcd {board.i2c.writes:6d} writes  "
+          f"tm {sum(s.writes for s in board.segments):4d}  telemetry {board.uart_sink.bytes:6d} B  "
+          f"{host_ms:6.1f} ms/window (host)")
+    return board, monitor
+
+
+def raised(monitor):
+    return [EVENT_NAMES[code] for _, code, up, _, _ in monitor.events.log.entries() if up]
+
+
+def within(name, got, want):
+    """'' if got is within READING_TOLERANCE of want, else a description."""
+    return '' if abs(got - want) <= READING_TOLERANCE * abs(want) else f"{name} {got:.2f} (want {want:.2f})"
+
+
+def alarm_level(board):
+    return board.outputs[0].level if board.outputs else 0
+
+
+def check_reading(r, vrms, irms):
+    """The displayed (calibrated) reading matches the simulated load."""
+    p = vrms * irms * math.cos(math.radians(LAG_DEG))
+    bad = [e for e in (within('V', r.vrms, vrms), within('I', r.irms, irms), within('P', r.p, p)) if e]
+    print(f"  {'reading':8s} {', '.join(bad) or 'V, I, P within %.0f%%' % (READING_TOLERANCE * 100)}  "
+          f"{'FAIL' if bad else 'OK'}")
+    return not bad
+
+
+def check_profile(profile, windows, rpm, vrms, irms):
+    """Nominal reading within tolerance; nominal and idle runs raise nothing; a swell is raised,
+    cleared and the alarm goes off."""
+    board, monitor = run(profile, windows, rpm, vrms, irms)
+    ok = check_reading(monitor.channels.results[0], vrms, irms)
+    for name, (board, monitor) in (('nominal', (board, monitor)), ('idle', run(profile, windows, 0, vrms, 0.0))):
+        names = raised(monitor)
+        good = not names and not alarm_level(board)
+        print(f"  {name:8s} events: {', '.join(names) or 'none'}  alarm {alarm_level(board)}  "
+              f"{'OK' if good else 'FAIL'}")
+        ok &= good
+    board, monitor = setup(profile, rpm, vrms, irms)
+    nominal_v = board.amplitudes['v']
+    monitor.run(5)
+    board.amplitudes['v'] = nominal_v * SWELL_VRMS / vrms
+    monitor.run(6)
+    board.amplitudes['v'] = nominal_v
+    monitor.run(6)
+    log = [(EVENT_NAMES[code], up) for _, code, up, _, _ in monitor.events.log.entries()]
+    good = log == [('SWELL', True), ('SWELL', False)] and not monitor.events.active_mask and not alarm_level(board)
+    print(f"  {'swell':8s} events: {', '.join('%s %s' % (n, 'on' if up else 'off') for n, up in log) or 'none'}  "
+          f"alarm {alarm_level(board)}  {'OK' if good else 'FAIL'}")
+    if monitor.console:
+        # the RAM-only event log is readable over the console
+        reply = monitor.console.execute('events')
+        shown = reply.startswith('OK') and 'SWELL on' in reply and 'SWELL off' in reply
+        print(f"  {'console':8s} {reply}  {'OK' if shown else 'FAIL'}")
+        good &= shown
+    return ok and good
+
+
+def check_channels(windows, rpm, vrms, irms, irms2):
+    """Two channel pairs: per-channel and total readings, telemetry frames and per-channel events."""
+    pins = DEFAULT_CONFIG['channel_pins'] + (SECOND_PAIR,)
+    board, monitor = setup('main_bugFix', rpm, vrms, irms, {'channel_pins': pins}, irms2)
+    ct = monitor.config['ct_scale']
+    monitor.run(windows)
+    channels = monitor.channels
+    lag = math.radians(LAG_DEG)
+    total_s = vrms * (irms + irms2)
+    bad = [e for e in (
+        within('L1 I', channels.results[0].irms, irms), within('L2 I', channels.results[1].irms, irms2),
+        within('L2 V', channels.results[1].vrms, vrms),
+        within('P', channels.p, total_s * math.cos(lag)), within('Q', channels.q, total_s * math.sin(lag)),
+        within('S', channels.s, total_s), within('PF', channels.pf, math.cos(lag))) if e]
+    print(f"{'2 channels':13s} P {channels.p:7.1f}  Q {channels.q:7.1f}  S {channels.s:7.1f}  PF {channels.pf:4.2f}")
+    print(f"  {'totals':8s} {', '.join(bad) or 'L1, L2 and P, Q, S, PF within %.0f%%' % (READING_TOLERANCE * 100)}  "
+          f"{'FAIL' if bad else 'OK'}")
+    ok = not bad
+    rows = FrameDecoder(len(pins)).feed(board.uart_sink.data)
+    l2 = [row for row in rows if row.get('channel') == 1]
+    totals = [row for row in rows if row.get('channel') == 'total']
+    good = bool(l2 and totals) and not within('P', totals[-1]['real_power'], total_s * math.cos(lag)) \
+        and not within('L2 I', l2[-1]['irms'], irms2)
+    aggregator = monitor.aggregator
+    counts = [aggregator.tiers[0][aggregator.metrics.index(name)].count for name in ('L2.irms', 'total.p')]
+    good &= all(counts)
+    print(f"  {'frames':8s} {len(l2)} channel, {len(totals)} total; aggregated L2.irms {counts[0]}, "
+          f"total.p {counts[1]}  {'OK' if good else 'FAIL'}")
+    ok &= good
+    # overcurrent on the second channel only
+    nominal_i2 = board.amplitudes['i2']
+    board.amplitudes['i2'] = amplitude(OVERCURRENT_IRMS, ct)
+    monitor.run(6)
+    board.amplitudes['i2'] = nominal_i2
+    monitor.run(6)
+    log = [(EVENT_NAMES[code], up, channel) for _, code, up, _, channel in monitor.events.log.entries()]
+    good = log == [('OC', True, 1), ('OC', False, 1)] and not monitor.events.active_mask
+    print(f"  {'L2 OC':8s} events: "
+          f"{', '.join('%s L%d %s' % (n, c + 1, 'on' if up else 'off') for n, up, c in log) or 'none'}  "
+          f"{'OK' if good else 'FAIL'}")
+    return ok and good
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--windows', type=int, default=40, help='long enough for the RPM average and the adaptive window to settle')
+    parser.add_argument('--rpm', type=int, default=1450)
+    parser.add_argument('--vrms', type=float, default=230.0, help='nominal mains voltage')
+    parser.add_argument('--irms', type=float, default=3.0, help='nominal motor current')
+    parser.add_argument('profiles', nargs='*', default=PROFILES)
+    args = parser.parse_args()
+    ok = True
+    for profile in args.profiles:
+        ok &= check_profile(profile, args.windows, args.rpm, args.vrms, args.irms)
+    ok &= check_channels(args.windows, args.rpm, args.vrms, args.irms, args.irms / 2)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+"""Host simulation of supervised recovery (supervisor.py) on a fake clock.
+
+Runs the main loop's stage sequence (acquire, compute, LCD, telemetry) against
+fake peripherals that fail in scripted ways and a fake watchdog, and reports
+how long each fault took to recover from, how many WDT feeds were withheld and
+whether the watchdog had to reset the board. The "reboot" column is what the
+same fault costs without per-peripheral recovery: WDT timeout plus boot time.
+The LCD and TM1637 are registered as non-essential, as in monitor.py, so a
+display that never comes back must not reset the board; the last scenario
+registers the LCD with reboot=True to show the opt-in last-resort reset.
+
+    python host/sim_recovery.py [--window-ms 300] [--pause-ms 500] [--boot-ms 2500] [-v]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from supervisor import Supervisor  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def ticks_ms(self):
+        return self.now
+
+    @staticmethod
+    def ticks_diff(a, b):
+        return a - b
+
+
+class FakeWDT:
+    def __init__(self, clock, timeout_ms):
+        self.clock = clock
+        self.timeout_ms = timeout_ms
+        self.last = clock.now
+        self.feeds = 0
+
+    def feed(self):
+        self.last = self.clock.now
+        self.feeds += 1
+
+    def expired(self):
+        return self.clock.now - self.last >= self.timeout_ms
+
+
+class FakeDevice:
+    """A peripheral that is down between down_at and up_at, or fails one write after glitch_at.
+
+    Writes take write_ms, or hang_ms once hang_at has passed.
+    """
+
+    def __init__(self, clock, down_at=None, up_at=None, glitch_at=None, write_ms=10, hang_at=None, hang_ms=0):
+        self.clock = clock
+        self.down_at = down_at
+        self.up_at = up_at
+        self.glitch_at = glitch_at
+        self.write_ms = write_ms
+        self.hang_at = hang_at
+        self.hang_ms = hang_ms
+        self.broken = False  # stays broken after an error until reinit() succeeds
+
+    def _present(self):
+        t = self.clock.now
+        if self.down_at is None or t < self.down_at:
+            return True
+        return self.up_at is not None and t >= self.up_at
+
+    def write(self):
+        if self.hang_at is not None and self.clock.now >= self.hang_at:
+            self.clock.now += self.hang_ms
+        else:
+            self.clock.now += self.write_ms
+        if self.glitch_at is not None and self.clock.now >= self.glitch_at:
+            self.glitch_at = None
+            self.broken = True
+        if self.broken or not self._present():
+            self.broken = True
+            raise OSError(116, 'ETIMEDOUT')
+
+    def reinit(self):
+        self.clock.now += 5  # bus recovery clocks + controller init sequence
+        if not self._present():
+            raise OSError(19, 'ENODEV')
+        self.broken = False
+
+
+# name, lcd kwargs, tm1637 kwargs (times in ms from start), peripherals registered with reboot=True
+SCENARIOS = (
+    ('no fault', {}, {}, ()),
+    ('I2C glitch (one bad write)', dict(glitch_at=10000), {}, ()),
+    ('LCD unplugged 5 s', dict(down_at=10000, up_at=15000), {}, ()),
+    ('LCD unplugged 40 s', dict(down_at=10000, up_at=50000), {}, ()),
+    ('LCD gone for good', dict(down_at=10000), {}, ()),
+    ('TM1637 glitch', {}, dict(glitch_at=10000), ()),
+    ('LCD write hangs 2 s per window', dict(hang_at=10000, hang_ms=2000), {}, ()),
+    ('essential LCD gone for good', dict(down_at=10000), {}, ('lcd',)),
+)
+
+
+def run(name, lcd_kw, tm_kw, reboot, args):
+    clock = FakeClock()
+    wdt = FakeWDT(clock, args.wdt_ms)
+    lcd = FakeDevice(clock, **lcd_kw)
+    tm = FakeDevice(clock, write_ms=1, **tm_kw)
+    sv = Supervisor(clock.ticks_ms, clock.ticks_diff, wdt, state_path=None,
+                    reboot_after_ms=args.reboot_after_ms)
+    sv.register('lcd', lcd.reinit, reboot='lcd' in reboot)
+    sv.register('tm1637', tm.reinit, reboot='tm1637' in reboot)
+    reset_at = None
+    fault_at = None
+    recovered_at = None
+    while clock.now < args.duration_ms:
+        start = clock.now
+        clock.now += args.window_ms  # acquire + compute
+        sv.check('acquire', clock.now - start)
+        sv.run('lcd', lcd.write)
+        if not sv.failed('tm1637'):
+            try:
+                tm.write()  # runs from the RPM timer on the board
+            except OSError as e:
+                sv.fault('tm1637', e)
+        if fault_at is None and (sv.failed('lcd') or sv.failed('tm1637') or sv.state['overruns'].get('lcd')):
+            fault_at = clock.now
+        clock.now += args.pause_ms
+        failed = sv.failed('lcd') or sv.failed('tm1637')
+        sv.window_done()
+        if failed and not (sv.failed('lcd') or sv.failed('tm1637')):
+            recovered_at = clock.now
+        if wdt.expired():
+            reset_at = wdt.last + args.wdt_ms
+            break
+    recovery = dict(sv.state['recovery_ms'])
+    up_at = lcd_kw.get('up_at', tm_kw.get('up_at'))
+    after_return = recovered_at - up_at if recovered_at is not None and up_at is not None else None
+    return dict(name=name, fault_at=fault_at, recovery=recovery, after_return=after_return,
+                errors=sum(sv.state['errors'].values()), overruns=sum(sv.state['overruns'].values()), skipped=sv.state['skipped_feeds'],
+                reset_at=reset_at, still_failed=[n for n in ('lcd', 'tm1637') if sv.failed(n)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--window-ms', type=int, default=300, help='acquire + compute time per window')
+    parser.add_argument('--pause-ms', type=int, default=500)
+    parser.add_argument('--wdt-ms', type=int, default=8000)
+    parser.add_argument('--reboot-after-ms', type=int, default=60000)
+    parser.add_argument('--boot-ms', type=int, default=2500, help='cold boot to first reading')
+    parser.add_argument('--duration-ms', type=int, default=120000)
+    parser.add_argument('-v', '--verbose', action='store_true', help='show the supervisor log')
+    args = parser.parse_args()
+
+    reboot_ms = args.wdt_ms + args.boot_ms
+    print('%-32s %14s %12s %7s %9s %9s %13s %8s' % ('scenario', 'recovery', 'after return', 'errors',
+                                                    'overruns', 'withheld', 'WDT reset at', 'reboot'))
+    for name, lcd_kw, tm_kw, reboot in SCENARIOS:
+        log = io.StringIO()
+        with contextlib.redirect_stdout(sys.stdout if args.verbose else log):
+            r = run(name, lcd_kw, tm_kw, reboot, args)
+        if r['recovery']:
+            recovery = ', '.join('%s %d ms' % kv for kv in sorted(r['recovery'].items()))
+        elif r['still_failed']:
+            recovery = 'never'
+        else:
+            recovery = '-'
+        reset = '%d ms' % r['reset_at'] if r['reset_at'] is not None else '-'
+        after = '%d ms' % r['after_return'] if r['after_return'] is not None else '-'
+        baseline = '%d ms' % reboot_ms if r['fault_at'] is not None else '-'
+        print('%-32s %14s %12s %7d %9d %9d %13s %8s' % (name, recovery, after, r['errors'], r['overruns'],
+                                                        r['skipped'], reset, baseline))
+
+
+if __name__ == '__main__':
+    main()
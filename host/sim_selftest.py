@@ -0,0 +1,91 @@
+"""Host check of the sensor self-test (selftest.py) against synthetic sensor faults.
+
+Each scenario feeds ChannelSet with fake ADCs that mimic one wiring or sensor
+fault, runs the normal compute/analyze path and then SelfTest on the same
+window. Printed: the confirmed status per scenario, and the cost of a
+diagnostic run next to the analyze() cost it piggybacks on (host numbers; the
+ratio is what matters).
+
+    python host/sim_selftest.py [--samples 2000] [--runs 20]
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from power_engine import ADC_MAX, Channel, ChannelSet  # noqa: E402
+from selftest import SelfTest, diag_code, diag_names  # noqa: E402
+
+
+class FakeAdc:
+    """12-bit ADC: bias + sine (clipped to the ADC range) + gaussian noise, sampled every 100 us."""
+
+    def __init__(self, amplitude=1500.0, bias=2048.0, freq=50.0, noise=3.0, phase_deg=0.0, seed=1):
+        self.amplitude = amplitude
+        self.bias = bias
+        self.w = 2 * math.pi * freq * 100e-6
+        self.shift = math.radians(phase_deg)
+        self.noise = noise
+        self.rng = random.Random(seed)
+        self.k = 0
+
+    def read(self):
+        x = self.bias + self.amplitude * math.sin(self.w * self.k - self.shift) + self.rng.gauss(0, self.noise)
+        self.k += 1
+        return min(ADC_MAX, max(0, int(x)))
+
+
+SCENARIOS = (
+    # name, voltage ADC, current ADC, rpm, dropped pulses
+    ('healthy', dict(), dict(amplitude=600, phase_deg=30), 1450, 0),
+    ('idle (no load)', dict(), dict(amplitude=0), 0, 0),
+    ('CT open / floating', dict(), dict(amplitude=0, bias=1200, noise=180), 0, 0),
+    ('CT burden shorted', dict(), dict(amplitude=0, bias=0, noise=0), 0, 0),
+    ('PT saturated', dict(amplitude=2600), dict(amplitude=600, phase_deg=30), 1450, 0),
+    ('CT saturated', dict(), dict(amplitude=2500, phase_deg=30), 1450, 0),
+    ('mains off', dict(amplitude=0), dict(amplitude=0), 0, 0),
+    ('60 Hz supply', dict(freq=60.0), dict(amplitude=600, freq=60.0, phase_deg=30), 1450, 0),
+    ('Hall bouncing', dict(), dict(amplitude=600, phase_deg=30), 48000, 0),
+    ('Hall queue overflow', dict(), dict(amplitude=600, phase_deg=30), 1450, 37),
+    ('Hall dead under load', dict(), dict(amplitude=600, phase_deg=30), 0, 0),
+)
+
+
+def run_scenario(v_kw, i_kw, rpm, dropped, samples, runs):
+    ch = Channel(FakeAdc(**v_kw), FakeAdc(seed=2, **i_kw), 0.25, 0.054, samples, 'L1')
+    cs = ChannelSet([ch], samples)
+    test = SelfTest({'load_irms': 5.0})  # AC current of the loaded scenarios is ~23 A
+    analyze_s = diag_s = 0.0
+    for n in range(runs):
+        cs.measure()
+        t0 = time.perf_counter()
+        results = cs.analyze()
+        t1 = time.perf_counter()
+        test.run(cs.channels, results, rpm, dropped * n)
+        t2 = time.perf_counter()
+        analyze_s += t1 - t0
+        diag_s += t2 - t1
+    return test, analyze_s / runs, diag_s / runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--samples', type=int, default=2000)
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    print('%-22s %-6s %-22s %12s %10s' % ('scenario', 'code', 'status', 'analyze ms', 'diag ms'))
+    for name, v_kw, i_kw, rpm, dropped in SCENARIOS:
+        test, analyze_s, diag_s = run_scenario(v_kw, i_kw, rpm, dropped, args.samples, args.runs)
+        code = diag_code(test.status)
+        print('%-22s %-6s %-22s %12.3f %10.3f' % (name, 'Er%02d' % code if code else '-',
+                                                  ' '.join(diag_names(test.status)) or 'OK',
+                                                  analyze_s * 1e3, diag_s * 1e3))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,264 @@
+"""Stress test for the interrupt-safe primitives (isr.py) and the RPM path built on them.
+
+Two ways of firing simulated Hall interrupts while RpmService.process() runs:
+
+  preempt  A tracer with opcode events runs a pending pulse's handler between
+           any two bytecodes of the processing code, the way an interrupt
+           preempts the main program on the board. Pulses are held off while
+           disable_irq() is in effect and delivered at enable_irq(). This
+           lands a pulse inside every read-then-reset window.
+  threads  Producer threads fire pulses through a lock that models the CPU
+           interrupt mask, and a consumer thread drains concurrently. The
+           interpreter only switches threads at calls and loop edges, so this
+           mode checks the ring's ordering and overflow under real
+           concurrency rather than instruction-level races.
+
+Checks, per mode:
+  * every pulse is counted exactly once (sum of RpmService.pulses == fired),
+    even when the timestamp queue overflows;
+  * SpscRing hands over a sequence in order, with delivered + dropped == pushed;
+  * for comparison, a plain read-then-reset counter under the same injection
+    loses pulses.
+
+    python host/stress_isr.py [--pulses 20000] [--channels 2] [--queue 64]
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from isr import SpscRing  # noqa: E402
+from rpm_service import RpmService  # noqa: E402
+
+
+def ticks_us():
+    return time.perf_counter_ns() // 1000
+
+
+class Preemptor:
+    """Delivers queued interrupts between bytecodes of traced code, honouring disable_irq."""
+
+    def __init__(self, rate, seed=1):
+        self.handlers = []
+        self.rate = rate
+        self.rng = random.Random(seed)
+        self.pending = 0   # pulses still to fire
+        self.fired = []
+        self.masked = 0
+        # the injector's own frames are not traced, so it is never preempted itself
+        self.quiet = {Preemptor.disable_irq.__code__, Preemptor.enable_irq.__code__, Preemptor._deliver.__code__}
+
+    def disable_irq(self):
+        self.masked += 1
+        return 0
+
+    def enable_irq(self, state):
+        self.masked -= 1
+        if not self.masked:
+            self._deliver()  # an interrupt raised while masked is taken on unmask
+
+    def _deliver(self):
+        if self.pending and not self.masked:
+            self.pending -= 1
+            ch = self.rng.randrange(len(self.handlers))
+            self.fired[ch] += 1
+            self.masked += 1  # interrupts do not nest
+            self.handlers[ch](None)
+            self.masked -= 1
+
+    def _trace(self, frame, event, arg):
+        if event == 'call':
+            if frame.f_code in self.quiet:
+                return None
+            frame.f_trace_opcodes = True
+            return self._trace
+        if event == 'opcode' and self.rng.random() < self.rate:
+            self._deliver()
+        return self._trace
+
+    def run(self, step, pulses):
+        """Call step() under injection until all pulses are fired, then once more to drain."""
+        self.pending = pulses
+        self.fired = [0] * len(self.handlers)
+        sys.settrace(self._trace)
+        try:
+            while self.pending:
+                step()
+        finally:
+            sys.settrace(None)
+        step()
+
+
+def check(name, fired, counted):
+    good = fired == counted
+    print('  %-30s fired %7d counted %7d  %s' % (name, fired, counted, 'OK' if good else 'LOST %d' % (fired - counted)))
+    return good
+
+
+def rpm_preempt(pulses, channels, queue):
+    inject = Preemptor(rate=0.05)
+    svc = RpmService(ticks_us, interval_ms=100, queue_size=queue,
+                     disable_irq=inject.disable_irq, enable_irq=inject.enable_irq)
+    for _ in range(channels):
+        svc.register(rpm_multiplier=600, moving_average_window=5)
+    inject.handlers = svc.handlers
+    counted = [0] * channels
+
+    def step():
+        svc.process()
+        for ch in range(channels):
+            counted[ch] += svc.pulses[ch]
+
+    inject.run(step, pulses)
+    ok = True
+    for ch in range(channels):
+        ok &= check('rpm channel %d' % ch, inject.fired[ch], counted[ch])
+    print('  timestamps dropped on a full queue: %d' % svc.dropped)
+    return ok
+
+
+def naive_preempt(pulses):
+    """The old pattern: the handler increments, the timer reads the count and then stores 0."""
+    count = [0]
+    counted = [0]
+
+    def handler(pin):
+        count[0] += 1
+
+    def step():
+        n = count[0]
+        count[0] = 0  # a pulse taken between these two lines is lost
+        counted[0] += n
+
+    inject = Preemptor(rate=0.05)
+    inject.handlers = [handler]
+    inject.run(step, pulses)
+    fired = inject.fired[0]
+    print('  %-30s fired %7d counted %7d  lost %d' % ('read-then-reset (old pattern)', fired, counted[0],
+                                                     fired - counted[0]))
+
+
+class IrqMask:
+    """machine.disable_irq/enable_irq for threads: interrupts are held off while the lock is taken."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+
+    def disable_irq(self):
+        self.lock.acquire()
+        return 1
+
+    def enable_irq(self, state):
+        self.lock.release()
+
+
+def fire(mask, handler, pulses):
+    for i in range(pulses):
+        with mask.lock:  # the interrupt is delivered only while interrupts are enabled
+            handler(None)
+        if not i & 63:
+            time.sleep(0)  # let the consumer in now and then
+
+
+def rpm_threads(pulses, channels, queue):
+    mask = IrqMask()
+    svc = RpmService(ticks_us, interval_ms=100, queue_size=queue,
+                     disable_irq=mask.disable_irq, enable_irq=mask.enable_irq)
+    for _ in range(channels):
+        svc.register(rpm_multiplier=600, moving_average_window=5)
+    counted = [0] * channels
+    done = threading.Event()
+
+    def consume():
+        while True:
+            finished = done.is_set()  # read before the last drain so nothing fired afterwards is missed
+            svc.process()
+            for ch in range(channels):
+                counted[ch] += svc.pulses[ch]
+            if finished:
+                return
+
+    producers = [threading.Thread(target=fire, args=(mask, handler, pulses)) for handler in svc.handlers]
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+    for p in producers:
+        p.start()
+    for p in producers:
+        p.join()
+    done.set()
+    consumer.join()
+    ok = True
+    for ch in range(channels):
+        ok &= check('rpm channel %d' % ch, pulses, counted[ch])
+    print('  timestamps dropped on a full queue: %d' % svc.dropped)
+    return ok
+
+
+def ring_threads(items, size):
+    ring = SpscRing(size)
+    done = threading.Event()
+    received = []
+
+    def produce():
+        for i in range(items):
+            ring.push(i, i & 0xFF)
+            if not i & 63:
+                time.sleep(0)
+        done.set()
+
+    def consume():
+        data = ring.data
+        tags = ring.tags
+        mask = ring.mask
+        while True:
+            finished = done.is_set()
+            h = ring.head[0]
+            t = ring.tail[0]
+            while t != h:
+                value = data[t]
+                if tags[t] != value & 0xFF:
+                    raise AssertionError('torn element at %d' % value)
+                received.append(value)
+                t = (t + 1) & mask
+            ring.tail[0] = t
+            if finished:
+                return
+
+    threads = [threading.Thread(target=consume), threading.Thread(target=produce)]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    in_order = all(a < b for a, b in zip(received, received[1:]))
+    dropped = ring.dropped[0]
+    good = in_order and len(received) + dropped == items
+    print('  %-30s pushed %6d delivered %6d dropped %6d in order %s  %s'
+          % ('ring', items, len(received), dropped, in_order, 'OK' if good else 'FAIL'))
+    return good
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pulses', type=int, default=20000, help='pulses per run (per channel for threads)')
+    parser.add_argument('--channels', type=int, default=2)
+    parser.add_argument('--queue', type=int, default=64, help='timestamp queue size (small to force overflow)')
+    args = parser.parse_args()
+
+    ok = True
+    print('preempt (interrupts between bytecodes):')
+    ok &= rpm_preempt(args.pulses, args.channels, args.queue)
+    naive_preempt(args.pulses)
+    print('threads (%d producers, 1 consumer):' % args.channels)
+    sys.setswitchinterval(1e-5)
+    ok &= rpm_threads(args.pulses * 10, args.channels, args.queue)
+    ok &= ring_threads(args.pulses * 10, args.queue)
+    print('all checks passed' if ok else 'FAILED')
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
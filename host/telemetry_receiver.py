@@ -0,0 +1,193 @@
+"""Receive and decode telemetry frames sent by telemetry.py.
+
+    python host/telemetry_receiver.py /dev/ttyUSB0 --baud 115200 --csv readings.csv
+    python host/telemetry_receiver.py capture.bin --csv readings.csv   # replay a raw dump
+    python host/telemetry_receiver.py /dev/ttyUSB0 --parquet readings.parquet
+    python host/telemetry_receiver.py /dev/ttyUSB0 --csv readings.csv --agg-csv rollups.csv
+    python host/telemetry_receiver.py /dev/ttyUSB0 --channels 3 --channel-csv phases.csv
+
+Frames are resynchronised on the 0xA5 0x5A marker; frames with an unknown type,
+bad length or CRC mismatch are counted and skipped. Each decoded frame becomes
+one flat row (column order = telemetry.MEASUREMENT_FIELDS plus 'host_time'),
+ready for csv.DictWriter or a columnar writer such as pyarrow. Aggregate
+frames (per-minute/per-hour rollups from aggregate.py) decode to rows with
+AGG_COLUMNS, the metric index replaced by its name from
+aggregate.metric_names(--channels); they go to --agg-csv and are dropped
+otherwise. With more than one measurement channel the board also sends one
+frame per further channel and one with the ChannelSet totals; both decode
+to CHANNEL_COLUMNS rows (channel 'total' for the totals) for --channel-csv
+and are dropped otherwise.
+"""
+import argparse
+import csv
+import os
+import struct
+import sys
+import time
+from binascii import crc32
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from aggregate import metric_names  # noqa: E402
+from telemetry import (AGGREGATE_FIELDS, AGGREGATE_FORMAT, AGGREGATE_SIZE, CHANNEL_FIELDS,  # noqa: E402
+                       CHANNEL_FORMAT, CHANNEL_SIZE, CRC_SIZE, FRAME_AGGREGATE, FRAME_CHANNEL,
+                       FRAME_MEASUREMENT, FRAME_TOTAL, HEADER_SIZE, MEASUREMENT_FIELDS,
+                       MEASUREMENT_FORMAT, MEASUREMENT_SIZE, SYNC, TOTAL_FIELDS, TOTAL_FORMAT, TOTAL_SIZE)
+
+COLUMNS = MEASUREMENT_FIELDS + ('host_time',)
+AGG_COLUMNS = AGGREGATE_FIELDS + ('host_time',)
+CHANNEL_COLUMNS = CHANNEL_FIELDS + ('host_time',)
+_LAYOUTS = {
+    FRAME_MEASUREMENT: (MEASUREMENT_SIZE, struct.Struct(MEASUREMENT_FORMAT), MEASUREMENT_FIELDS),
+    FRAME_AGGREGATE: (AGGREGATE_SIZE, struct.Struct(AGGREGATE_FORMAT), AGGREGATE_FIELDS),
+    FRAME_CHANNEL: (CHANNEL_SIZE, struct.Struct(CHANNEL_FORMAT), CHANNEL_FIELDS),
+    FRAME_TOTAL: (TOTAL_SIZE, struct.Struct(TOTAL_FORMAT), TOTAL_FIELDS),
+}
+
+
+def is_aggregate(row):
+    return 'span_s' in row
+
+
+def is_channel(row):
+    return 'channel' in row
+
+
+class FrameDecoder:
+    """Incremental decoder: feed() arbitrary byte chunks, get decoded rows back."""
+
+    def __init__(self, channels=1):
+        self.metrics = metric_names(channels)
+        self._buf = bytearray()
+        self.frames = 0
+        self.crc_errors = 0
+        self.resyncs = 0
+
+    def feed(self, data):
+        self._buf += data
+        buf = self._buf
+        rows = []
+        pos = 0
+        while True:
+            start = buf.find(SYNC, pos)
+            if start < 0:
+                # keep a possible partial sync byte at the end
+                pos = len(buf) - 1 if buf.endswith(SYNC[:1]) else len(buf)
+                break
+            if start != pos:
+                self.resyncs += 1
+            if len(buf) - start < HEADER_SIZE:
+                pos = start
+                break
+            layout = _LAYOUTS.get(buf[start + 2])
+            if layout is None or buf[start + 3] != layout[0]:
+                pos = start + 1
+                continue
+            end = start + HEADER_SIZE + layout[0]
+            if len(buf) < end + CRC_SIZE:
+                pos = start
+                break
+            (crc,) = struct.unpack_from('<L', buf, end)
+            if crc32(buf[start + 2:end]) & 0xFFFFFFFF != crc:
+                self.crc_errors += 1
+                pos = start + 1
+                continue
+            row = dict(zip(layout[2], layout[1].unpack_from(buf, start + HEADER_SIZE)))
+            kind = buf[start + 2]
+            if kind == FRAME_AGGREGATE and row['metric'] < len(self.metrics):
+                row['metric'] = self.metrics[row['metric']]
+            elif kind == FRAME_TOTAL:
+                del row['channels']
+                row['channel'] = 'total'
+            row['host_time'] = time.time()
+            rows.append(row)
+            self.frames += 1
+            pos = end + CRC_SIZE
+        del buf[:pos]
+        return rows
+
+
+def open_source(path, baud):
+    """Serial port via pyserial when available, otherwise a raw file/tty read."""
+    if os.path.exists(path) and not os.path.isfile(path):
+        try:
+            import serial
+        except ImportError:
+            fd = os.open(path, os.O_RDONLY | os.O_NOCTTY)
+            return lambda: os.read(fd, 4096)
+        port = serial.Serial(path, baud, timeout=0.1)
+        return lambda: port.read(port.in_waiting or 1)
+    f = open(path, 'rb')
+    return lambda: f.read(4096)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('source', help='serial device or a raw byte dump')
+    parser.add_argument('--baud', type=int, default=115200)
+    parser.add_argument('--csv', help='append rows to this CSV file (default: stdout)')
+    parser.add_argument('--parquet', help='write rows to this Parquet file on exit (needs pyarrow)')
+    parser.add_argument('--agg-csv', help='append aggregate (rollup) rows to this CSV file')
+    parser.add_argument('--channel-csv', help='append per-channel and total rows to this CSV file')
+    parser.add_argument('--channels', type=int, default=1,
+                        help="the board's measurement channel count (names the aggregate metrics)")
+    args = parser.parse_args()
+
+    if args.parquet:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            parser.error('--parquet needs pyarrow (pip install pyarrow)')
+    read = open_source(args.source, args.baud)
+    out = open(args.csv, 'a', newline='') if args.csv else sys.stdout
+    writer = csv.DictWriter(out, COLUMNS)
+    if out is sys.stdout or out.tell() == 0:
+        writer.writeheader()
+    agg_out = agg_writer = None
+    if args.agg_csv:
+        agg_out = open(args.agg_csv, 'a', newline='')
+        agg_writer = csv.DictWriter(agg_out, AGG_COLUMNS)
+        if agg_out.tell() == 0:
+            agg_writer.writeheader()
+    ch_out = ch_writer = None
+    if args.channel_csv:
+        ch_out = open(args.channel_csv, 'a', newline='')
+        ch_writer = csv.DictWriter(ch_out, CHANNEL_COLUMNS, restval='')
+        if ch_out.tell() == 0:
+            ch_writer.writeheader()
+    decoder = FrameDecoder(args.channels)
+    kept = []
+    try:
+        while True:
+            data = read()
+            if not data:
+                if os.path.isfile(args.source):
+                    break
+                continue
+            for row in decoder.feed(data):
+                if is_aggregate(row):
+                    if agg_writer:
+                        agg_writer.writerow(row)
+                        agg_out.flush()
+                    continue
+                if is_channel(row):
+                    if ch_writer:
+                        ch_writer.writerow(row)
+                        ch_out.flush()
+                    continue
+                writer.writerow(row)
+                if args.parquet:
+                    kept.append(row)
+            out.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if args.parquet and kept:
+            pq.write_table(pa.Table.from_pylist(kept), args.parquet)
+        print('frames=%d crc_errors=%d resyncs=%d' % (decoder.frames, decoder.crc_errors, decoder.resyncs),
+              file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
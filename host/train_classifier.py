@@ -0,0 +1,183 @@
+"""Train the load-state classifier (classifier.py) from logged telemetry.
+
+Record one telemetry CSV per operating mode with telemetry_receiver.py while
+the board runs with calibration disabled ('calibrate': None), so the logged
+values are the raw features the firmware classifies. Then:
+
+    python host/train_classifier.py --class slow=slow.csv --class fast=fast.csv \\
+        --features irms,p,pf,crest_i,rpm --out load_model.json
+    python host/train_classifier.py --synthetic      # self-check on generated data
+
+The model is nearest-centroid on standardised features. Each feature is
+centred on its overall mean and divided by its overall standard deviation,
+so it stays tiny and is evaluated in a few microseconds on the board. The
+script reports 5-fold cross-validated accuracy and the confusion matrix,
+the host cost of one classify() call, and (with --synthetic) the accuracy
+of the old single Irms threshold on the same data. Copy the JSON to the
+board and set 'load_model' to its path.
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from classifier import LoadClassifier  # noqa: E402
+from power_engine import PowerResult  # noqa: E402
+
+# classifier feature -> telemetry CSV column
+FEATURE_COLUMNS = {
+    'vrms': 'vrms', 'irms': 'irms', 'p': 'real_power', 's': 'apparent_power', 'q': 'reactive_power',
+    'pf': 'power_factor', 'dpf': 'displacement_pf', 'phase': 'phase', 'freq': 'frequency',
+    'crest_v': 'crest_v', 'crest_i': 'crest_i', 'rpm': 'rpm',
+}
+DEFAULT_FEATURES = 'irms,p,pf,crest_i,rpm'
+
+
+def read_rows(path, features):
+    rows = []
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            rows.append([float(row[FEATURE_COLUMNS[name]]) for name in features])
+    return rows
+
+
+def train(samples, features):
+    """samples: list of (label, feature vector). Returns the model dict."""
+    labels = sorted({label for label, _ in samples})
+    n = len(features)
+    count = len(samples)
+    center = [sum(x[k] for _, x in samples) / count for k in range(n)]
+    scale = []
+    for k in range(n):
+        var = sum((x[k] - center[k]) ** 2 for _, x in samples) / max(1, count - 1)
+        scale.append(math.sqrt(var) or 1.0)  # a constant feature contributes nothing
+    centroids = []
+    for label in labels:
+        rows = [x for lab, x in samples if lab == label]
+        centroids.append([sum((x[k] - center[k]) / scale[k] for x in rows) / len(rows) for k in range(n)])
+    return {'features': list(features), 'labels': labels, 'center': center, 'scale': scale,
+            'centroids': centroids}
+
+
+def as_result(features, x):
+    r = PowerResult()
+    rpm = 0
+    for name, value in zip(features, x):
+        if name == 'rpm':
+            rpm = value
+        else:
+            setattr(r, name, value)
+    return r, rpm
+
+
+def evaluate(model, samples):
+    """Confusion counts {(true, predicted): n}; every window is classified independently."""
+    features = model['features']
+    confusion = {}
+    for label, x in samples:
+        clf = LoadClassifier(model, hysteresis=0.0)
+        r, rpm = as_result(features, x)
+        pred = clf.classify(r, rpm)
+        confusion[label, pred] = confusion.get((label, pred), 0) + 1
+    return confusion
+
+
+def cross_validate(samples, features, folds=5, seed=1):
+    shuffled = list(samples)
+    random.Random(seed).shuffle(shuffled)
+    confusion = {}
+    for f in range(folds):
+        test = shuffled[f::folds]
+        fit = [s for k, s in enumerate(shuffled) if k % folds != f]
+        for key, n in evaluate(train(fit, features), test).items():
+            confusion[key] = confusion.get(key, 0) + n
+    return confusion
+
+
+def print_confusion(confusion, labels):
+    total = sum(confusion.values())
+    right = sum(n for (t, p), n in confusion.items() if t == p)
+    print('  true \\ predicted  ' + ' '.join('%8s' % label for label in labels))
+    for t in labels:
+        print('  %-17s ' % t + ' '.join('%8d' % confusion.get((t, p), 0) for p in labels))
+    print('  accuracy %.2f%% (%d windows)' % (100.0 * right / total, total))
+
+
+def synthetic(rng, per_class=400):
+    """Raw windows of a two-speed motor plus idle. The slow/fast Irms ranges overlap
+    around the old 4.645 A threshold, while RPM, P and crest factor still separate them."""
+    samples = []
+    for label, irms, p, pf, crest, rpm in (('off', 2.86, 15, 0.2, 1.9, 0),
+                                            ('slow', 4.58, 640, 0.62, 1.55, 950),
+                                            ('fast', 4.70, 1180, 0.86, 1.45, 1450)):
+        for _ in range(per_class):
+            samples.append((label, [irms + rng.gauss(0, 0.06), p + rng.gauss(0, 40), pf + rng.gauss(0, 0.03),
+                                    crest + rng.gauss(0, 0.04), max(0.0, rpm + rng.gauss(0, 30))]))
+    return samples
+
+
+def threshold_confusion(samples):
+    """The previous rule in calibrate(): corrected Irms (raw - 2.86) >= 1.8 fast, <= 1.77 slow, else nothing."""
+    confusion = {}
+    for label, x in samples:
+        ir = x[0] - 2.86
+        pred = 'fast' if ir >= 1.8 else 'slow' if ir <= 1.77 else 'none'
+        confusion[label, pred] = confusion.get((label, pred), 0) + 1
+    return confusion
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--class', dest='classes', action='append', default=[], metavar='LABEL=CSV')
+    parser.add_argument('--features', default=DEFAULT_FEATURES,
+                        help='comma-separated, from: ' + ','.join(FEATURE_COLUMNS))
+    parser.add_argument('--out', help='write the model JSON here')
+    parser.add_argument('--synthetic', action='store_true', help='train and check on generated windows')
+    args = parser.parse_args()
+
+    features = args.features.split(',')
+    for name in features:
+        if name not in FEATURE_COLUMNS:
+            parser.error('unknown feature %r' % name)
+    if args.synthetic:
+        features = DEFAULT_FEATURES.split(',')
+        samples = synthetic(random.Random(1))
+    else:
+        if len(args.classes) < 2:
+            parser.error('give at least two --class LABEL=CSV (or --synthetic)')
+        samples = []
+        for item in args.classes:
+            label, _, path = item.partition('=')
+            samples += [(label, x) for x in read_rows(path, features)]
+
+    model = train(samples, features)
+    labels = model['labels']
+    print('features: %s' % ', '.join(features))
+    print('5-fold cross-validation:')
+    print_confusion(cross_validate(samples, features), labels)
+    if args.synthetic:
+        print('previous Irms threshold on the same windows (none = no calibration applied):')
+        print_confusion(threshold_confusion(samples), labels + ['none'])
+
+    clf = LoadClassifier(model)
+    r, rpm = as_result(features, samples[0][1])
+    n = 20000
+    t0 = time.perf_counter()
+    for _ in range(n):
+        clf.classify(r, rpm)
+    print('classify(): %.2f us per window on this host (%d features, %d classes)'
+          % ((time.perf_counter() - t0) / n * 1e6, len(features), len(labels)))
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(model, f)
+        print('model written to %s' % args.out)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+#Interrupt-safe primitives
+# ابزارهای اشتراک داده بین اینتراپت و حلقه اصلی: شمارنده با خواندن و صفر کردن اتمیک، صف حلقوی
+# تک‌تولیدکننده/تک‌مصرف‌کننده از پیش تخصیص‌یافته و راه‌اندازی بافر استثنای اینتراپت.
+# کد اینتراپت فقط عناصر آرایه‌های از پیش ساخته را تغییر می‌دهد و هیچ حافظه‌ای تخصیص نمی‌دهد.
+from array import array
+
+EMERGENCY_BUFFER_SIZE = 100
+
+
+def setup_emergency_buffer(size=EMERGENCY_BUFFER_SIZE):
+    """
+    رزرو بافر استثنا تا خطای داخل اینتراپت (که نمی‌تواند حافظه بگیرد) با traceback گزارش شود.
+
+    Returns:
+        bool: False اگر micropython در دسترس نباشد (اجرا روی میزبان).
+    """
+    try:
+        import micropython
+    except ImportError:
+        return False
+    micropython.alloc_emergency_exception_buf(size)
+    return True
+
+
+def _no_disable():
+    return 0
+
+
+def _no_enable(state):
+    pass
+
+
+class AtomicCounter:
+    """شمارنده‌ای که اینتراپت زیاد می‌کند و حلقه با swap در یک قدم می‌خواند و صفر می‌کند."""
+
+    __slots__ = ('value', 'disable_irq', 'enable_irq')
+
+    def __init__(self, disable_irq=None, enable_irq=None):
+        """
+        Args:
+            disable_irq (callable): روی برد machine.disable_irq؛ وضعیت قبلی را برمی‌گرداند.
+            enable_irq (callable): روی برد machine.enable_irq؛ وضعیت را برمی‌گرداند.
+        """
+        # اینتراپت مستقیم value[0] += 1 را اجرا می‌کند (بدون فراخوانی متد)
+        self.value = array('L', [0])
+        self.disable_irq = disable_irq or _no_disable
+        self.enable_irq = enable_irq or _no_enable
+
+    def add(self, n=1):
+        self.value[0] += n
+
+    def swap(self, new=0):
+        """
+        خواندن مقدار و جایگزینی آن با new؛ اینتراپت بین خواندن و نوشتن اجرا نمی‌شود و پالسی گم نمی‌شود.
+
+        Returns:
+            int: مقدار پیش از جایگزینی.
+        """
+        value = self.value
+        state = self.disable_irq()
+        old = value[0]
+        value[0] = new
+        self.enable_irq(state)
+        return old
+
+
+class SpscRing:
+    """
+    صف حلقوی یک تولیدکننده (اینتراپت) و یک مصرف‌کننده با مقدار و برچسب یک‌بایتی برای هر عنصر.
+
+    فقط تولیدکننده head و فقط مصرف‌کننده tail را جلو می‌برد، پس نیازی به غیرفعال کردن اینتراپت
+    نیست. مصرف‌کننده head را یک بار می‌خواند، عناصر data[t] و tags[t] را تا آن خوانده و سپس
+    tail را ذخیره می‌کند؛ تا آن لحظه تولیدکننده روی آن خانه‌ها نمی‌نویسد.
+    """
+
+    __slots__ = ('mask', 'data', 'tags', 'head', 'tail', 'dropped')
+
+    def __init__(self, size=256, typecode='L'):
+        """
+        Args:
+            size (int): ظرفیت صف؛ توانی از ۲ (یک خانه برای تشخیص پر بودن خالی می‌ماند).
+            typecode (str): نوع آرایه مقدارها.
+        """
+        if size < 2 or size & (size - 1):
+            raise ValueError("اندازه صف باید توانی از ۲ باشد.")
+        self.mask = size - 1
+        self.data = array(typecode, [0] * size)
+        self.tags = bytearray(size)
+        self.head = array('L', [0])
+        self.tail = array('L', [0])
+        self.dropped = array('L', [0])  # تعداد عناصری که به علت پر بودن صف کنار گذاشته شده‌اند
+
+    def push(self, value, tag=0):
+        """افزودن عنصر (از اینتراپت، بدون تخصیص حافظه). Returns: False اگر صف پر باشد."""
+        h = self.head[0]
+        n = (h + 1) & self.mask
+        if n == self.tail[0]:
+            self.dropped[0] += 1
+            return False
+        self.data[h] = value
+        self.tags[h] = tag
+        self.head[0] = n  # انتشار عنصر پس از نوشتن کامل آن
+        return True
+
+    def __len__(self):
+        return (self.head[0] - self.tail[0]) & self.mask
+
+    def clear(self):
+        """دور ریختن عناصر موجود (از سمت مصرف‌کننده)."""
+        self.tail[0] = self.head[0]
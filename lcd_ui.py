@@ -0,0 +1,231 @@
+#Paged LCD user interface
+# رابط کاربری چندصفحه‌ای LCD: قالب‌های با عرض ثابت که یک بار تجزیه می‌شوند، نوشتن فقط
+# بخش تغییرکرده هر فیلد و نمودار میله‌ای با کاراکترهای سفارشی (LcdApi.custom_char)
+# قالب هر سطر متن ثابت با فیلدهای {کلید:قالب} است، مثلاً "V:{vrms:6.1f}V"؛ عرض فیلد از قالب
+# خوانده می‌شود. {کلید:barN} یک نمودار میله‌ای N خانه‌ای است که با scales[کلید] مقیاس می‌شود.
+
+# کاراکترهای سفارشی نمودار: خانه با ۱ تا ۴ ستون پر از ۵ ستون؛ خانه پر کاراکتر 0xFF حافظه ROM است
+BAR_GLYPHS = (
+    bytearray([0x10] * 8),
+    bytearray([0x18] * 8),
+    bytearray([0x1C] * 8),
+    bytearray([0x1E] * 8),
+)
+FULL_BLOCK = chr(0xFF)
+
+# صفحه‌های پیش‌فرض (۲۰×۴)؛ کلیدها صفت‌های PowerResult یا مقادیر extra در render هستند
+DEFAULT_PAGES = (
+    ('power', ("V:{vrms:6.1f}V  {freq:5.2f}Hz",
+               "I:{irms:6.2f}A PF:{pf:4.2f}",
+               "P:{p:6.0f}W S:{s:6.0f}",
+               "{alarm:20s}")),
+    ('bars', ("P{p:5.0f}W{p:bar13}",
+              "R{rpm:4d} {rpm:bar14}",
+              "I{irms:5.2f}A{irms:bar13}",
+              "PF{pf:4.2f} DPF{dpf:4.2f} {freq:2.0f}Hz")),
+    ('quality', ("Q:{q:6.0f}var Ph{phase:5.1f}",
+                 "CF V{crest_v:4.2f} I{crest_i:4.2f}",
+                 "E:{energy_kwh:9.3f}kWh",
+                 "miss{missed:4d} {quality:11s}")),
+    ('system', ("Boot{boots:5d} Err{errors:6d}",
+                "Free{mem:7d}B",
+                "Win{samples:5d} {acq_ms:4d}ms",
+                "Diag:{diag:15s}")),
+)
+# مقدار تمام‌مقیاس نمودارهای میله‌ای
+DEFAULT_SCALES = {'p': 1500, 'rpm': 3000, 'irms': 8}
+
+
+def _spec_width(spec):
+    """عرض یک قالب مثل '6.1f'، '>5d' یا '05d'"""
+    k = 0
+    while k < len(spec) and spec[k] in '<>^+- 0':
+        k += 1
+    digits = ''
+    while k < len(spec) and spec[k].isdigit():
+        digits += spec[k]
+        k += 1
+    if not digits:
+        raise ValueError(f"عرض فیلد در قالب '{spec}' مشخص نیست.")
+    return int(digits)
+
+
+class Field:
+    """یک فیلد با موقعیت و عرض ثابت روی LCD."""
+    __slots__ = ('key', 'row', 'col', 'width', 'fmt', 'overflow', 'text', 'bars', 'scale', 'last')
+
+    def __init__(self, key, row, col, width, spec=None, scale=1):
+        self.key = key
+        self.row = row
+        self.col = col
+        self.width = width
+        self.last = None  # آخرین متن نوشته‌شده روی LCD
+        self.bars = None
+        self.fmt = None
+        self.text = False
+        self.scale = scale or 1
+        if spec is None:
+            # جدول از پیش ساخته متن نمودار برای هر تعداد ستون پر (0 تا 5×عرض)
+            self.bars = tuple(self._bar(n) for n in range(width * 5 + 1))
+        else:
+            self.fmt = '{:' + spec + '}'
+            self.text = spec.endswith('s')
+            self.overflow = '#' * width  # عددی که در عرض فیلد جا نمی‌شود
+
+    def _bar(self, n):
+        full = n // 5
+        part = n % 5
+        s = FULL_BLOCK * full + (chr(part - 1) if part else '')
+        return s + ' ' * (self.width - len(s))
+
+    def render(self, value):
+        """متن فیلد با دقیقاً width کاراکتر"""
+        if self.bars:
+            n = int(value * (len(self.bars) - 1) / self.scale + 0.5)
+            return self.bars[min(max(n, 0), len(self.bars) - 1)]
+        s = self.fmt.format(value)
+        if len(s) != self.width:
+            if len(s) < self.width:
+                s += ' ' * (self.width - len(s))
+            elif self.text:
+                s = s[:self.width]
+            else:
+                s = self.overflow
+        return s
+
+
+class Page:
+    """یک صفحه: متن ثابت هر سطر (با جای خالی فیلدها) و فهرست فیلدها."""
+    __slots__ = ('name', 'rows', 'fields')
+
+    def __init__(self, name, lines, columns=20, scales=None):
+        self.name = name
+        self.rows = []
+        self.fields = []
+        for row, line in enumerate(lines):
+            text = ''
+            pos = 0
+            while True:
+                start = line.find('{', pos)
+                if start < 0:
+                    text += line[pos:]
+                    break
+                end = line.find('}', start)
+                if end < 0:
+                    raise ValueError(f"قالب ناقص در صفحه {name}: {line}")
+                text += line[pos:start]
+                key, spec = line[start + 1:end].split(':')
+                if spec.startswith('bar'):
+                    width = int(spec[3:])
+                    field = Field(key, row, len(text), width, None, (scales or {}).get(key, 1))
+                else:
+                    width = _spec_width(spec)
+                    field = Field(key, row, len(text), width, spec)
+                self.fields.append(field)
+                text += ' ' * width
+                pos = end + 1
+            if len(text) > columns:
+                raise ValueError(f"سطر {row + 1} صفحه {name} از {columns} ستون بیشتر است: {line}")
+            self.rows.append(text + ' ' * (columns - len(text)))
+
+
+class LcdUi:
+    """نمایش صفحه‌ای با نوشتن فقط فیلدهای تغییرکرده؛ صفحه با دکمه یا next_page عوض می‌شود."""
+
+    def __init__(self, pages, columns=20, scales=None):
+        """
+        Args:
+            pages: دنباله (نام صفحه، فهرست سطرهای قالب).
+            columns (int): تعداد ستون‌های LCD.
+            scales (dict): مقدار تمام‌مقیاس هر کلیدی که نمودار میله‌ای دارد.
+        """
+        self.pages = [Page(name, lines, columns, scales) for name, lines in pages]
+        if not self.pages:
+            raise ValueError("حداقل یک صفحه لازم است.")
+        self._glyphs = any(f.bars for p in self.pages for f in p.fields)
+        self.lcd = None
+        self.page = 0
+        self._presses = 0
+        self._full = True
+        self.commands = 0  # تعداد move_to (هر کدام یک دستور LCD)
+        self.writes = 0    # تعداد کاراکترهای نوشته‌شده
+
+    def attach(self, lcd):
+        """اتصال به یک LcdApi (پس از راه‌اندازی یا راه‌اندازی دوباره LCD)؛ صفحه کامل دوباره رسم می‌شود."""
+        self.lcd = lcd
+        if lcd and self._glyphs:
+            for k, glyph in enumerate(BAR_GLYPHS):
+                lcd.custom_char(k, glyph)
+        self._full = True
+
+    def next_page(self, step=1):
+        self.page = (self.page + step) % len(self.pages)
+        self._full = True
+
+    def button_handler(self, ticks_ms, ticks_diff, debounce_ms=200):
+        """تابع اینتراپت دکمه تغییر صفحه با حذف لرزش؛ صفحه در render بعدی عوض می‌شود."""
+        last = [ticks_ms() - debounce_ms]
+
+        def handler(pin):
+            now = ticks_ms()
+            if ticks_diff(now, last[0]) >= debounce_ms:
+                last[0] = now
+                self._presses += 1
+
+        return handler
+
+    def _write(self, col, row, text):
+        lcd = self.lcd
+        lcd.move_to(col, row)
+        # آدرس DDRAM خودکار جلو می‌رود؛ برخلاف putchar برای هر کاراکتر دستور move_to فرستاده نمی‌شود
+        write = lcd.hal_write_data
+        for c in text:
+            write(ord(c))
+        lcd.cursor_x = col + len(text)
+        self.commands += 1
+        self.writes += len(text)
+
+    def render(self, source, extra=None):
+        """
+        به‌روزرسانی صفحه جاری.
+
+        Args:
+            source: شیئی که مقدار فیلدها از صفت‌های آن خوانده می‌شود (مثلاً PowerResult).
+            extra (dict): مقادیری که در source نیستند (مثلاً rpm، energy، alarm)؛ اولویت با extra است.
+        """
+        if self._presses:
+            step = self._presses
+            self._presses = 0
+            self.next_page(step)
+        page = self.pages[self.page]
+        if self._full:
+            # رسم کامل: هر سطر یک بار با متن ثابت و فیلدهای قالب‌بندی‌شده
+            self._full = False
+            rows = list(page.rows)
+            for f in page.fields:
+                f.last = s = f.render(self._value(f.key, source, extra))
+                line = rows[f.row]
+                rows[f.row] = line[:f.col] + s + line[f.col + f.width:]
+            for row, line in enumerate(rows):
+                self._write(0, row, line)
+            return
+        for f in page.fields:
+            s = f.render(self._value(f.key, source, extra))
+            last = f.last
+            if s == last:
+                continue
+            # فقط بازه کاراکترهای تغییرکرده نوشته می‌شود
+            a = 0
+            b = f.width
+            while s[a] == last[a]:
+                a += 1
+            while s[b - 1] == last[b - 1]:
+                b -= 1
+            self._write(f.col + a, f.row, s[a:b])
+            f.last = s
+
+    @staticmethod
+    def _value(key, source, extra):
+        if extra and key in extra:
+            return extra[key]
+        return getattr(source, key, 0)
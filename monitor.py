@@ -0,0 +1,642 @@
+#Energy and RPM monitor core shared by all firmware profiles
+# هسته مشترک سیستم نظارت بر انرژی و RPM: نمونه‌برداری، محاسبات، RPM، رویدادها، نمایشگرها و حلقه اصلی.
+# همه وسایل جانبی از یک پشتیبان سخت‌افزاری تزریق‌شده (روی برد hardware.Esp32Hardware) ساخته می‌شوند
+# و هر پروفایل (main.py، main_bugFix.py، main_comment.py) فقط تنظیمات خودش را به Monitor می‌دهد.
+import gc  # برای جمع‌آوری زباله‌ها
+from power_engine import Channel, ChannelSet  # موتور اندازه‌گیری چندکاناله
+from rpm_service import RpmService  # سرویس RPM مشترک برای چند ورودی هال
+from events import EventEngine, EVENT_NAMES  # تشخیص رویداد و ناهنجاری
+from supervisor import Supervisor  # واچ‌داگ و بازیابی وسایل جانبی
+from selftest import SelfTest, diag_names, diag_code  # خودآزمایی حسگرها
+# ماژول‌های نمایشگر، ضبط شکل موج، تله‌متری و زمان‌بندی فقط در start() و در صورت فعال بودن import می‌شوند
+
+# تنظیمات پیش‌فرض؛ هر پروفایل با پارامتر config فقط کلیدهای متفاوت را تغییر می‌دهد
+DEFAULT_CONFIG = {
+    # ضریب‌های مقیاس تبدیل
+    'pt_scale': 0.25,  # ضریب تبدیل ولتاژ (ولتاژ واقعی بر حسب ولت)
+    'ct_scale': 0.054,  # ضریب تبدیل جریان (جریان واقعی بر حسب آمپر)
+    # اصلاح تجربی نتیجه هر پنجره: تابعی با (PowerResult، حالت بار) که نتیجه را برمی‌گرداند؛ None بدون اصلاح
+    'calibrate': None,
+    # تشخیص حالت بار (classifier.py) روی نتیجه خام: dict مدل یا مسیر فایل JSON؛ None: حالت همیشه None
+    'load_model': None,
+    'load_hysteresis': 0.1,
+
+    # تنظیمات نمونه‌برداری
+    'sample_count': 2000,
+    'sample_interval_us': 100,  # فاصله زمانی نمونه‌برداری به میکروثانیه
+    # کانال‌های اندازه‌گیری: هر جفت (پین ولتاژ، پین جریان) یک فاز یا یک موتور است
+    # برای سه فاز مثلاً: ((35, 32), (34, 33), (39, 36))
+    'channel_pins': ((35, 32),),
+
+    # سنسور اثر هال و TM1637 (ضریب برای دوره پردازش rpm_interval_ms)
+    'hall_pin': 33,
+    'tm1637_pins': (16, 17),  # (CLK، DIO)
+    'rpm_interval_ms': 100,
+    'rpm_multiplier': 569,
+    'rpm_average_window': 25,
+
+    # زمان‌بندی تطبیقی: در حالت پایدار پنجره تا sample_count و مکث تا max_pause_ms بلند می‌شود،
+    # با پله در Irms یا RPM به min_sample_count و min_pause_ms برمی‌گردد؛ در مکث، RPM و یک
+    # نمونه‌برداری کوتاه جریان بررسی می‌شوند تا پله مکث را زودتر تمام کند
+    'adaptive_scheduling': True,
+    'min_sample_count': 500,
+    'min_pause_ms': 50,
+    'max_pause_ms': 2000,
+    'pause_ms': 500,  # مکث ثابت بین پنجره‌ها بدون زمان‌بندی تطبیقی
+
+    # تشخیص رویداد: آستانه‌ها نسبت به events.DEFAULT_THRESHOLDS تغییر داده می‌شوند
+    'event_thresholds': None,
+    'alarm_pin': 2,  # خروجی هشدار (LED روی برد)؛ None برای غیرفعال کردن
+
+    # ضبط شکل موج کانال اول: انتهای پنجره قبل، پنجره تریگر و ابتدای پنجره بعد در /cap_XXX.bin
+    'waveform_capture': True,
+
+    # تله‌متری: (شماره UART، پین TX، پین RX)؛ None برای غیرفعال کردن
+    'telemetry_uart': (1, 25, 26),
+    'telemetry_baud': 115200,
+    'telemetry_period_ms': 1000,  # نرخ ارسال فریم (0: هر پنجره)
+
+    # آمار بازه‌ای: کمینه/بیشینه/میانگین/انحراف معیار/صدک ۵۰ و ۹۵ هر مقدار در هر بازه، به صورت افزایشی
+    # بازه‌های بسته‌شده با تله‌متری ارسال و بازه‌های بلند (حداقل aggregate_log_min_ms) در فلش ثبت می‌شوند
+    'aggregate': True,
+    'aggregate_buckets_ms': (60000, 3600000),  # دقیقه‌ای و ساعتی
+    'aggregate_log': '/agg.csv',  # None برای غیرفعال کردن ثبت در فلش
+    'aggregate_log_min_ms': 3600000,
+    'aggregate_log_max_bytes': 65536,  # با رسیدن به این اندازه فایل به .old منتقل می‌شود
+
+    # ناظر: WDT فقط وقتی تغذیه می‌شود که همه مراحل پنجره در بودجه زمانی (supervisor.DEFAULT_BUDGETS) تمام شوند
+    'watchdog_timeout_ms': 8000,  # باید از طولانی‌ترین پنجره به علاوه مکث بیشتر باشد؛ None برای غیرفعال کردن
+    'stage_budgets': None,  # تغییر بودجه مراحل به میلی‌ثانیه، مثلاً {'lcd': 300}
+    # اگر بازیابی وسیله‌ای که با reboot=True ثبت شده تا این مدت موفق نشود، WDT برد را ریست می‌کند؛
+    # LCD و TM1637 غیرضروری‌اند و نبودن دائمی‌شان ریست نمی‌دهد
+    'reboot_after_ms': 60000,
+    'supervisor_state': '/supervisor.json',  # شمارنده‌های خطا و علت ریست
+
+    # صفحه‌های LCD (۲۰×۴) و مقدار تمام‌مقیاس نمودارها؛ None: lcd_ui.DEFAULT_PAGES و DEFAULT_SCALES
+    'lcd_pages': None,
+    'lcd_scales': None,
+    'page_button_pin': 4,  # دکمه تغییر صفحه (به GND)؛ None برای غیرفعال کردن
+
+    # نمایش TM1637: چرخش بین RPM، کیلووات و جریان با برچسب کوتاه هنگام تغییر مقدار
+    'tm1637_decimal': True,  # ماژول با ممیز (TM1637Decimal)؛ False برای ماژول دونقطه‌ای (مثل قطعه Wokwi) بدون اعشار
+    'tm1637_items': None,  # None: tm_presenter.DEFAULT_ITEMS
+    'tm1637_cycle_ms': 3000,  # مدت نمایش هر مقدار؛ 0 فقط RPM
+    'tm1637_label_ms': 600,  # مدت نمایش برچسب (SPd، PUr، Cur)
+
+    # خودآزمایی حسگرها در بوت و هر diag_period_ms روی آمار همان پنجره؛ حدها نسبت به selftest.DEFAULT_LIMITS
+    'self_test': True,
+    'diag_limits': None,  # مثلاً {'mains_hz': 60.0, 'load_irms': 0.5}
+    'diag_period_ms': 5000,
+
+    # کنسول فرمان روی REPL (USB): get/set/save/reset پارامترهای زمان اجرا بدون ویرایش کد و ریبوت
+    'console': True,
+    'config_path': '/config.json',  # مقادیر ذخیره‌شده با save؛ در بوت بعد جای مقادیر بالا را می‌گیرند
+
+    # حالت کم‌مصرف (باتری/خورشیدی): هر low_power_period_ms یک پنجره اندازه‌گیری و خواب سبک بین آنها
+    'low_power': False,
+    'low_power_period_ms': 10000,
+    'low_power_lcd_backlight': False,  # نور پس‌زمینه LCD در حالت کم‌مصرف
+    'low_power_tm_brightness': 0,  # روشنایی TM1637 در حالت کم‌مصرف (0 تا 7)
+    'low_power_hall_wake': True,  # وقتی موتور ایستاده است، اولین پالس هال خواب را قطع می‌کند
+}
+
+
+class Monitor:
+    """
+    سیستم کامل اندازه‌گیری روی یک پشتیبان سخت‌افزاری.
+
+    اشیای سخت‌افزاری و سرویس‌ها در start() ساخته می‌شوند تا ساختن Monitor هیچ کار سخت‌افزاری
+    (اسکن I2C، راه‌اندازی LCD، ADC و تخصیص بافرها) انجام ندهد.
+    """
+
+    def __init__(self, hw, config=None):
+        """
+        Args:
+            hw: پشتیبان سخت‌افزاری با صفت‌های ticks_ms، ticks_us، ticks_diff، sleep_ms، sleep_us،
+                lightsleep، disable_irq، enable_irq و IRQ_RISING و متدهای adc، lcd، segment_display، hall_input، output،
+                button، timer، uart، watchdog، wake_on، reset_cause، mem_free و console_reader
+                (مثل hardware.Esp32Hardware).
+            config (dict): تغییرات نسبت به DEFAULT_CONFIG.
+        """
+        self.hw = hw
+        self.config = dict(DEFAULT_CONFIG)
+        if config:
+            for key in config:
+                if key not in DEFAULT_CONFIG:
+                    raise ValueError(f"تنظیم ناشناخته: {key}")
+            self.config.update(config)
+        self.lcd = None
+        self.tm_display = None
+        self.tm_view = None  # نمایش چرخشی مقادیر روی tm_display
+        self.hall_sensor = None
+        self.supervisor = None
+        self.duty = None  # زمان‌بند حالت کم‌مصرف
+        self.selftest = None
+        self.ui = None  # رابط کاربری صفحه‌ای LCD
+        self.page_button = None
+        self.channels = None
+        self.events = None
+        self.capture = None
+        self.telemetry = None
+        self.aggregator = None  # آمار بازه‌ای
+        self.classifier = None  # تشخیص حالت بار برای انتخاب ضرایب اصلاح
+        self.rpm_service = None  # سرویس RPM مشترک (در اولین فراخوانی initialize_rpm_monitor ساخته می‌شود)
+        self.scheduler = None
+        self.console = None
+
+    # تنظیمات اولیه LCD
+    def setup_lcd(self):
+        try:
+            return self.hw.lcd(4, 20)  # 4 خط و 20 ستون
+        except Exception as e:
+            print(f"خطا در تنظیمات LCD: {e}")
+            return None
+
+    def reinit_lcd(self):
+        """راه‌اندازی دوباره LCD بدون ریبوت؛ اگر باس پاسخ ندهد ابتدا باس بازیابی می‌شود."""
+        self.lcd = self.hw.lcd(4, 20, recover=True)
+        if self.duty and self.duty.enabled and not self.config['low_power_lcd_backlight']:
+            self.lcd.backlight_off()  # راه‌اندازی دوباره نور پس‌زمینه را روشن می‌کند
+        if self.ui:
+            self.ui.attach(self.lcd)  # بارگذاری دوباره کاراکترهای سفارشی و رسم کامل صفحه
+
+    def reinit_tm1637(self):
+        """ارسال دوباره دستورهای راه‌اندازی TM1637 (حالت داده و روشنایی)"""
+        tm = self.tm_display
+        if tm:
+            tm.__init__(tm.clk, tm.dio, tm.brightness())
+        if self.tm_view:
+            self.tm_view.invalidate()  # فریم جاری در tick بعد دوباره نوشته می‌شود
+
+    def setup_low_power(self):
+        """زمان‌بند حالت کم‌مصرف با کم‌نور کردن نمایشگرها؛ خواب‌ها کوتاه‌تر از مهلت WDT تکه می‌شوند."""
+        from powersave import DutyCycler
+        cfg = self.config
+        hw = self.hw
+        wdt_ms = cfg['watchdog_timeout_ms']
+        duty = self.duty = DutyCycler(hw.lightsleep, hw.ticks_ms, hw.ticks_diff, cfg['low_power_period_ms'],
+                                      max_sleep_ms=wdt_ms // 2 if wdt_ms else None,
+                                      on_wake=self.supervisor.keepalive)
+        if not cfg['low_power_lcd_backlight']:
+            duty.add_display(lambda: self.lcd and self.lcd.backlight_off(),
+                             lambda: self.lcd and self.lcd.backlight_on())
+        tm = self.tm_display
+        if tm:
+            full = tm.brightness()
+            duty.add_display(lambda: tm.brightness(cfg['low_power_tm_brightness']), lambda: tm.brightness(full))
+        duty.enable()
+        # کران پایین: فقط زمان نمونه‌برداری؛ مقدار واقعی پس از اولین پنجره چاپ می‌شود
+        burst = cfg['sample_count'] * cfg['sample_interval_us'] // 1000
+        print(f"حالت کم‌مصرف: دوره {cfg['low_power_period_ms']} ms، "
+              f"نسبت بیداری مورد انتظار ≥ {duty.expected_duty(burst) * 100:.1f}%")
+
+    def arm_hall_wake(self):
+        """بیدارباش با پالس هال فقط وقتی موتور ایستاده است؛ موتور در حال چرخش هر خواب را قطع می‌کرد."""
+        hall = self.hall_sensor
+        arm = (self.config['low_power_hall_wake'] and hall is not None and not self.rpm_service.rpm[0]
+               and not hall.value())
+        self.hw.wake_on(hall if arm else None)
+
+    def setup_ui(self):
+        """رابط صفحه‌ای LCD و دکمه تغییر صفحه"""
+        from lcd_ui import LcdUi, DEFAULT_PAGES, DEFAULT_SCALES
+        cfg = self.config
+        self.ui = LcdUi(cfg['lcd_pages'] or DEFAULT_PAGES, 20, cfg['lcd_scales'] or DEFAULT_SCALES)
+        self.ui.attach(self.lcd)
+        if cfg['page_button_pin'] is not None:
+            self.page_button = self.hw.button(cfg['page_button_pin'],
+                                              self.ui.button_handler(self.hw.ticks_ms, self.hw.ticks_diff))
+
+    def setup_console(self):
+        """کنسول فرمان روی REPL؛ تنظیمات ذخیره‌شده در اولین مرز پنجره اعمال می‌شوند."""
+        from console import Console
+        cfg = self.config
+        channels = self.channels
+        rpm_service = self.rpm_service
+        scheduler = self.scheduler
+        telemetry = self.telemetry
+
+        def scale(attr):
+            def apply(value):
+                for ch in channels.channels:
+                    setattr(ch, attr, value)
+            return apply
+
+        def sample_count(value):
+            if scheduler:
+                scheduler.max_samples = value
+                scheduler.min_samples = min(scheduler.min_samples, value)
+                scheduler.sample_count = min(scheduler.sample_count, value)
+            else:
+                channels.set_sample_count(value)
+
+        def rpm_multiplier(value):
+            rpm_service.configure(0, rpm_multiplier=value * rpm_service.interval_ms // cfg['rpm_interval_ms'])
+
+        con = Console(self.hw.console_reader(), print, self.hw.ticks_us, self.hw.ticks_diff, cfg['config_path'])
+        con.add('pt_scale', cfg['pt_scale'], 0.001, 10.0, scale('pt_scale'))
+        con.add('ct_scale', cfg['ct_scale'], 0.0001, 10.0, scale('ct_scale'))
+        con.add('rpm_multiplier', cfg['rpm_multiplier'], 1, 100000, rpm_multiplier)
+        con.add('moving_average_window', cfg['rpm_average_window'], 1, 200,
+                lambda value: rpm_service.configure(0, moving_average_window=value))
+        # بافرها از قبل تخصیص یافته‌اند
+        con.add('sample_count', cfg['sample_count'], 50, cfg['sample_count'], sample_count)
+        con.add('sample_interval_us', cfg['sample_interval_us'], 0, 10000, channels.set_sample_interval)
+        if telemetry:
+            con.add('telemetry_period_ms', cfg['telemetry_period_ms'], 0, 60000,
+                    lambda value: setattr(telemetry, 'period_ms', value))
+        con.add_command('events', self.show_events, 'events [n] (آخرین n رویداد، پیش‌فرض 10)')
+        loaded = con.load()
+        if loaded:
+            print(f"{loaded} تنظیم از {cfg['config_path']} در اولین پنجره اعمال می‌شود.")
+        return con
+
+    def show_events(self, args):
+        """
+        پاسخ فرمان کنسول events: رویدادهای فعال و آخرین رویدادهای گزارش (که فقط در RAM است).
+
+        Args:
+            args (list): آرگومان‌های فرمان؛ اختیاری تعداد رویدادها.
+
+        Returns:
+            str: یک خط، قدیمی به جدید: نام، کانال (با چند کانال)، on/off، مقدار و چند ثانیه پیش.
+        """
+        count = int(args[0]) if args else 10
+        if count < 1:
+            raise ValueError("تعداد باید مثبت باشد.")
+        events = self.events
+        names = self.channels.channels
+        now = self.hw.ticks_ms() & 0x3FFFFFFF
+        items = []
+        for t, code, raised, value, channel in events.log.entries():
+            where = f" {names[channel].name}" if len(names) > 1 else ""
+            age = ((now - t) & 0x3FFFFFFF) / 1000
+            items.append(f"{EVENT_NAMES.get(code, code)}{where} {'on' if raised else 'off'} "
+                         f"{value:.2f} -{age:.1f}s")
+        active = " ".join(events.active_names()) or "-"
+        return f"فعال: {active}؛ {len(items)} رویداد: " + ("; ".join(items[-count:]) or "-")
+
+    def on_diag(self, status, old):
+        """گزارش تغییر وضعیت خودآزمایی و نمایش کد خطا روی TM1637"""
+        if status:
+            print(f"خودآزمایی حسگرها: {' '.join(diag_names(status))} (کد Er{diag_code(status):02d})")
+        else:
+            print(f"خودآزمایی حسگرها: سالم (رفع {' '.join(diag_names(old))})")
+        if self.tm_view:
+            self.tm_view.set_status(diag_code(status))
+
+    def run_diagnostics(self, rpm=None):
+        """خودآزمایی روی پنجره جاری؛ همه کانال‌ها قبلاً در calculate_power تحلیل شده‌اند."""
+        channels = self.channels
+        dropped = self.rpm_service.dropped if rpm is not None else 0
+        return self.selftest.run(channels.channels, channels.results, rpm, dropped)
+
+    def setup_telemetry(self):
+        cfg = self.config
+        if cfg['telemetry_uart'] is None:
+            return None
+        try:
+            from telemetry import Telemetry  # ارسال فریم‌های باینری تله‌متری
+            uart_id, tx_pin, rx_pin = cfg['telemetry_uart']
+            uart = self.hw.uart(uart_id, cfg['telemetry_baud'], tx_pin, rx_pin)
+            return Telemetry(uart, self.hw.ticks_ms, self.hw.ticks_diff, cfg['telemetry_period_ms'])
+        except Exception as e:
+            print(f"خطا در تنظیمات تله‌متری: {e}")
+            return None
+
+    def setup_aggregator(self):
+        from aggregate import Aggregator, CsvLog, metric_names  # آمار افزایشی بازه‌ای
+        cfg = self.config
+        log = CsvLog(cfg['aggregate_log'], cfg['aggregate_log_max_bytes']) if cfg['aggregate_log'] else None
+        log_min_ms = cfg['aggregate_log_min_ms']
+
+        def on_bucket(span_ms, index, name, stat, end_ms):
+            if self.telemetry:
+                self.telemetry.send_aggregate(span_ms, index, name, stat, end_ms)
+            if log and span_ms >= log_min_ms:
+                log(span_ms, index, name, stat, end_ms)
+
+        # با چند کانال، مقادیر هر کانال دیگر و نتایج کل هم تجمیع می‌شوند
+        return Aggregator(self.hw.ticks_ms, self.hw.ticks_diff, cfg['aggregate_buckets_ms'],
+                          metrics=metric_names(len(self.channels.channels)), on_bucket=on_bucket)
+
+    def on_event(self, code, raised, value, channel=0):
+        """چاپ هر تغییر وضعیت رویداد؛ ضبط شکل موج فقط برای رویداد کانال ضبط‌شونده"""
+        where = f" {self.channels.channels[channel].name}" if len(self.channels.channels) > 1 else ""
+        print(f"رویداد {EVENT_NAMES.get(code, code)}{where}: {'فعال' if raised else 'رفع شد'} ({value:.2f})")
+        if raised and self.capture and channel == self.capture.channel_index:
+            self.capture.trigger(code)
+
+    # محاسبه توان و ضریب توان
+    def calculate_power(self, channel=None):
+        """
+        نتیجه پنجره جاری یک کانال (پیش‌فرض: کانال اول) به صورت PowerResult.
+        همان شیء در هر پنجره بازنویسی می‌شود؛ نمایشگرها و خروجی‌ها فقط این شیء را می‌خوانند.
+        """
+        channels = self.channels
+        ch = channel or channels.channels[0]
+        try:
+            # VRMS، IRMS، P، Q و S از ChannelSet.compute؛ فاز، PF جابه‌جایی، فرکانس و کیفیت از analyze
+            return ch.analyze(channels.sample_count, channels.period_us, channels.missed)
+        except Exception as e:
+            print(f"خطا در محاسبه توان: {e}")
+            ch.result.clear()
+            return ch.result
+
+    def setup_classifier(self):
+        from classifier import LoadClassifier, load_model  # تشخیص حالت بار
+        model = self.config['load_model']
+        try:
+            if isinstance(model, str):
+                model = load_model(model)
+            return LoadClassifier(model, self.config['load_hysteresis'])
+        except Exception as e:
+            print(f"خطا در بارگذاری مدل حالت بار: {e}")
+            return None
+
+    def calibrate(self, result):
+        """تشخیص حالت بار روی نتیجه خام و اصلاح تجربی پروفایل (config['calibrate']) برای همان حالت"""
+        mode = None
+        classifier = self.classifier
+        if classifier:
+            old = classifier.index
+            mode = classifier.classify(result, self.rpm_service.rpm[0])
+            if classifier.index != old:
+                print(f"حالت بار: {mode}")
+        fn = self.config['calibrate']
+        return fn(result, mode) if fn else result
+
+    def initialize_rpm_monitor(self, clk_pin, dio_pin, hall_pin, timer_interval_ms=100, rpm_multiplier=569,
+                               moving_average_window=25):
+        """
+        مقداردهی اولیه سیستم مانیتورینگ RPM.
+
+        Args:
+            clk_pin (int): شماره پایه CLK برای نمایشگر TM1637.
+            dio_pin (int): شماره پایه DIO برای نمایشگر TM1637.
+            hall_pin (int): شماره پایه اینتراپت سنسور اثر هال.
+            timer_interval_ms (int): بازه زمانی تایمر به میلی‌ثانیه (پیش‌فرض: 100ms).
+            rpm_multiplier (int): ضریب تبدیل برای RPM.
+            moving_average_window (int): طول پنجره میانگین متحرک.
+        """
+        from tm_presenter import SegmentPresenter, DEFAULT_ITEMS
+        cfg = self.config
+        hw = self.hw
+        # پیکربندی نمایشگر TM1637
+        tm = hw.segment_display(clk_pin, dio_pin, cfg['tm1637_decimal'])
+
+        # پیکربندی سنسور اثر هال
+        hall_sensor_pin = hw.hall_input(hall_pin)
+        if self.hall_sensor is None:
+            self.hall_sensor = hall_sensor_pin  # ورودی بیدارباش حالت کم‌مصرف
+
+        # همه ورودی‌های هال یک صف زمان‌مهر و یک تایمر مشترک دارند؛
+        # فراخوانی دوباره این تابع فقط یک کانال جدید به همان سرویس اضافه می‌کند
+        if self.rpm_service is None:
+            self.rpm_service = RpmService(hw.ticks_us, timer_interval_ms,
+                                          disable_irq=hw.disable_irq, enable_irq=hw.enable_irq)
+            self.rpm_service.start(hw.timer())
+        rpm_service = self.rpm_service
+
+        # فریم هر مقدار فقط هنگام تغییر آن ساخته می‌شود و TM1637 فقط هنگام تغییر فریم نوشته می‌شود
+        view = SegmentPresenter(tm, cfg['tm1637_items'] or DEFAULT_ITEMS, rpm_service.interval_ms,
+                                cfg['tm1637_cycle_ms'], cfg['tm1637_label_ms'], cfg['tm1637_decimal'])
+        if self.tm_display is None:
+            self.tm_display = tm  # نمایشگری که ناظر در صورت خطا دوباره راه‌اندازی می‌کند
+            self.tm_view = view  # کیلووات و جریان از حلقه اصلی به این نمایشگر داده می‌شوند
+        supervisor = self.supervisor
+
+        def display_number(number):
+            """ثبت RPM و پیشروی چرخش نمایش (هر دوره سرویس RPM)"""
+            if supervisor and supervisor.failed('tm1637'):
+                return  # تا بازیابی نمایشگر، نوشتن رد می‌شود
+            view.update('rpm', number)
+            view.tick()
+
+        # ضریب RPM برای دوره پردازش سرویس مقیاس می‌شود
+        multiplier = rpm_multiplier * rpm_service.interval_ms // timer_interval_ms
+        rpm_service.register(hall_sensor_pin, hw.IRQ_RISING, multiplier, moving_average_window, display_number)
+
+        return rpm_service.timer, hall_sensor_pin, tm  # تایمر و تنظیمات برای استفاده بیشتر
+
+    def start(self):
+        """راه‌اندازی سخت‌افزار و سرویس‌ها؛ تا این تابع فراخوانی نشود هیچ پیکربندی سخت‌افزاری انجام نمی‌شود."""
+        cfg = self.config
+        hw = self.hw
+        supervisor = self.supervisor = Supervisor(hw.ticks_ms, hw.ticks_diff, budgets=cfg['stage_budgets'],
+                                                  state_path=cfg['supervisor_state'],
+                                                  reset_cause=hw.reset_cause(),
+                                                  reboot_after_ms=cfg['reboot_after_ms'])
+        supervisor.register('lcd', self.reinit_lcd)
+        supervisor.register('tm1637', self.reinit_tm1637)
+        print(f"بوت شماره {supervisor.state['boots']}، علت‌های ریست: {supervisor.state['reset_causes']}")
+
+        self.lcd = self.setup_lcd()
+        if not self.lcd:
+            # اندازه‌گیری بدون LCD ادامه می‌یابد و ناظر راه‌اندازی دوباره را تکرار می‌کند
+            supervisor.fault('lcd')
+        self.setup_ui()
+
+        count = cfg['sample_count']
+        try:
+            self.channels = ChannelSet(
+                [Channel(hw.adc(v_pin), hw.adc(i_pin), cfg['pt_scale'], cfg['ct_scale'], count, f"L{n + 1}")
+                 for n, (v_pin, i_pin) in enumerate(cfg['channel_pins'])],
+                count, cfg['sample_interval_us'], hw.sleep_us, hw.ticks_us)
+        except Exception as e:
+            print(f"خطا در تنظیمات ADC: {e}")
+            raise SystemExit("برنامه متوقف شد: خطای ADC.")
+
+        if cfg['waveform_capture']:
+            from capture import WaveformCapture  # ضبط شکل موج حول رویداد
+            self.capture = WaveformCapture(self.channels, 0, pre_samples=500, post_samples=500,
+                                           ticks_ms=hw.ticks_ms)
+
+        alarm_pin = cfg['alarm_pin']
+        self.events = EventEngine(hw.ticks_ms, cfg['event_thresholds'],
+                                  alarm_pin=hw.output(alarm_pin) if alarm_pin is not None else None,
+                                  on_event=self.on_event, channels=len(self.channels.channels))
+        self.telemetry = self.setup_telemetry()
+        if cfg['aggregate']:
+            self.aggregator = self.setup_aggregator()
+
+        clk_pin, dio_pin = cfg['tm1637_pins']
+        self.initialize_rpm_monitor(clk_pin, dio_pin, cfg['hall_pin'], cfg['rpm_interval_ms'],
+                                    cfg['rpm_multiplier'], cfg['rpm_average_window'])
+        self.rpm_service.listener = self.events.update_rpm  # بررسی توقف موتور در هر به‌روزرسانی RPM
+        self.rpm_service.on_error = lambda ch, e: supervisor.fault('tm1637', e)
+        if cfg['load_model']:
+            self.classifier = self.setup_classifier()
+
+        if cfg['self_test']:
+            # یک پنجره کامل برای بررسی بایاس، اشباع و برق شهر پیش از شروع حلقه (هال هنوز پالسی ندارد)
+            self.selftest = SelfTest(cfg['diag_limits'], self.on_diag)
+            self.channels.acquire()
+            self.channels.compute()
+            for ch in self.channels.channels:
+                self.calculate_power(ch)
+            if not self.run_diagnostics():
+                print("خودآزمایی حسگرها: سالم")
+
+        if cfg['adaptive_scheduling']:
+            from scheduler import AdaptiveScheduler  # زمان‌بندی تطبیقی پنجره و نرخ به‌روزرسانی
+            self.scheduler = AdaptiveScheduler(cfg['min_sample_count'], count, cfg['min_pause_ms'],
+                                               cfg['max_pause_ms'])
+        if cfg['console']:
+            self.console = self.setup_console()
+
+        # WDT پس از پایان راه‌اندازی فعال می‌شود تا بوت کند باعث ریست نشود
+        if cfg['watchdog_timeout_ms']:
+            supervisor.wdt = hw.watchdog(cfg['watchdog_timeout_ms'])
+        if cfg['low_power']:
+            self.setup_low_power()
+
+        gc.collect()
+        # ticks_ms از لحظه روشن شدن برد شمرده می‌شود
+        print(f"راه‌اندازی کامل: {hw.ticks_ms()} ms پس از بوت، حافظه آزاد: {hw.mem_free()} بایت")
+
+    # حلقه اصلی
+    def run(self, windows=None):
+        """
+        حلقه اصلی اندازه‌گیری.
+
+        Args:
+            windows (int): تعداد پنجره‌ها پیش از بازگشت (برای شبیه‌سازی روی میزبان)؛ None بی‌پایان.
+        """
+        if self.supervisor is None:
+            self.start()
+        cfg = self.config
+        hw = self.hw
+        ticks_ms = hw.ticks_ms
+        ticks_us = hw.ticks_us
+        ticks_diff = hw.ticks_diff
+        supervisor = self.supervisor
+        channels = self.channels
+        events = self.events
+        rpm_service = self.rpm_service
+        scheduler = self.scheduler
+        console = self.console
+        selftest = self.selftest
+        aggregator = self.aggregator
+        telemetry = self.telemetry
+        capture = self.capture
+        tm_view = self.tm_view
+        duty = self.duty
+        ui = self.ui
+        first_reading = True
+        duty_reported = False
+        energy_wh = 0.0  # انرژی مصرفی تجمعی (همه کانال‌ها)
+        result0 = channels.results[0]
+        others = channels.channels[1:]  # کانال‌های دوم به بعد: تحلیل، رویداد و تله‌متری جداگانه
+        ch0 = channels.channels[0]
+
+        def probe():
+            # دو سیکل جریان کانال اول برای بیدار شدن زودهنگام زمان‌بند
+            return channels.probe_current(2, result0.freq)
+        # مقادیر صفحه‌های LCD که در PowerResult نیستند (یک بار ساخته و در هر پنجره به‌روز می‌شود)
+        ui_values = {'rpm': 0, 'energy_kwh': 0.0, 'alarm': '', 'quality': 'OK',
+                     'boots': supervisor.state['boots'], 'errors': 0, 'mem': 0, 'acq_ms': 0, 'diag': 'OK'}
+        diag_status = 0
+        last_diag = ticks_ms()
+        alarm_mask = 0
+        quality_flags = 0
+        last_window = ticks_ms()
+        while windows is None or windows > 0:
+            if windows is not None:
+                windows -= 1
+            try:
+                # فرمان‌های کنسول (حداکثر console.POLL_BUDGET_US) و اعمال همه تغییرات با هم در مرز پنجره
+                if console:
+                    supervisor.run('console', console.poll)
+                    supervisor.run('console', console.commit)
+
+                # نمونه‌برداری درهم همه کانال‌ها و محاسبه نتایج هر فاز و کل
+                if scheduler:
+                    channels.set_sample_count(scheduler.sample_count)
+                t0 = ticks_us()
+                channels.acquire()
+                t1 = ticks_us()
+                channels.compute()
+                supervisor.check('acquire', ticks_diff(t1, t0) // 1000)
+                supervisor.check('compute', ticks_diff(ticks_us(), t1) // 1000)
+
+                # محاسبه توان و اصلاح تجربی پروفایل روی کانال اول (Q و PF واقعی از مقادیر اصلاح‌شده)
+                r = self.calibrate(self.calculate_power())
+                for ch in others:
+                    self.calculate_power(ch)
+                t2 = ticks_us()
+
+                # انرژی مصرفی از توان کل (کانال اول کالیبره‌شده) و فاصله بین دو پنجره
+                now = ticks_ms()
+                energy_wh += (r.p + channels.p - ch0.p) * ticks_diff(now, last_window) / 3600000
+                last_window = now
+
+                # بررسی رویدادها روی مقادیر کالیبره‌شده، برای هر کانال جداگانه
+                events.update_result(r)
+                for k in range(1, len(channels.results)):
+                    events.update_result(channels.results[k], k)
+                # آمار بازه‌ای؛ RPM خروجی میانگین متحرک است و نمونه هر پنجره کافی است
+                if aggregator:
+                    supervisor.run('aggregate', aggregator.update, r, rpm_service.rpm[0], channels)
+                # خودآزمایی دوره‌ای روی آمار همین پنجره (بدون نمونه‌برداری اضافه)
+                if selftest and ticks_diff(now, last_diag) >= cfg['diag_period_ms']:
+                    last_diag = now
+                    self.run_diagnostics(rpm_service.rpm[0])
+                    if selftest.status != diag_status:
+                        diag_status = selftest.status
+                        ui_values['diag'] = " ".join(selftest.names()) if diag_status else "OK"
+                if tm_view:
+                    tm_view.update('kw', r.p / 1000)
+                    tm_view.update('irms', r.irms)
+
+                # نمایش مقادیر: فقط فیلدهای تغییرکرده صفحه جاری نوشته می‌شوند
+                # (خطای I2C به ناظر گزارش می‌شود و LCD بدون ریبوت دوباره راه‌اندازی می‌شود)
+                if events.active_mask != alarm_mask:
+                    alarm_mask = events.active_mask
+                    ui_values['alarm'] = " ".join(events.active_names())
+                if r.flags != quality_flags:
+                    quality_flags = r.flags
+                    ui_values['quality'] = " ".join(r.flag_names()) if r.flags else "OK"
+                ui_values['rpm'] = rpm_service.rpm[0]
+                ui_values['energy_kwh'] = energy_wh / 1000
+                ui_values['errors'] = sum(supervisor.state['errors'].values())
+                ui_values['mem'] = hw.mem_free()
+                ui_values['acq_ms'] = ticks_diff(t1, t0) // 1000
+                supervisor.run('lcd', ui.render, r, ui_values)
+                if first_reading:
+                    first_reading = False
+                    print(f"اولین اندازه‌گیری: {ticks_ms()} ms پس از بوت، حافظه آزاد: {hw.mem_free()} بایت")
+
+                # جابه‌جایی بافرهای ضبط و ذخیره ضبط کامل‌شده در فلش
+                if capture:
+                    capture.after_window()
+                    path = supervisor.run('capture', capture.save)
+                    if path:
+                        print(f"شکل موج ذخیره شد: {path}")
+
+                # ارسال فریم تله‌متری (بدون انتظار؛ در صورت پر بودن بافر UART رد می‌شود)
+                if telemetry:
+                    supervisor.run('telemetry', telemetry.send, r, energy_wh, rpm_service.rpm[0],
+                                   ticks_diff(t1, t0), ticks_diff(t2, t1), ticks_diff(ticks_us(), t2), channels)
+
+                # زمان‌بندی پنجره بعد (در حالت کم‌مصرف خواب سبک پس از تغذیه WDT انجام می‌شود)
+                if scheduler:
+                    # پله روی Irms خام کانال اول (فقط AC، پیش از اصلاح تجربی پروفایل)
+                    scheduler.update(channels.channels[0].irms, rpm_service.rpm[0])
+                    if not duty:
+                        scheduler.wait(hw.sleep_ms, rpm_service.rpm, probe)
+                elif not duty:
+                    hw.sleep_ms(cfg['pause_ms'])
+                gc.collect()  # جمع‌آوری زباله‌ها (برای آزادسازی حافظه)
+            except Exception as e:
+                print(f"خطا در حلقه اصلی: {e}")
+                supervisor.fault('loop')
+            # تغذیه WDT فقط برای پنجره سالم و تلاش برای بازیابی وسایل خراب
+            supervisor.window_done()
+            if duty:
+                self.arm_hall_wake()
+                duty.sleep()
+                if not duty_reported and duty.asleep_ms:
+                    duty_reported = True
+                    print(f"پنجره {duty.last_burst_ms} ms: نسبت بیداری {duty.expected_duty() * 100:.1f}%، "
+                          f"جریان میانگین ~{duty.average_ma(duty.expected_duty()):.1f} mA")
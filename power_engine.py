@@ -0,0 +1,349 @@
+#Multi-channel / multi-phase measurement engine
+# موتور اندازه‌گیری چندکاناله برای چند فاز یا چند موتور روی یک برد: نمونه‌برداری درهم همه کانال‌ها
+# با فاصله واقعی اندازه‌گیری‌شده، Vrms، Irms، P، Q و S فقط از مؤلفه AC (حذف دقیق DC روی مجموع‌های
+# صحیح)، نتایج کل فازها، و تحلیل هر پنجره (فاز، PF جابه‌جایی، فرکانس، ضریب قله و پرچم‌های کیفیت).
+import math
+from array import array
+
+# تنظیمات پیش‌فرض نمونه‌برداری
+SAMPLE_COUNT = 2000
+SAMPLE_INTERVAL_US = 100  # فاصله زمانی بین دو دور نمونه‌برداری به میکروثانیه
+ADC_MAX = 4095  # بیشینه خروجی ADC دوازده بیتی
+
+# پرچم‌های کیفیت نمونه‌برداری در PowerResult.flags
+FLAG_CLIP_V = 1    # ولتاژ به 0 یا ADC_MAX رسیده است
+FLAG_CLIP_I = 2    # جریان به 0 یا ADC_MAX رسیده است
+FLAG_MISSED = 4    # پنجره کندتر از حالت عادی نمونه‌برداری شد (نمونه‌های از دست رفته)
+FLAG_NO_CYCLE = 8  # سیکل کامل ولتاژ دیده نشد؛ فرکانس و فاز معتبر نیستند
+FLAG_NAMES = ((FLAG_CLIP_V, 'CLPV'), (FLAG_CLIP_I, 'CLPI'), (FLAG_MISSED, 'MISS'), (FLAG_NO_CYCLE, 'NOCYC'))
+
+
+# عبورهای رو به بالا با هیسترزیس (برای فرکانس و فاز؛ بدون ساخت فهرست)
+def rising_crossings(samples, count, level, hysteresis):
+    """
+    Args:
+        samples: بافر نمونه‌ها.
+        count (int): تعداد نمونه‌های معتبر.
+        level (float): سطحی که عبور نسبت به آن سنجیده می‌شود (معمولاً میانگین).
+        hysteresis (float): نوار مرده حول level برای حذف عبورهای نویزی.
+
+    Returns:
+        tuple: (اندیس اولین عبور، اندیس آخرین عبور، تعداد عبورها)؛ بدون عبور (-1، -1، 0).
+    """
+    lo = level - hysteresis
+    hi = level + hysteresis
+    first = last = -1
+    n = 0
+    armed = False
+    for k in range(count):
+        x = samples[k]
+        if armed:
+            if x >= hi:
+                if first < 0:
+                    first = k
+                last = k
+                n += 1
+                armed = False
+        elif x <= lo:
+            armed = True
+    return first, last, n
+
+
+class PowerResult:
+    """نتیجه یک پنجره برای یک کانال؛ یک بار ساخته و در هر پنجره بازنویسی می‌شود."""
+    __slots__ = ('name', 'vrms', 'irms', 'p', 'q', 's', 'pf', 'dpf', 'phase', 'freq',
+                 'crest_v', 'crest_i', 'samples', 'missed', 'flags')
+
+    def __init__(self, name=''):
+        self.name = name
+        self.clear()
+
+    def clear(self):
+        self.vrms = self.irms = self.p = self.q = self.s = self.pf = 0.0
+        self.dpf = self.phase = self.freq = self.crest_v = self.crest_i = 0.0
+        self.samples = self.missed = self.flags = 0
+
+    def derive(self):
+        """محاسبه دوباره Q و ضریب توان واقعی (P/S) پس از تغییر P یا S (مثلاً کالیبراسیون)."""
+        p = self.p
+        s = self.s
+        self.q = math.sqrt(s * s - p * p) if s > p else 0.0
+        self.pf = min(1.0, p / s) if s > 0 else 0.0
+        return self
+
+    def flag_names(self):
+        """نام پرچم‌های کیفیت فعال"""
+        return [name for bit, name in FLAG_NAMES if self.flags & bit]
+
+
+class Channel:
+    """یک جفت ورودی ولتاژ/جریان (یک فاز یا یک موتور) با بافر و نتایج مخصوص خودش."""
+    __slots__ = ('name', 'voltage_adc', 'current_adc', 'pt_scale', 'ct_scale',
+                 'v', 'i', 'vrms', 'irms', 'p', 'q', 's', 'pf', 'result',
+                 'bias_v', 'bias_i', 'ac_v', 'ac_i', 'cycles_v', 'cycles_i')
+
+    def __init__(self, voltage_adc, current_adc, pt_scale, ct_scale, sample_count=SAMPLE_COUNT, name=''):
+        """
+        Args:
+            voltage_adc: شیء ADC ولتاژ (هر شیئی با متد read()).
+            current_adc: شیء ADC جریان (هر شیئی با متد read()).
+            pt_scale (float): ضریب تبدیل ولتاژ (PT_SCALE_FACTOR).
+            ct_scale (float): ضریب تبدیل جریان (CT_SCALE_FACTOR).
+            sample_count (int): تعداد نمونه‌ها در هر پنجره.
+            name (str): نام کانال برای نمایش (مثلاً 'L1').
+        """
+        self.name = name
+        self.voltage_adc = voltage_adc
+        self.current_adc = current_adc
+        self.pt_scale = pt_scale
+        self.ct_scale = ct_scale
+        # بافرهای خام ADC (۱۲ بیتی) از پیش تخصیص داده می‌شوند تا در حلقه هیچ تخصیصی رخ ندهد
+        self.v = array('H', [0] * sample_count)
+        self.i = array('H', [0] * sample_count)
+        self.vrms = self.irms = self.p = self.q = self.s = self.pf = 0.0
+        # آمار خام آخرین compute (بر حسب شمارش ADC): بایاس DC و مقدار موثر مؤلفه AC، برای خودآزمایی حسگرها
+        self.bias_v = self.bias_i = self.ac_v = self.ac_i = 0.0
+        self.cycles_v = self.cycles_i = 0
+        self.result = PowerResult(name)
+
+    def compute(self, count):
+        """
+        محاسبه Vrms، Irms و P، Q، S و PF این کانال در یک گذر روی بافرها.
+
+        ورودی‌های PT/CT روی بایاس نیمه تغذیه (~2048 شمارش) سوارند؛ میانگین هر پنجره به عنوان
+        بایاس DC کنار گذاشته می‌شود و همه مقادیر فقط از مؤلفه AC به دست می‌آیند.
+        """
+        sv = si = svi = 0
+        v = self.v
+        i = self.i
+        for k in range(count):
+            a = v[k]
+            b = i[k]
+            sv += a * a
+            si += b * b
+            svi += a * b
+        mv = memoryview(v)[:count]
+        mi = memoryview(i)[:count]
+        s1v = sum(mv)
+        s1i = sum(mi)
+        # حذف DC با اعداد صحیح دقیق: n·Σx² − (Σx)²؛ در float تک‌دقتی برد، تفاضل دو عدد بزرگ
+        # (میانگین مربعات ~4e6 در برابر مؤلفه AC) دقت را از بین می‌برد
+        nn = count * count
+        self.bias_v = s1v / count
+        self.bias_i = s1i / count
+        self.ac_v = math.sqrt((count * sv - s1v * s1v) / nn)
+        self.ac_i = math.sqrt((count * si - s1i * s1i) / nn)
+        # ضرایب مقیاس یک بار در انتها اعمال می‌شوند، نه برای هر نمونه
+        self.vrms = self.ac_v * self.pt_scale
+        self.irms = self.ac_i * self.ct_scale
+        self.p = (count * svi - s1v * s1i) / nn * self.pt_scale * self.ct_scale
+        self.s = self.vrms * self.irms
+        self.q = math.sqrt(max(0.0, self.s * self.s - self.p * self.p))
+        self.pf = self.p / self.s if self.s else 0.0
+
+    def analyze(self, count, period_us=SAMPLE_INTERVAL_US, missed=0):
+        """
+        پر کردن self.result از نتایج compute() به همراه ضریب توان جابه‌جایی، فاکتور قله،
+        فرکانس و پرچم‌های کیفیت. باید پس از compute() روی همان پنجره فراخوانی شود.
+
+        Args:
+            count (int): طول پنجره.
+            period_us (float): فاصله واقعی دو نمونه (ChannelSet.period_us).
+            missed (int): تخمین نمونه‌های از دست رفته این پنجره (ChannelSet.missed).
+
+        Returns:
+            PowerResult: همان شیء self.result.
+        """
+        r = self.result
+        v = memoryview(self.v)[:count]
+        i = memoryview(self.i)[:count]
+        flags = 0
+        v_lo = min(v)
+        v_hi = max(v)
+        i_lo = min(i)
+        i_hi = max(i)
+        if v_lo == 0 or v_hi >= ADC_MAX:
+            flags |= FLAG_CLIP_V
+        if i_lo == 0 or i_hi >= ADC_MAX:
+            flags |= FLAG_CLIP_I
+        if missed > count // 200:
+            flags |= FLAG_MISSED
+        # بایاس و مقدار موثر AC از compute همین پنجره
+        mean_v = self.bias_v
+        mean_i = self.bias_i
+        ac_v = self.ac_v
+        ac_i = self.ac_i
+        r.crest_v = max(v_hi - mean_v, mean_v - v_lo) / ac_v if ac_v else 0.0
+        r.crest_i = max(i_hi - mean_i, mean_i - i_lo) / ac_i if ac_i else 0.0
+
+        # فرکانس از عبورهای رو به بالای ولتاژ و فاز از فاصله اولین عبور جریان تا اولین عبور ولتاژ
+        cv, cv_last, nv = rising_crossings(v, count, mean_v, (v_hi - v_lo) / 16 + 1)
+        ci, _, ni = rising_crossings(i, count, mean_i, (i_hi - i_lo) / 16 + 1)
+        self.cycles_v = nv
+        self.cycles_i = ni
+        if nv >= 2:
+            cycle = (cv_last - cv) / (nv - 1)  # نمونه در هر سیکل
+            r.freq = 1000000 / (cycle * period_us)
+            if ni:
+                d = (ci - cv) % cycle
+                if d > cycle / 2:
+                    d -= cycle
+                r.phase = d / cycle * 360  # مثبت: جریان از ولتاژ عقب‌تر است
+                r.dpf = math.cos(math.radians(r.phase))
+            else:
+                r.phase = r.dpf = 0.0
+        else:
+            flags |= FLAG_NO_CYCLE
+            r.freq = r.phase = r.dpf = 0.0
+
+        r.vrms = self.vrms
+        r.irms = self.irms
+        r.p = self.p
+        r.q = self.q
+        r.s = self.s
+        r.pf = self.pf
+        r.samples = count
+        r.missed = missed
+        r.flags = flags
+        return r
+
+
+class ChannelSet:
+    """مجموعه‌ای از کانال‌ها که به صورت درهم (interleaved) نمونه‌برداری می‌شوند."""
+
+    def __init__(self, channels, sample_count=SAMPLE_COUNT, sample_interval_us=SAMPLE_INTERVAL_US, sleep_us=None, ticks_us=None):
+        """
+        Args:
+            channels (list): فهرست اشیای Channel.
+            sample_count (int): تعداد نمونه‌ها در هر پنجره (برای همه کانال‌ها یکسان).
+            sample_interval_us (int): فاصله بین دو دور نمونه‌برداری به میکروثانیه.
+            sleep_us (callable): تابع تاخیر (روی برد time.sleep_us، روی میزبان None).
+            ticks_us (callable): تابع زمان برای ثبت لحظه شروع هر پنجره (اختیاری).
+        """
+        if not channels:
+            raise ValueError("حداقل یک کانال لازم است.")
+        for ch in channels:
+            if len(ch.v) < sample_count:
+                raise ValueError("بافر کانال از تعداد نمونه‌ها کوچک‌تر است.")
+        self.channels = channels
+        self.results = [ch.result for ch in channels]  # اشیای PowerResult هر کانال (ثابت)
+        self.sample_count = sample_count
+        self.sample_interval_us = sample_interval_us
+        self.sleep_us = sleep_us
+        self.ticks_us = ticks_us
+        self.started_us = 0  # لحظه شروع آخرین پنجره (برای ضبط شکل موج)
+        self.elapsed_us = 0  # مدت نمونه‌برداری آخرین پنجره
+        self.period_us = sample_interval_us  # فاصله واقعی دو نمونه (با زمان خواندن ADC)
+        self.missed = 0  # تخمین نمونه‌های از دست رفته (وقفه GC یا اینتراپت طولانی)
+        self._base_period = 0.0  # کوتاه‌ترین فاصله دیده‌شده = فاصله عادی
+        # نتایج کل (جمع فازها)
+        self.p = self.q = self.s = self.pf = 0.0
+
+    def set_sample_count(self, count):
+        """تغییر طول پنجره بعدی (حداکثر به اندازه بافر کانال‌ها)."""
+        capacity = min(len(ch.v) for ch in self.channels)
+        self.sample_count = max(1, min(count, capacity))
+
+    def set_sample_interval(self, interval_us):
+        """تغییر فاصله نمونه‌برداری از پنجره بعدی؛ فاصله عادی اندازه‌گیری‌شده از نو یافته می‌شود."""
+        self.sample_interval_us = max(0, interval_us)
+        self.period_us = self.sample_interval_us
+        self._base_period = 0.0
+
+    def acquire(self):
+        """نمونه‌برداری درهم: در هر دور، همه کانال‌ها پشت سر هم خوانده می‌شوند و سپس یک تاخیر."""
+        # جدول (بافر ولتاژ، بافر جریان، read ولتاژ، read جریان) یک بار ساخته می‌شود
+        # تا در حلقه داغ جستجوی صفت تکرار نشود
+        table = [(ch.v, ch.i, ch.voltage_adc.read, ch.current_adc.read) for ch in self.channels]
+        sleep_us = self.sleep_us
+        interval = self.sample_interval_us
+        if self.ticks_us:
+            self.started_us = self.ticks_us()
+        if len(table) == 1:
+            v, i, read_v, read_i = table[0]
+            for k in range(self.sample_count):
+                v[k] = read_v()
+                i[k] = read_i()
+                if sleep_us:
+                    sleep_us(interval)
+        else:
+            for k in range(self.sample_count):
+                for v, i, read_v, read_i in table:
+                    v[k] = read_v()
+                    i[k] = read_i()
+                if sleep_us:
+                    sleep_us(interval)
+        if self.ticks_us:
+            self._timing()
+
+    def probe_current(self, cycles=2, freq=50.0, index=0):
+        """
+        نمونه‌برداری کوتاه فقط از جریان یک کانال در مکث بین پنجره‌ها (برای بیدار شدن زودهنگام
+        زمان‌بندی). طول آن چند سیکل کامل برق شهر با فاصله واقعی نمونه‌هاست تا Irms خطای سیکل ناقص
+        نداشته باشد. بافر جریان کانال بازنویسی می‌شود ولی نتایج پنجره جاری دست نمی‌خورند.
+
+        Args:
+            cycles (int): تعداد سیکل‌های برق شهر.
+            freq (float): فرکانس آخرین پنجره (PowerResult.freq)؛ 0 یعنی نامعلوم (50 هرتز).
+            index (int): شماره کانال.
+
+        Returns:
+            float: Irms مؤلفه AC بر حسب آمپر.
+        """
+        ch = self.channels[index]
+        i = ch.i
+        read = ch.current_adc.read
+        sleep_us = self.sleep_us
+        interval = self.sample_interval_us
+        # در پنجره هر نمونه دو خواندن برای هر کانال دارد، اینجا فقط یک خواندن
+        period = interval + (self.period_us - interval) / (2 * len(self.channels))
+        count = min(len(i), int(cycles * 1000000 / ((freq or 50.0) * max(1, period)) + 0.5))
+        for k in range(count):
+            i[k] = read()
+            if sleep_us:
+                sleep_us(interval)
+        s1 = sum(memoryview(i)[:count])
+        s2 = 0
+        for k in range(count):
+            b = i[k]
+            s2 += b * b
+        return math.sqrt(max(0, count * s2 - s1 * s1)) / count * ch.ct_scale
+
+    def _timing(self):
+        """فاصله واقعی نمونه‌ها و تخمین نمونه‌های از دست رفته از مدت پنجره"""
+        count = self.sample_count
+        elapsed = ((self.ticks_us() - self.started_us + 0x20000000) & 0x3FFFFFFF) - 0x20000000
+        self.elapsed_us = elapsed
+        period = elapsed / count
+        if period <= 0:
+            return
+        if not self._base_period or period < self._base_period:
+            self._base_period = period
+        # هر تاخیر اضافه (GC، اینتراپت، نوشتن فلش) پنجره را طولانی‌تر از count نمونه عادی می‌کند
+        self.missed = max(0, int(elapsed / self._base_period) - count)
+        self.period_us = self._base_period
+
+    def compute(self):
+        """محاسبه نتایج هر فاز و نتایج کل (P و Q جمع برداری، S = √(P²+Q²))."""
+        p = q = 0.0
+        for ch in self.channels:
+            ch.compute(self.sample_count)
+            p += ch.p
+            q += ch.q
+        self.p = p
+        self.q = q
+        self.s = math.sqrt(p * p + q * q)
+        self.pf = p / self.s if self.s else 0.0
+        return self
+
+    def analyze(self):
+        """پر کردن PowerResult همه کانال‌ها برای پنجره جاری؛ self.results را برمی‌گرداند."""
+        n = self.sample_count
+        for ch in self.channels:
+            ch.analyze(n, self.period_us, self.missed)
+        return self.results
+
+    def measure(self):
+        """یک پنجره کامل: نمونه‌برداری و سپس محاسبه."""
+        self.acquire()
+        return self.compute()
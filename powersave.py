@@ -0,0 +1,124 @@
+#Low-power duty-cycled monitoring
+# حالت کم‌مصرف: یک پنجره اندازه‌گیری، سپس خواب سبک (lightsleep) تا شروع دوره بعد، با خواب‌های
+# تکه‌شده کوتاه‌تر از مهلت WDT، کم‌نور کردن نمایشگرها در خواب و تخمین نسبت بیداری و جریان میانگین.
+
+# مصرف تقریبی ESP32 (بدون رادیو) برای تخمین جریان میانگین
+ACTIVE_MA = 45.0      # بیدار، ۱۶۰ مگاهرتز
+LIGHTSLEEP_MA = 0.8   # خواب سبک
+
+
+class DutyCycler:
+    """زمان‌بندی پنجره‌های اندازه‌گیری با دوره ثابت و خواب سبک بین آنها."""
+
+    def __init__(self, lightsleep, ticks_ms, ticks_diff, period_ms=10000, min_sleep_ms=10,
+                 max_sleep_ms=None, on_wake=None, active_ma=ACTIVE_MA, sleep_ma=LIGHTSLEEP_MA):
+        """
+        Args:
+            lightsleep (callable): تابع خواب سبک با ورودی میلی‌ثانیه (machine.lightsleep)؛
+                ممکن است با یک منبع بیدارباش (مثلاً پالس هال) زودتر برگردد.
+            ticks_ms (callable): تابع زمان میلی‌ثانیه (time.ticks_ms).
+            ticks_diff (callable): تابع اختلاف زمان (time.ticks_diff).
+            period_ms (int): فاصله شروع دو پنجره اندازه‌گیری.
+            min_sleep_ms (int): کمتر از این مدت خوابیدن نمی‌ارزد و رد می‌شود.
+            max_sleep_ms (int): بیشینه هر بار خواب؛ خواب طولانی‌تر تکه‌تکه انجام می‌شود
+                (مثلاً کمتر از مهلت WDT تا on_wake بتواند آن را تغذیه کند).
+            on_wake (callable): پس از هر تکه خواب فراخوانی می‌شود.
+            active_ma (float): جریان مصرفی در حالت بیدار برای تخمین جریان میانگین.
+            sleep_ma (float): جریان مصرفی در خواب سبک.
+        """
+        if period_ms <= 0 or min_sleep_ms < 0:
+            raise ValueError("دوره خواب نامعتبر است.")
+        self.lightsleep = lightsleep
+        self.ticks_ms = ticks_ms
+        self.ticks_diff = ticks_diff
+        self.period_ms = period_ms
+        self.min_sleep_ms = min_sleep_ms
+        self.max_sleep_ms = max_sleep_ms
+        self.on_wake = on_wake
+        self.active_ma = active_ma
+        self.sleep_ma = sleep_ma
+        self._dim = []
+        self._restore = []
+        self.enabled = False
+        self._burst = ticks_ms()
+        self.last_burst_ms = 0  # مدت بیداری آخرین دوره
+        self.awake_ms = 0
+        self.asleep_ms = 0
+        self.wakes = 0  # بیدار شدن زودتر از موعد با منبع خارجی
+
+    def add_display(self, dim, restore):
+        """ثبت یک نمایشگر: dim هنگام ورود به حالت کم‌مصرف و restore هنگام خروج فراخوانی می‌شود."""
+        self._dim.append(dim)
+        self._restore.append(restore)
+        if self.enabled:
+            dim()
+
+    def _call(self, hooks):
+        for hook in hooks:
+            try:
+                hook()
+            except Exception as e:
+                print(f"خطا در تغییر حالت نمایشگر: {e}")
+
+    def enable(self):
+        """ورود به حالت کم‌مصرف: کم‌نور یا خاموش کردن نمایشگرها."""
+        if not self.enabled:
+            self.enabled = True
+            self._call(self._dim)
+        self._burst = self.ticks_ms()
+
+    def disable(self):
+        """خروج از حالت کم‌مصرف و بازگرداندن نمایشگرها."""
+        if self.enabled:
+            self.enabled = False
+            self._call(self._restore)
+
+    def sleep(self):
+        """
+        خواب تا شروع دوره بعد (از شروع پنجره قبلی شمرده می‌شود).
+
+        Returns:
+            bool: True اگر یک منبع خارجی (مثلاً پالس هال) زودتر بیدار کرد.
+        """
+        now = self.ticks_ms()
+        awake = self.ticks_diff(now, self._burst)
+        self.last_burst_ms = awake
+        self.awake_ms += awake
+        woken = False
+        remaining = self.period_ms - awake
+        while remaining > self.min_sleep_ms:
+            chunk = remaining
+            if self.max_sleep_ms and chunk > self.max_sleep_ms:
+                chunk = self.max_sleep_ms
+            self.lightsleep(chunk)
+            slept = self.ticks_diff(self.ticks_ms(), now)
+            if self.on_wake:
+                self.on_wake()
+            now = self.ticks_ms()
+            if slept < chunk - self.min_sleep_ms:
+                # بیدارباش خارجی: پنجره بعد فوراً شروع می‌شود
+                self.wakes += 1
+                woken = True
+                remaining -= slept
+                self.asleep_ms += slept
+                break
+            remaining -= slept
+            self.asleep_ms += slept
+        self._burst = self.ticks_ms()
+        return woken
+
+    def expected_duty(self, burst_ms=None):
+        """نسبت بیداری مورد انتظار برای پنجره‌ای به طول burst_ms (پیش‌فرض: آخرین پنجره)."""
+        burst = self.last_burst_ms if burst_ms is None else burst_ms
+        return min(1.0, burst / self.period_ms)
+
+    @property
+    def duty(self):
+        """نسبت بیداری اندازه‌گیری‌شده از ابتدا"""
+        total = self.awake_ms + self.asleep_ms
+        return self.awake_ms / total if total else 1.0
+
+    def average_ma(self, duty=None):
+        """جریان میانگین تخمینی برای یک نسبت بیداری (پیش‌فرض: اندازه‌گیری‌شده)"""
+        d = self.duty if duty is None else duty
+        return d * self.active_ma + (1 - d) * self.sleep_ma
@@ -0,0 +1,214 @@
+#Shared RPM service for several Hall inputs
+# سرویس RPM مشترک: اینتراپت هر سنسور اثر هال فقط زمان‌مهر را در یک صف مشترک از پیش تخصیص‌یافته
+# می‌گذارد و یک تایمر دوره‌ای آنها را پردازش می‌کند و RPM میانگین متحرک هر ورودی را به‌روز می‌کند.
+from isr import AtomicCounter, SpscRing  # ابزارهای اشتراک داده با اینتراپت
+
+QUEUE_SIZE = 256  # باید توانی از ۲ باشد
+TICKS_MASK = 0x3FFFFFFF  # زمان‌مهرها مثل time.ticks_us در ۳۰ بیت نگه داشته می‌شوند
+
+
+class RpmService:
+    """ثبت هر تعداد ورودی هال روی یک صف زمان‌مهر از پیش تخصیص‌یافته و یک وظیفه پردازش دوره‌ای."""
+
+    def __init__(self, ticks_us, interval_ms=100, queue_size=QUEUE_SIZE, disable_irq=None, enable_irq=None):
+        """
+        Args:
+            ticks_us (callable): تابع زمان میکروثانیه (روی برد time.ticks_us).
+            interval_ms (int): دوره پردازش به میلی‌ثانیه (پیش‌فرض: 100ms).
+            queue_size (int): ظرفیت صف زمان‌مهرها؛ توانی از ۲.
+            disable_irq (callable): روی برد machine.disable_irq (برای خواندن و صفر کردن اتمیک شمارنده‌ها).
+            enable_irq (callable): روی برد machine.enable_irq.
+        """
+        self.ticks_us = ticks_us
+        self.interval_ms = interval_ms
+        self.interval_us = interval_ms * 1000
+        self.disable_irq = disable_irq
+        self.enable_irq = enable_irq
+        # صف تک‌تولیدکننده/تک‌مصرف‌کننده: فقط اینتراپت head را جلو می‌برد و فقط process مقدار tail را
+        self._ring = SpscRing(queue_size)
+        self._pulses = []     # شمارنده اتمیک هر کانال؛ حتی وقتی صف پر است پالسی گم نمی‌شود
+        self.handlers = []
+        self.pins = []
+        self.timer = None
+        # وضعیت هر کانال
+        self._multiplier = []
+        self._display = []
+        self._avg = []        # بافر میانگین متحرک هر کانال
+        self._avg_index = []
+        self._avg_sum = []    # مجموع جاری برای میانگین O(1)
+        self._count = []      # زمان‌مهرهای دوره جاری
+        self._first = []      # زمان‌مهر اولین و آخرین پالس دوره جاری
+        self._last = []
+        self._pending = []    # تغییر تنظیمات هر کانال که در process بعدی اعمال می‌شود
+        self.rpm = []         # آخرین RPM هموارشده هر کانال
+        self.pulses = []      # تعداد دقیق پالس‌های آخرین دوره هر کانال
+        self.listener = None  # فراخوانی با (rpm، شماره کانال) پس از هر به‌روزرسانی
+        self.on_error = None  # فراخوانی با (شماره کانال، خطا) اگر نمایشگر یک کانال خطا بدهد
+        self.display_errors = 0
+
+    @property
+    def dropped(self):
+        """تعداد پالس‌هایی که به علت پر بودن صف از دست رفته‌اند."""
+        return self._ring.dropped[0]
+
+    def _make_handler(self, index):
+        ring = self._ring
+        stamps = ring.data
+        ids = ring.tags
+        head = ring.head
+        tail = ring.tail
+        dropped = ring.dropped
+        mask = ring.mask
+        pulses = self._pulses[index].value
+        ticks_us = self.ticks_us
+
+        def hall_interrupt_handler(pin):
+            """شمارش پالس و ثبت زمان‌مهر آن در صف بدون هیچ تخصیص حافظه (همان SpscRing.push، درجا)"""
+            pulses[0] += 1
+            h = head[0]
+            n = (h + 1) & mask
+            if n == tail[0]:
+                dropped[0] += 1
+                return
+            stamps[h] = ticks_us() & TICKS_MASK
+            ids[h] = index
+            head[0] = n
+
+        return hall_interrupt_handler
+
+    def register(self, pin=None, trigger=None, rpm_multiplier=569, moving_average_window=25, display=None):
+        """
+        ثبت یک ورودی هال جدید.
+
+        Args:
+            pin: پین ورودی هال (None برای شبیه‌سازی روی میزبان).
+            trigger: نوع تریگر اینتراپت (مثلاً Pin.IRQ_RISING).
+            rpm_multiplier (int): ضریب تبدیل تعداد پالس در هر دوره به RPM.
+            moving_average_window (int): طول پنجره میانگین متحرک.
+            display (callable): تابعی که RPM هموارشده این کانال را نمایش می‌دهد.
+
+        Returns:
+            int: شماره کانال.
+        """
+        index = len(self.handlers)
+        if index > 255:
+            raise ValueError("حداکثر ۲۵۶ ورودی هال پشتیبانی می‌شود.")
+        self._pulses.append(AtomicCounter(self.disable_irq, self.enable_irq))
+        handler = self._make_handler(index)
+        self.handlers.append(handler)
+        self.pins.append(pin)
+        self._multiplier.append(rpm_multiplier)
+        self._display.append(display)
+        self._avg.append([0] * moving_average_window)
+        self._avg_index.append(0)
+        self._avg_sum.append(0)
+        self._count.append(0)
+        self._first.append(0)
+        self._last.append(0)
+        self._pending.append(None)
+        self.rpm.append(0)
+        self.pulses.append(0)
+        if pin is not None:
+            pin.irq(trigger=trigger, handler=handler)
+        return index
+
+    def configure(self, ch, rpm_multiplier=None, moving_average_window=None):
+        """
+        تغییر ضریب یا طول میانگین متحرک یک کانال در حین کار.
+
+        تغییر با یک انتساب ثبت و در ابتدای process بعدی اعمال می‌شود تا وسط پردازش
+        (که از تایمر اجرا می‌شود) حالت نیمه‌کاره دیده نشود.
+        """
+        if moving_average_window is not None and moving_average_window < 1:
+            raise ValueError("طول میانگین متحرک باید مثبت باشد.")
+        self._pending[ch] = (rpm_multiplier, moving_average_window)
+
+    def _reconfigure(self, ch, rpm_multiplier, moving_average_window):
+        if rpm_multiplier is not None:
+            self._multiplier[ch] = rpm_multiplier
+        if moving_average_window is not None and moving_average_window != len(self._avg[ch]):
+            # پنجره جدید با مقدار فعلی پر می‌شود تا نمایش پرش نکند
+            rpm = self.rpm[ch]
+            self._avg[ch] = [rpm] * moving_average_window
+            self._avg_index[ch] = 0
+            self._avg_sum[ch] = rpm * moving_average_window
+
+    def start(self, timer):
+        """راه‌اندازی تنها تایمر دوره‌ای سرویس (مثلاً machine.Timer(-1))."""
+        self.timer = timer
+        timer.init(period=self.interval_ms, mode=timer.PERIODIC, callback=self._timer_callback)
+        return timer
+
+    def stop(self):
+        """توقف تایمر و جدا کردن اینتراپت‌ها."""
+        if self.timer:
+            self.timer.deinit()
+            self.timer = None
+        for pin in self.pins:
+            if pin is not None:
+                pin.irq(handler=None)
+
+    def _timer_callback(self, timer):
+        self.process()
+
+    def process(self):
+        """تخلیه صف، محاسبه RPM هر کانال و نمایش آن؛ هزینه O(پالس‌ها + کانال‌ها)."""
+        ring = self._ring
+        stamps = ring.data
+        ids = ring.tags
+        mask = ring.mask
+        count = self._count
+        first = self._first
+        last = self._last
+        h = ring.head[0]
+        t = ring.tail[0]
+        while t != h:
+            ch = ids[t]
+            stamp = stamps[t]
+            if not count[ch]:
+                first[ch] = stamp
+            last[ch] = stamp
+            count[ch] += 1
+            t = (t + 1) & mask
+        ring.tail[0] = t
+
+        interval_us = self.interval_us
+        pending = self._pending
+        for ch in range(len(count)):
+            change = pending[ch]
+            if change:
+                pending[ch] = None
+                self._reconfigure(ch, *change)
+            pulses = self._pulses[ch].swap()
+            self.pulses[ch] = pulses
+            n = count[ch]
+            span = (last[ch] - first[ch]) & TICKS_MASK
+            if n > 2 and span:
+                # با زمان‌مهرها فاصله واقعی پالس‌ها اندازه‌گیری می‌شود و خطای کوانتیزه شدن شمارش کم می‌شود؛
+                # اگر صف پر شده باشد زمان‌مهرهای باقی‌مانده هنوز پشت سر هم‌اند و نرخ درست می‌ماند
+                rpm = ((n - 1) * interval_us * self._multiplier[ch]) // span
+            else:
+                rpm = pulses * self._multiplier[ch]
+            count[ch] = 0
+            self.rpm[ch] = smoothed = self._moving_average(ch, rpm)
+            display = self._display[ch]
+            if display:
+                try:
+                    display(smoothed)
+                except Exception as e:
+                    # خطای نمایشگر نباید پردازش بقیه کانال‌ها را متوقف کند
+                    self.display_errors += 1
+                    if self.on_error:
+                        self.on_error(ch, e)
+            if self.listener:
+                self.listener(smoothed, ch)
+
+    def _moving_average(self, ch, new_value):
+        """میانگین متحرک با مجموع جاری (بدون sum روی کل پنجره)"""
+        values = self._avg[ch]
+        i = self._avg_index[ch]
+        self._avg_sum[ch] += new_value - values[i]
+        values[i] = new_value
+        i += 1
+        self._avg_index[ch] = i if i < len(values) else 0
+        return self._avg_sum[ch] // len(values)
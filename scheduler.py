@@ -0,0 +1,138 @@
+#Adaptive window length and refresh scheduling
+# زمان‌بندی تطبیقی: در حالت پایدار پنجره بلندتر و مکث بلندتر از زمان‌بندی ثابت (کار کمتر)،
+# با تشخیص پله در Irms یا RPM پنجره کوتاه و نرخ به‌روزرسانی بیشتر می‌شود. در مکث‌های بلند، RPM
+# (که سرویس RPM جداگانه به‌روز می‌کند) و یک نمونه‌برداری کوتاه جریان بررسی می‌شوند تا پله زود
+# دیده شود و پنجره بعد بدون انتظار تا پایان مکث شروع شود.
+
+# مقادیر پیش‌فرض مرزها
+MIN_SAMPLES = 500
+MAX_SAMPLES = 2000
+MIN_PAUSE_MS = 50
+MAX_PAUSE_MS = 2000
+SLICE_MS = 100          # فاصله بررسی RPM در مکث (دوره به‌روزرسانی سرویس RPM)
+PROBE_INTERVAL_MS = 500  # فاصله نمونه‌برداری کوتاه جریان در مکث
+
+
+class AdaptiveScheduler:
+    """تعیین طول پنجره بعدی و مکث بین پنجره‌ها بر اساس پایداری سیگنال."""
+
+    def __init__(self, min_samples=MIN_SAMPLES, max_samples=MAX_SAMPLES, min_pause_ms=MIN_PAUSE_MS,
+                 max_pause_ms=MAX_PAUSE_MS, step_threshold=0.1, rpm_threshold=0.1, stable_windows=4,
+                 smoothing=0.25, current_floor=0.2, rpm_floor=50, slice_ms=SLICE_MS,
+                 probe_interval_ms=PROBE_INTERVAL_MS):
+        """
+        Args:
+            min_samples (int): کوتاه‌ترین پنجره (در حالت گذرا).
+            max_samples (int): بلندترین پنجره (در حالت پایدار)؛ نباید از طول بافر کانال بیشتر باشد.
+            min_pause_ms (int): کوتاه‌ترین مکث بین پنجره‌ها.
+            max_pause_ms (int): بلندترین مکث بین پنجره‌ها.
+            step_threshold (float): تغییر نسبی Irms که پله محسوب می‌شود.
+            rpm_threshold (float): تغییر نسبی RPM که پله محسوب می‌شود.
+            stable_windows (int): تعداد پنجره‌های پایدار متوالی پیش از بلندتر کردن پنجره.
+            smoothing (float): ضریب میانگین نمایی خط مبنا (۰ تا ۱).
+            current_floor (float): کمترین مقدار خط مبنای جریان برای محاسبه تغییر نسبی (آمپر).
+            rpm_floor (int): کمترین مقدار خط مبنای RPM برای محاسبه تغییر نسبی.
+            slice_ms (int): فاصله بررسی RPM در مکث.
+            probe_interval_ms (int): فاصله نمونه‌برداری کوتاه جریان در مکث.
+        """
+        if not 0 < min_samples <= max_samples or not 0 <= min_pause_ms <= max_pause_ms:
+            raise ValueError("مرزهای زمان‌بندی نامعتبر است.")
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.min_pause_ms = min_pause_ms
+        self.max_pause_ms = max_pause_ms
+        self.step_threshold = step_threshold
+        self.rpm_threshold = rpm_threshold
+        self.stable_windows = stable_windows
+        self.smoothing = smoothing
+        self.current_floor = current_floor
+        self.rpm_floor = rpm_floor
+        self.slice_ms = slice_ms
+        self.probe_interval_ms = probe_interval_ms
+        self.wakeups = 0  # مکث‌هایی که با دیدن پله زودتر تمام شدند
+        self.reset()
+
+    def reset(self):
+        """شروع از حالت گذرا (پنجره کوتاه، به‌روزرسانی سریع)."""
+        self.sample_count = self.min_samples
+        self.pause_ms = self.min_pause_ms
+        self.stable = 0
+        self.transient = True
+        self._irms = None
+        self._rpm = None
+
+    def _changed(self, base, value, floor, threshold):
+        return abs(value - base) > threshold * max(abs(base), floor)
+
+    def update(self, irms, rpm=0):
+        """
+        ورود نتیجه آخرین پنجره؛ sample_count و pause_ms برای پنجره بعد به‌روز می‌شوند.
+
+        Returns:
+            bool: True اگر در این پنجره پله تشخیص داده شد.
+        """
+        if self._irms is None:
+            self._irms = irms
+            self._rpm = rpm
+            return False
+        step = (self._changed(self._irms, irms, self.current_floor, self.step_threshold)
+                or self._changed(self._rpm, rpm, self.rpm_floor, self.rpm_threshold))
+        if step:
+            # پله: خط مبنا به مقدار جدید می‌پرد و زمان‌بندی به سریع‌ترین حالت برمی‌گردد
+            self._irms = irms
+            self._rpm = rpm
+            self._fast()
+            return True
+        a = self.smoothing
+        self._irms += a * (irms - self._irms)
+        self._rpm += a * (rpm - self._rpm)
+        self.stable += 1
+        if self.stable >= self.stable_windows:
+            # پایداری: دو برابر شدن تدریجی طول پنجره و مکث تا رسیدن به مرز بالا
+            self.stable = 0
+            self.transient = False
+            self.sample_count = min(self.max_samples, self.sample_count * 2)
+            self.pause_ms = min(self.max_pause_ms, max(1, self.pause_ms) * 2)
+        return False
+
+    def _fast(self):
+        self.sample_count = self.min_samples
+        self.pause_ms = self.min_pause_ms
+        self.stable = 0
+        self.transient = True
+
+    def wait(self, sleep_ms, rpm=None, probe=None):
+        """
+        مکث pause_ms تا پنجره بعد. هر slice_ms مقدار rpm[0] و هر probe_interval_ms جریان حاصل از
+        probe() با خط مبنا مقایسه می‌شود؛ با دیدن پله مکث زودتر تمام می‌شود و پنجره بعد کوتاه است
+        (خود پله در update همان پنجره تأیید و خط مبنا جابه‌جا می‌شود).
+
+        Args:
+            sleep_ms (callable): تابع تاخیر (time.sleep_ms).
+            rpm: آرایه RPM سرویس RPM (فقط rpm[0] خوانده می‌شود)؛ None: بدون بررسی.
+            probe (callable): نمونه‌برداری کوتاه و برگرداندن Irms؛ None: بدون بررسی.
+
+        Returns:
+            bool: True اگر مکث به علت پله زودتر تمام شد.
+        """
+        left = self.pause_ms
+        if self._irms is None or left <= self.slice_ms:
+            sleep_ms(left)
+            return False
+        since_probe = 0
+        while left > 0:
+            t = min(self.slice_ms, left)
+            sleep_ms(t)
+            left -= t
+            since_probe += t
+            if left <= 0:
+                break
+            step = rpm is not None and self._changed(self._rpm, rpm[0], self.rpm_floor, self.rpm_threshold)
+            if not step and probe is not None and since_probe >= self.probe_interval_ms:
+                since_probe = 0
+                step = self._changed(self._irms, probe(), self.current_floor, self.step_threshold)
+            if step:
+                self.wakeups += 1
+                self._fast()
+                return True
+        return False
@@ -0,0 +1,179 @@
+#Sensor self-test and signal-quality diagnostics
+# خودآزمایی حسگرها: سطح بایاس DC، کف نویز، تعداد نمونه‌های اشباع، فرکانس برق شهر و
+# معقول بودن پالس‌های هال. روی آمار همان پنجره‌ای که Channel.analyze ساخته اجرا می‌شود
+# و نمونه‌برداری جداگانه‌ای ندارد؛ فقط وقتی پرچم اشباع فعال است یک گذر شمارش روی بافر انجام می‌شود.
+from power_engine import ADC_MAX, FLAG_CLIP_V, FLAG_CLIP_I
+
+# بیت‌های وضعیت (کد نمایش = شماره بیت + 1، مثلاً Er03 برای اشباع ولتاژ)
+DIAG_V_BIAS = 1     # بایاس ولتاژ خارج از بازه (مدار بایاس یا PT قطع)
+DIAG_I_BIAS = 2     # بایاس جریان خارج از بازه (CT یا مقاومت بار قطع)
+DIAG_V_CLIP = 4     # اشباع PT / ADC ولتاژ
+DIAG_I_CLIP = 8     # اشباع CT / ADC جریان
+DIAG_NO_MAINS = 16  # دامنه ولتاژ ناچیز (برق قطع یا PT جدا)
+DIAG_I_NOISE = 32   # نویز بدون الگوی تناوبی روی ورودی جریان (ورودی شناور)
+DIAG_FREQ = 64      # فرکانس خارج از بازه برق شهر
+DIAG_HALL = 128     # پالس هال نامعقول (RPM غیرممکن، پالس از دست رفته یا سنسور مرده زیر بار)
+
+# نام کوتاه برای LCD و گزارش (حداکثر ۵ کاراکتر)
+DIAG_NAMES = (
+    (DIAG_V_BIAS, 'VBIAS'),
+    (DIAG_I_BIAS, 'IBIAS'),
+    (DIAG_V_CLIP, 'VCLIP'),
+    (DIAG_I_CLIP, 'ICLIP'),
+    (DIAG_NO_MAINS, 'NOAC'),
+    (DIAG_I_NOISE, 'INOIS'),
+    (DIAG_FREQ, 'FREQ'),
+    (DIAG_HALL, 'HALL'),
+)
+
+# حدهای پیش‌فرض؛ هر کدام با پارامتر limits در SelfTest قابل تغییر است
+DEFAULT_LIMITS = {
+    'bias_center': 2048,    # بایاس مورد انتظار (نیمه تغذیه) بر حسب شمارش ADC
+    'bias_tolerance': 600,  # انحراف مجاز بایاس (غیرخطی بودن ADC در ESP32 را هم پوشش می‌دهد)
+    'min_ac_v': 40.0,       # کمترین مقدار موثر AC ولتاژ (شمارش) که یعنی برق وصل است
+    'noise_max': 25.0,      # بیشینه مقدار موثر نویز جریان بدون بار (شمارش)
+    'clip_max': 0.005,      # بیشینه سهم نمونه‌های اشباع‌شده در پنجره
+    'mains_hz': 50.0,
+    'freq_tolerance': 2.0,
+    'rpm_max': 10000,       # RPM بالاتر از این مقدار نویز یا لرزش کنتاکت است
+    'load_irms': None,      # جریان AC (آمپر، بدون بایاس) که یعنی موتور می‌چرخد؛ None: بررسی سنسور مرده غیرفعال
+    'confirm': 2,           # خطا فقط اگر در این تعداد بررسی پیاپی دیده شود گزارش می‌شود
+}
+
+
+def clip_count(samples, count):
+    """تعداد نمونه‌های چسبیده به 0 یا ADC_MAX"""
+    n = 0
+    for k in range(count):
+        x = samples[k]
+        if x == 0 or x >= ADC_MAX:
+            n += 1
+    return n
+
+
+def diag_names(mask):
+    return [name for bit, name in DIAG_NAMES if mask & bit]
+
+
+def diag_code(mask):
+    """کد عددی مهم‌ترین خطا (کمترین بیت فعال)؛ 0 یعنی سالم"""
+    for code in range(len(DIAG_NAMES)):
+        if mask & (1 << code):
+            return code + 1
+    return 0
+
+
+class SelfTest:
+    """بررسی حسگرهای همه کانال‌ها و ورودی هال با تایید خطا در چند بررسی پیاپی."""
+
+    def __init__(self, limits=None, on_change=None):
+        """
+        Args:
+            limits (dict): تغییرات نسبت به DEFAULT_LIMITS.
+            on_change (callable): فراخوانی با (وضعیت جدید، وضعیت قبلی) هنگام تغییر وضعیت تاییدشده.
+        """
+        self.limits = dict(DEFAULT_LIMITS)
+        if limits:
+            self.limits.update(limits)
+        self.on_change = on_change
+        self.status = 0      # وضعیت تاییدشده (بیت‌های DIAG_*)
+        self.channel_status = []  # آخرین نتیجه خام هر کانال
+        self.clipped = 0     # تعداد نمونه‌های اشباع‌شده آخرین بررسی
+        self.runs = 0
+        self._history = []
+        self._dropped = 0
+        self._stalled = 0    # بررسی‌های پیاپی با بار ولی بدون پالس هال
+
+    def check_channel(self, channel, result):
+        """بررسی یک کانال از آمار آخرین analyze؛ بیت‌های DIAG_* خام را برمی‌گرداند."""
+        lim = self.limits
+        mask = 0
+        center = lim['bias_center']
+        tol = lim['bias_tolerance']
+        if abs(channel.bias_v - center) > tol:
+            mask |= DIAG_V_BIAS
+        if abs(channel.bias_i - center) > tol:
+            mask |= DIAG_I_BIAS
+        count = result.samples
+        # پرچم اشباع از min/max پنجره است؛ فقط در این حالت نمونه‌ها شمرده می‌شوند
+        if result.flags & FLAG_CLIP_V:
+            n = clip_count(channel.v, count)
+            self.clipped += n
+            if n > lim['clip_max'] * count:
+                mask |= DIAG_V_CLIP
+        if result.flags & FLAG_CLIP_I:
+            n = clip_count(channel.i, count)
+            self.clipped += n
+            if n > lim['clip_max'] * count:
+                mask |= DIAG_I_CLIP
+        mains = channel.ac_v >= lim['min_ac_v']
+        if not mains:
+            mask |= DIAG_NO_MAINS
+        elif abs(result.freq - lim['mains_hz']) > lim['freq_tolerance']:
+            mask |= DIAG_FREQ
+        # جریان واقعی هم‌دوره ولتاژ است؛ نویز شناور عبورهای تصادفی زیادی دارد
+        nv = channel.cycles_v
+        periodic = mains and abs(channel.cycles_i - nv) <= max(2, nv // 4)
+        if not periodic and channel.ac_i > lim['noise_max']:
+            mask |= DIAG_I_NOISE
+        return mask
+
+    def check_hall(self, rpm, irms=0.0, dropped=0):
+        """بررسی ورودی هال؛ dropped شمارنده تجمعی پالس‌های از دست رفته (RpmService.dropped) است."""
+        lim = self.limits
+        mask = 0
+        if rpm > lim['rpm_max'] or dropped != self._dropped:
+            mask |= DIAG_HALL
+        self._dropped = dropped
+        load = lim['load_irms']
+        if load is not None and irms >= load and not rpm:
+            self._stalled += 1
+            if self._stalled >= lim['confirm']:
+                mask |= DIAG_HALL
+        else:
+            self._stalled = 0
+        return mask
+
+    def run(self, channels, results, rpm=None, dropped=0):
+        """
+        یک بررسی کامل روی آخرین پنجره.
+
+        Args:
+            channels: فهرست اشیای Channel (ChannelSet.channels).
+            results: فهرست PowerResult هر کانال.
+            rpm (int): RPM کانال اول؛ None برای رد کردن بررسی هال (مثلاً هنگام بوت).
+            dropped (int): پالس‌های از دست رفته صف هال.
+
+        Returns:
+            int: وضعیت تاییدشده.
+        """
+        self.runs += 1
+        self.clipped = 0
+        raw = 0
+        self.channel_status = [self.check_channel(ch, r) for ch, r in zip(channels, results)]
+        for m in self.channel_status:
+            raw |= m
+        if rpm is not None:
+            # Irms کانال اول پیش از اصلاح تجربی پروفایل (فقط مؤلفه AC، بر حسب آمپر)
+            raw |= self.check_hall(rpm, channels[0].irms, dropped)
+        # وضعیت تاییدشده: بیت‌هایی که در همه confirm بررسی اخیر فعال بوده‌اند
+        history = self._history
+        history.append(raw)
+        if len(history) > self.limits['confirm']:
+            history.pop(0)
+        status = raw
+        for m in history:
+            status &= m
+        if status != self.status:
+            old = self.status
+            self.status = status
+            if self.on_change:
+                self.on_change(status, old)
+        return status
+
+    def names(self):
+        return diag_names(self.status)
+
+    @property
+    def code(self):
+        return diag_code(self.status)
@@ -0,0 +1,199 @@
+#Watchdog-supervised, self-healing runtime
+# ناظر اجرا: تغذیه WDT فقط وقتی همه مراحل پنجره در بودجه زمانی تمام شوند،
+# راه‌اندازی دوباره هر وسیله جانبی بدون ریبوت کامل و ذخیره شمارنده‌ها در فلش
+import json
+
+# بودجه زمانی پیش‌فرض هر مرحله به میلی‌ثانیه
+DEFAULT_BUDGETS = {
+    'acquire': 1000,
+    'compute': 500,
+    'lcd': 200,
+    'capture': 800,
+    'telemetry': 50,
+    'console': 20,
+    'aggregate': 150,  # بسته شدن بازه ساعتی یک خط در فلش می‌نویسد
+}
+RETRY_MIN_MS = 500     # فاصله اولین تلاش برای راه‌اندازی دوباره
+RETRY_MAX_MS = 5000    # سقف فاصله تلاش‌ها (دو برابر شدن پس از هر شکست)
+
+
+class Supervisor:
+    """زمان‌سنجی مراحل، تغذیه مشروط WDT و بازیابی وسایل جانبی."""
+
+    def __init__(self, ticks_ms, ticks_diff, wdt=None, budgets=None, state_path='/supervisor.json',
+                 reset_cause=None, save_interval_ms=60000, reboot_after_ms=60000):
+        """
+        Args:
+            ticks_ms (callable): تابع زمان میلی‌ثانیه (time.ticks_ms).
+            ticks_diff (callable): تابع اختلاف زمان (time.ticks_diff).
+            wdt: شیء machine.WDT (یا هر شیء با feed())؛ None یعنی بدون واچ‌داگ.
+            budgets (dict): تغییرات نسبت به DEFAULT_BUDGETS.
+            state_path (str): فایل ذخیره شمارنده‌ها (None: بدون ذخیره).
+            reset_cause: علت آخرین ریست (machine.reset_cause()).
+            save_interval_ms (int): حداقل فاصله ذخیره شمارنده‌ها برای محافظت از فلش.
+            reboot_after_ms (int): اگر بازیابی وسیله‌ای که با reboot=True ثبت شده تا این مدت موفق
+                نشود، WDT دیگر تغذیه نمی‌شود و برد به عنوان آخرین راه ریست می‌شود.
+        """
+        self.ticks_ms = ticks_ms
+        self.ticks_diff = ticks_diff
+        self.wdt = wdt
+        self.budgets = dict(DEFAULT_BUDGETS)
+        if budgets:
+            self.budgets.update(budgets)
+        self.state_path = state_path
+        self.save_interval_ms = save_interval_ms
+        self.reboot_after_ms = reboot_after_ms
+        self._reinit = {}      # نام وسیله جانبی -> تابع راه‌اندازی دوباره
+        self._essential = set()  # وسایلی که خرابی طولانی‌شان به ریبوت می‌انجامد
+        self._failed = {}      # نام وسیله جانبی -> زمان خرابی
+        self._retry_from = {}  # زمان آخرین تلاش (یا خرابی)
+        self._retry_ms = {}    # فاصله تا تلاش بعدی
+        self._healthy = True
+        self._fed = False  # آیا آخرین پنجره WDT را تغذیه کرد
+        self._last_save = ticks_ms()
+        self._dirty = False
+        self.state = {'boots': 0, 'reset_causes': {}, 'errors': {}, 'overruns': {},
+                      'recoveries': {}, 'recovery_ms': {}, 'skipped_feeds': 0}
+        self._load()
+        self.state['boots'] += 1
+        if reset_cause is not None:
+            self._count('reset_causes', str(reset_cause))
+        self.save()
+
+    # ------------------------------------------------------------ ذخیره‌سازی
+    def _load(self):
+        if not self.state_path:
+            return
+        try:
+            with open(self.state_path) as f:
+                saved = json.load(f)
+            for key in self.state:
+                if key in saved:
+                    self.state[key] = saved[key]
+        except (OSError, ValueError):
+            pass  # اولین بوت یا فایل خراب: از صفر شروع می‌شود
+
+    def save(self):
+        """ذخیره فوری شمارنده‌ها."""
+        self._dirty = False
+        self._last_save = self.ticks_ms()
+        if not self.state_path:
+            return
+        try:
+            with open(self.state_path, 'w') as f:
+                json.dump(self.state, f)
+        except OSError as e:
+            print(f"خطا در ذخیره وضعیت ناظر: {e}")
+
+    def _count(self, group, name, n=1):
+        table = self.state[group]
+        table[name] = table.get(name, 0) + n
+        self._dirty = True
+
+    # ------------------------------------------------------------ وسایل جانبی
+    def register(self, name, reinit, reboot=False):
+        """
+        ثبت تابع راه‌اندازی دوباره یک وسیله جانبی (مثلاً 'lcd'، 'i2c'، 'tm1637').
+
+        Args:
+            reboot (bool): اگر True باشد و بازیابی تا reboot_after_ms موفق نشود، برد ریست می‌شود.
+                نمایشگرها و دیگر وسایل غیرضروری False می‌مانند: نبودن دائمی‌شان نباید اندازه‌گیری
+                را با ریست‌های پشت سر هم قطع کند.
+        """
+        self._reinit[name] = reinit
+        if reboot:
+            self._essential.add(name)
+        else:
+            self._essential.discard(name)
+
+    def fault(self, name, error=None):
+        """ثبت خطای یک وسیله جانبی؛ بازیابی در recover() با فاصله افزایشی انجام می‌شود."""
+        self._count('errors', name)
+        self._healthy = False
+        if name not in self._failed:
+            now = self.ticks_ms()
+            self._failed[name] = now
+            self._retry_from[name] = now
+            self._retry_ms[name] = 0  # اولین تلاش بلافاصله در پایان همین پنجره
+        if error is not None:
+            print(f"خطا در {name}: {error}")
+
+    def failed(self, name):
+        """آیا وسیله جانبی در حالت خرابی است؟"""
+        return name in self._failed
+
+    def recover(self):
+        """تلاش برای راه‌اندازی دوباره وسایل خراب که زمان تلاش‌شان رسیده است."""
+        now = self.ticks_ms()
+        for name in list(self._failed):
+            if self.ticks_diff(now, self._retry_from[name]) < self._retry_ms[name]:
+                continue
+            reinit = self._reinit.get(name)
+            try:
+                if reinit:
+                    reinit()
+            except Exception as e:
+                self._count('errors', name)
+                self._retry_ms[name] = min(RETRY_MAX_MS, max(RETRY_MIN_MS, self._retry_ms[name] * 2))
+                self._retry_from[name] = now
+                print(f"راه‌اندازی دوباره {name} ناموفق: {e}")
+                continue
+            self._count('recoveries', name)
+            self.state['recovery_ms'][name] = self.ticks_diff(self.ticks_ms(), self._failed.pop(name))
+            print(f"{name} بازیابی شد ({self.state['recovery_ms'][name]} ms)")
+
+    # ------------------------------------------------------------ مراحل و واچ‌داگ
+    def run(self, stage, fn, *args, peripheral=None):
+        """
+        اجرای یک مرحله با زمان‌سنجی. خطا به حساب وسیله جانبی peripheral (یا خود مرحله)
+        گذاشته می‌شود و None برمی‌گردد؛ اگر آن وسیله در حال بازیابی است مرحله رد می‌شود.
+        """
+        name = peripheral or stage
+        if name in self._failed:
+            return None
+        t0 = self.ticks_ms()
+        try:
+            result = fn(*args)
+        except Exception as e:
+            self.fault(name, e)
+            return None
+        self.check(stage, self.ticks_diff(self.ticks_ms(), t0))
+        return result
+
+    def check(self, stage, elapsed_ms):
+        """ثبت مدت اجرای یک مرحله؛ False اگر از بودجه‌اش بیشتر شده باشد."""
+        if elapsed_ms > self.budgets.get(stage, elapsed_ms):
+            self._count('overruns', stage)
+            self._healthy = False
+            return False
+        return True
+
+    def window_done(self):
+        """
+        پایان پنجره: WDT فقط اگر همه مراحل بدون خطا و در بودجه تمام شده‌اند تغذیه می‌شود.
+        مرحله‌های وسیله‌ای که در حال بازیابی است رد می‌شوند و مانع تغذیه نیستند، مگر اینکه
+        وسیله با reboot=True ثبت شده و خرابی‌اش بیش از reboot_after_ms طول کشیده باشد.
+        """
+        now = self.ticks_ms()
+        stuck = False
+        for name in self._essential:
+            since = self._failed.get(name)
+            if since is not None and self.ticks_diff(now, since) >= self.reboot_after_ms:
+                stuck = True
+        self._fed = self._healthy and not stuck
+        if self._fed:
+            if self.wdt:
+                self.wdt.feed()
+        else:
+            self.state['skipped_feeds'] += 1
+            self._dirty = True
+        self._healthy = True
+        if self._failed:
+            self.recover()
+        if self._dirty and self.ticks_diff(self.ticks_ms(), self._last_save) >= self.save_interval_ms:
+            self.save()
+
+    def keepalive(self):
+        """تغذیه WDT در مکث‌های طولانی (مثلاً خواب سبک) فقط اگر آخرین پنجره سالم بوده است."""
+        if self._fed and self.wdt:
+            self.wdt.feed()
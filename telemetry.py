@@ -0,0 +1,156 @@
+#Telemetry export over serial
+# ارسال نتایج هر پنجره به صورت فریم‌های باینری فشرده با طول و CRC روی UART/USB
+# قالب فریم: SYNC(2) | نوع(1) | طول داده(1) | داده | CRC32 داده و سرآیند (4، little-endian)
+import struct
+from binascii import crc32
+
+SYNC = b'\xA5\x5A'
+FRAME_MEASUREMENT = 2  # نوع ۱ قالب قدیمی بدون فیلدهای کیفیت بود
+FRAME_AGGREGATE = 3    # آمار یک مقدار در یک بازه بسته‌شده (aggregate.py)
+FRAME_CHANNEL = 4      # نتیجه کانال‌های دوم به بعد (فقط با بیش از یک کانال)
+FRAME_TOTAL = 5        # نتایج کل ChannelSet (فقط با بیش از یک کانال)
+
+# داده فریم اندازه‌گیری
+MEASUREMENT_FORMAT = '<HLfffffffHfLLLffffHH'
+MEASUREMENT_FIELDS = ('seq', 'time_ms', 'vrms', 'irms', 'real_power', 'apparent_power',
+                      'power_factor', 'phase', 'energy_wh', 'rpm', 'reactive_power',
+                      'acquire_us', 'compute_us', 'output_us',
+                      'displacement_pf', 'frequency', 'crest_v', 'crest_i', 'missed', 'flags')
+MEASUREMENT_SIZE = struct.calcsize(MEASUREMENT_FORMAT)
+
+# داده فریم آمار؛ metric شماره مقدار در aggregate.metric_names(تعداد کانال‌ها) است
+AGGREGATE_FORMAT = '<HLLBLffffff'
+AGGREGATE_FIELDS = ('seq', 'time_ms', 'span_s', 'metric', 'count',
+                    'min', 'max', 'mean', 'std', 'p50', 'p95')
+AGGREGATE_SIZE = struct.calcsize(AGGREGATE_FORMAT)
+
+# داده فریم کانال؛ channel شماره کانال در ChannelSet است (کانال ۰ در فریم اندازه‌گیری می‌آید)
+CHANNEL_FORMAT = '<HLBffffffffH'
+CHANNEL_FIELDS = ('seq', 'time_ms', 'channel', 'vrms', 'irms', 'real_power', 'reactive_power',
+                  'apparent_power', 'power_factor', 'displacement_pf', 'frequency', 'flags')
+CHANNEL_SIZE = struct.calcsize(CHANNEL_FORMAT)
+
+# داده فریم کل: جمع برداری P و Q همه کانال‌ها، S = √(P²+Q²) و PF = P/S
+TOTAL_FORMAT = '<HLBffff'
+TOTAL_FIELDS = ('seq', 'time_ms', 'channels', 'real_power', 'reactive_power', 'apparent_power',
+                'power_factor')
+TOTAL_SIZE = struct.calcsize(TOTAL_FORMAT)
+HEADER_SIZE = 4
+CRC_SIZE = 4
+
+
+class Telemetry:
+    """فرستنده فریم تله‌متری با نرخ قابل تنظیم که هرگز حلقه اندازه‌گیری را متوقف نمی‌کند."""
+
+    def __init__(self, stream, ticks_ms, ticks_diff, period_ms=1000):
+        """
+        Args:
+            stream: خروجی با متد write (مثلاً machine.UART)؛ اگر txdone داشته باشد
+                تا خالی شدن بافر ارسال، فریم جدید رد می‌شود نه اینکه منتظر بماند.
+            ticks_ms (callable): تابع زمان میلی‌ثانیه (time.ticks_ms).
+            ticks_diff (callable): تابع اختلاف زمان (time.ticks_diff).
+            period_ms (int): حداقل فاصله بین دو فریم (0: هر پنجره).
+        """
+        self.stream = stream
+        self.ticks_ms = ticks_ms
+        self.ticks_diff = ticks_diff
+        self.period_ms = period_ms
+        self._txdone = getattr(stream, 'txdone', None)
+        self._last = None
+        self.seq = 0
+        self.sent = 0
+        self.skipped = 0
+        # بافر فریم یک بار تخصیص داده می‌شود
+        self._buf = bytearray(HEADER_SIZE + MEASUREMENT_SIZE + CRC_SIZE)
+        self._buf[0:2] = SYNC
+        self._buf[2] = FRAME_MEASUREMENT
+        self._buf[3] = MEASUREMENT_SIZE
+        self._mv = memoryview(self._buf)
+        self._agg = bytearray(HEADER_SIZE + AGGREGATE_SIZE + CRC_SIZE)
+        self._agg[0:2] = SYNC
+        self._agg[2] = FRAME_AGGREGATE
+        self._agg[3] = AGGREGATE_SIZE
+        self._agg_mv = memoryview(self._agg)
+        self._ch = bytearray(HEADER_SIZE + CHANNEL_SIZE + CRC_SIZE)
+        self._ch[0:2] = SYNC
+        self._ch[2] = FRAME_CHANNEL
+        self._ch[3] = CHANNEL_SIZE
+        self._ch_mv = memoryview(self._ch)
+        self._total = bytearray(HEADER_SIZE + TOTAL_SIZE + CRC_SIZE)
+        self._total[0:2] = SYNC
+        self._total[2] = FRAME_TOTAL
+        self._total[3] = TOTAL_SIZE
+        self._total_mv = memoryview(self._total)
+
+    def due(self):
+        """آیا زمان ارسال فریم بعدی رسیده است؟"""
+        if self._last is None or not self.period_ms:
+            return True
+        return self.ticks_diff(self.ticks_ms(), self._last) >= self.period_ms
+
+    def send(self, result, energy_wh=0.0, rpm=0, acquire_us=0, compute_us=0, output_us=0, channels=None):
+        """
+        ساخت و ارسال یک فریم اندازه‌گیری از یک PowerResult؛ True اگر فریم ارسال شد.
+        اگر channels (ChannelSet) بیش از یک کانال داشته باشد، پس از آن یک فریم کانال برای هر
+        کانال دیگر و یک فریم کل هم ارسال می‌شود.
+        """
+        if not self.due():
+            return False
+        if self._txdone and not self._txdone():
+            # بافر ارسال هنوز خالی نشده؛ این فریم رد می‌شود تا حلقه منتظر نماند
+            self.skipped += 1
+            return False
+        now = self.ticks_ms()
+        self._last = now
+        r = result
+        struct.pack_into(MEASUREMENT_FORMAT, self._buf, HEADER_SIZE,
+                         self.seq, now & 0xFFFFFFFF, r.vrms, r.irms, r.p, r.s,
+                         r.pf, r.phase, energy_wh, min(max(int(rpm), 0), 0xFFFF), r.q,
+                         acquire_us & 0xFFFFFFFF, compute_us & 0xFFFFFFFF, output_us & 0xFFFFFFFF,
+                         r.dpf, r.freq, r.crest_v, r.crest_i, min(r.missed, 0xFFFF), r.flags)
+        end = HEADER_SIZE + MEASUREMENT_SIZE
+        struct.pack_into('<L', self._buf, end, crc32(self._mv[2:end]) & 0xFFFFFFFF)
+        self.stream.write(self._buf)
+        self.seq = (self.seq + 1) & 0xFFFF
+        self.sent += 1
+        if channels is not None and len(channels.channels) > 1:
+            self._send_channels(channels, now)
+        return True
+
+    def _send_channels(self, channels, now):
+        buf = self._ch
+        end = HEADER_SIZE + CHANNEL_SIZE
+        results = channels.results
+        for k in range(1, len(results)):
+            r = results[k]
+            struct.pack_into(CHANNEL_FORMAT, buf, HEADER_SIZE, self.seq, now & 0xFFFFFFFF, k,
+                             r.vrms, r.irms, r.p, r.q, r.s, r.pf, r.dpf, r.freq, r.flags)
+            struct.pack_into('<L', buf, end, crc32(self._ch_mv[2:end]) & 0xFFFFFFFF)
+            self.stream.write(buf)
+            self.seq = (self.seq + 1) & 0xFFFF
+            self.sent += 1
+        end = HEADER_SIZE + TOTAL_SIZE
+        struct.pack_into(TOTAL_FORMAT, self._total, HEADER_SIZE, self.seq, now & 0xFFFFFFFF,
+                         len(results), channels.p, channels.q, channels.s, channels.pf)
+        struct.pack_into('<L', self._total, end, crc32(self._total_mv[2:end]) & 0xFFFFFFFF)
+        self.stream.write(self._total)
+        self.seq = (self.seq + 1) & 0xFFFF
+        self.sent += 1
+
+    def send_aggregate(self, span_ms, index, name, stat, end_ms):
+        """
+        ارسال آمار یک بازه بسته‌شده (امضای Aggregator.on_bucket).
+
+        این فریم‌ها کم‌تعداد و غیرقابل تکرارند، پس مشمول period_ms و رد شدن نمی‌شوند.
+        """
+        est = stat.quantiles
+        p50 = est[0].value() if est else stat.mean
+        p95 = est[1].value() if len(est) > 1 else stat.max
+        struct.pack_into(AGGREGATE_FORMAT, self._agg, HEADER_SIZE,
+                         self.seq, end_ms & 0xFFFFFFFF, span_ms // 1000, index, stat.count,
+                         stat.min, stat.max, stat.mean, stat.std, p50, p95)
+        end = HEADER_SIZE + AGGREGATE_SIZE
+        struct.pack_into('<L', self._agg, end, crc32(self._agg_mv[2:end]) & 0xFFFFFFFF)
+        self.stream.write(self._agg)
+        self.seq = (self.seq + 1) & 0xFFFF
+        self.sent += 1
@@ -0,0 +1,150 @@
+#Seven-segment presenter for TM1637
+# نمایش چرخشی RPM، کیلووات و جریان روی TM1637 چهاررقمی با ممیز (TM1637Decimal)،
+# نشانگر سرریز و فریم‌های از پیش ساخته که فقط هنگام تغییر مقدار دوباره ساخته می‌شوند.
+
+# الگوی سگمنت‌ها (بیت ۷ ممیز رقم است)
+DIGITS = b'\x3F\x06\x5B\x4F\x66\x6D\x7D\x07\x7F\x6F'
+MINUS = 0x40
+DP = 0x80
+LETTERS = {' ': 0x00, '-': 0x40, 'C': 0x39, 'd': 0x5E, 'E': 0x79, 'L': 0x38, 'O': 0x3F, 'P': 0x73, 'r': 0x50,
+           'S': 0x6D, 'U': 0x3E, 'u': 0x1C}
+OVERFLOW = ' OL '  # مقدار خارج از بازه نمایش
+
+# (کلید، برچسب چهارحرفی، بیشترین تعداد رقم اعشار)
+DEFAULT_ITEMS = (
+    ('rpm', 'SPd ', 0),
+    ('kw', 'PUr ', 3),
+    ('irms', 'Cur ', 2),
+)
+_POW10 = (1, 10, 100, 1000)
+
+
+def encode_text(text):
+    """فریم چهاربایتی یک متن کوتاه (فقط حروف LETTERS)"""
+    frame = bytearray(4)
+    for k in range(min(4, len(text))):
+        frame[k] = LETTERS[text[k]]
+    return frame
+
+
+def encode_value(frame, value, decimals=0):
+    """
+    نوشتن مقدار در فریم چهاربایتی بدون ساخت رشته؛ تعداد رقم اعشار تا جایی کم می‌شود که
+    عدد در چهار رقم جا شود، و اگر جا نشود نشانگر سرریز نوشته می‌شود.
+
+    Returns:
+        bool: False اگر مقدار خارج از بازه بود.
+    """
+    neg = value < 0
+    v = -value if neg else value
+    limit = 1000 if neg else 10000  # یک رقم برای علامت منفی
+    d = decimals
+    n = int(v * _POW10[d] + 0.5)
+    while n >= limit and d:
+        d -= 1
+        n = int(v * _POW10[d] + 0.5)
+    if n >= limit:
+        for k in range(4):
+            frame[k] = LETTERS[OVERFLOW[k]]
+        return False
+    sign = neg and n > 0
+    for pos in range(3, -1, -1):
+        if n or pos >= 3 - d:
+            frame[pos] = DIGITS[n % 10]
+            n //= 10
+        elif sign:
+            frame[pos] = MINUS
+            sign = False
+        else:
+            frame[pos] = 0
+    if d:
+        frame[3 - d] |= DP
+    return True
+
+
+class SegmentPresenter:
+    """چرخش بین چند مقدار روی یک TM1637؛ tick() با دوره ثابت (مثلاً تایمر RPM) فراخوانی می‌شود."""
+
+    def __init__(self, display, items=DEFAULT_ITEMS, tick_ms=100, cycle_ms=3000, label_ms=600,
+                 decimal_points=True):
+        """
+        Args:
+            display: نمایشگر با متد write(segments) (tm1637.TM1637Decimal).
+            items: دنباله (کلید، برچسب، بیشترین رقم اعشار)؛ اولین مورد هنگام شروع نمایش داده می‌شود.
+            tick_ms (int): دوره فراخوانی tick.
+            cycle_ms (int): مدت نمایش هر مقدار؛ 0 یعنی فقط مورد اول بدون چرخش.
+            label_ms (int): مدت نمایش برچسب هنگام رفتن به مقدار بعد (0: بدون برچسب).
+            decimal_points (bool): نمایشگر ممیز دارد؛ در ماژول‌های دونقطه‌ای (TM1637) باید False باشد
+                تا بیت ۷ دونقطه را روشن نکند، و مقادیر بدون اعشار نمایش داده می‌شوند.
+        """
+        if not items:
+            raise ValueError("حداقل یک مقدار برای نمایش لازم است.")
+        self.display = display
+        self.keys = [key for key, _, _ in items]
+        self.labels = [encode_text(label) for _, label, _ in items]
+        self.decimals = [places if decimal_points else 0 for _, _, places in items]
+        # فریم هر مقدار فقط وقتی مقدار عوض شود دوباره ساخته می‌شود
+        self.frames = [encode_text('----') for _ in items]
+        self.values = [None] * len(items)
+        self.overflow = [False] * len(items)
+        self.cycle_ticks = cycle_ms // tick_ms if cycle_ms else 0
+        self.label_ticks = label_ms // tick_ms
+        self.index = 0
+        self._ticks = self.label_ticks  # اولین مقدار بدون برچسب شروع می‌شود
+        self.status = encode_text('Er  ')  # فریم کد خطای خودآزمایی
+        self._status = 0
+        self._shown = bytearray(4)
+        self._valid = False  # محتوای نمایشگر نامعلوم است (شروع یا راه‌اندازی دوباره)
+        self.writes = 0
+
+    def update(self, key, value):
+        """ثبت مقدار جدید؛ اگر کلید نمایش داده نمی‌شود نادیده گرفته می‌شود."""
+        try:
+            k = self.keys.index(key)
+        except ValueError:
+            return
+        if value == self.values[k]:
+            return
+        self.values[k] = value
+        self.overflow[k] = not encode_value(self.frames[k], value, self.decimals[k])
+
+    def set_status(self, code):
+        """
+        نمایش کد خطای خودآزمایی (Er01 تا Er99) به عنوان یک مرحله اضافه در چرخش؛ 0 آن را حذف می‌کند.
+        اگر چرخش غیرفعال باشد، کد خطا به جای مقدار نمایش داده می‌شود.
+        """
+        code = min(max(code, 0), 99)
+        if code == self._status:
+            return
+        self._status = code
+        if code:
+            self.status[2] = DIGITS[code // 10]
+            self.status[3] = DIGITS[code % 10]
+
+    def invalidate(self):
+        """پس از راه‌اندازی دوباره نمایشگر، فریم جاری در tick بعد دوباره نوشته می‌شود."""
+        self._valid = False
+
+    def tick(self):
+        """پیشروی زمان‌بندی چرخش و نوشتن فریم فقط اگر با فریم روی نمایشگر فرق دارد."""
+        steps = len(self.keys) + (1 if self._status else 0)
+        if self.cycle_ticks and steps > 1:
+            self._ticks += 1
+            if self._ticks >= self.cycle_ticks + self.label_ticks:
+                self._ticks = 0
+                self.index += 1
+            if self.index >= steps:
+                self.index = 0
+        if self._status and (self.index == len(self.keys) or not self.cycle_ticks):
+            frame = self.status
+        elif self._ticks < self.label_ticks:
+            frame = self.labels[self.index]
+        else:
+            frame = self.frames[self.index]
+        if self._valid and frame == self._shown:
+            return False
+        self.display.write(frame)
+        self._shown[:] = frame
+        self._valid = True
+        self.writes += 1
+        return True